@@ -0,0 +1,188 @@
+"""
+Cold Start Benchmark - What a fresh serverless process pays before its first answer
+Starts new Python processes that import index.py (like a cold Vercel
+function) and serve one request from a seeded result cache, measuring:
+- import time, split into FastAPI itself and the app on top of it
+- first-request latency for /, /api/health and a cached /api/daily-stocks
+- which heavy modules (pandas, numpy, yfinance, ...) got loaded
+Also prints an import-time profile (python -X importtime) of index.py
+
+Usage (from api/):
+    python -m benchmarks.cold_start --runs 5
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+API_DIR = Path(__file__).parent.parent
+
+# Modules a cache-hit cold start must not import
+HEAVY_MODULES = ['pandas', 'numpy', 'yfinance', 'ta', 'bs4', 'lxml', 'requests']
+
+# First cached /api/daily-stocks answer, measured after imports
+CACHED_HIT_BUDGET_MS = 100
+
+ROUTES = ['/', '/api/health', '/api/daily-stocks']
+
+
+def seed_result_cache(path: Path, stocks: int = 10):
+    """A fresh cached screen with realistic-looking stocks"""
+    from services.result_cache import ResultCache
+    ResultCache(path).save({
+        'timestamp': datetime.now().isoformat(),
+        'universe': 'sp500',
+        'total_screened': 503,
+        'candidates': 120,
+        'passed_filters': stocks,
+        'stocks': [{
+            'symbol': f"SYM{i}", 'name': f"Company {i}", 'current_price': 50.0 + i,
+            'market_cap': 1e10, 'rsi': 25.0, 'price_vs_52w_high': 0.7, 'revenue_growth': 0.15,
+            'eps_growth': 0.1, 'gross_margin': 0.45, 'debt_to_equity': 0.4, 'pe_ratio': 18.0,
+            'price_to_sales': 3.0, 'avg_volume': 2e6, 'sma_20': 55.0, 'sma_200': 52.0,
+            'composite_score': 80.0 - i, 'sector': 'Technology', 'industry': 'Software',
+            'last_updated': datetime.now().isoformat()
+        } for i in range(stocks)]
+    })
+
+
+async def asgi_get(app, path: str) -> Tuple[int, bytes]:
+    """One GET straight through the ASGI app (no server, no HTTP client)"""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'query_string': b'', 'root_path': '', 'headers': [(b'host', b'localhost')],
+        'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    body = b''.join(m.get('body', b'') for m in messages if m['type'] == 'http.response.body')
+    return messages[0]['status'], body
+
+
+def child(route: str, cache_file: str):
+    """Runs in the fresh process: import, serve route once, report JSON on stdout"""
+    started = time.perf_counter()
+    import fastapi  # noqa: F401  (timed separately: the framework's own floor)
+    fastapi_loaded = time.perf_counter()
+    import index
+    imported = time.perf_counter()
+
+    from services.result_cache import ResultCache
+    index.result_cache = ResultCache(Path(cache_file))
+    status, body = asyncio.run(asgi_get(index.app, route))
+    served = time.perf_counter()
+
+    print(json.dumps({
+        'route': route,
+        'status': status,
+        'bytes': len(body),
+        'fastapi_import_ms': (fastapi_loaded - started) * 1000,
+        'app_import_ms': (imported - fastapi_loaded) * 1000,
+        'first_request_ms': (served - imported) * 1000,
+        'heavy_modules': [m for m in HEAVY_MODULES if m in sys.modules],
+    }))
+
+
+def run_cold(route: str, cache_file: Path) -> Dict[str, Any]:
+    started = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.cold_start', '--child', route, str(cache_file)],
+        cwd=API_DIR, capture_output=True, text=True, check=True
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result['process_ms'] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def import_profile(top: int = 15) -> Dict[str, Any]:
+    """python -X importtime for index.py: slowest modules by self time, and the app's own modules"""
+    out = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import index'],
+        cwd=API_DIR, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append({'module': name.strip(), 'self_ms': int(self_us) / 1000, 'cumulative_ms': int(cumulative_us) / 1000})
+    total = next((r['cumulative_ms'] for r in rows if r['module'] == 'index'), None)
+    return {
+        'total_ms': total,
+        'slowest_self': sorted(rows, key=lambda r: -r['self_ms'])[:top],
+        'app_modules': [r for r in rows if r['module'] == 'index' or r['module'].startswith('services')],
+    }
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    keys = ['process_ms', 'fastapi_import_ms', 'app_import_ms', 'first_request_ms']
+    summary = {key: round(statistics.median(r[key] for r in results), 1) for key in keys}
+    summary['status'] = results[0]['status']
+    summary['heavy_modules'] = sorted({m for r in results for m in r['heavy_modules']})
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start cost of the API handler")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh processes per route")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    parser.add_argument('--child', nargs=2, metavar=('ROUTE', 'CACHE_FILE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    cache_file = Path(tempfile.mkdtemp()) / 'filtered_stocks.json'
+    seed_result_cache(cache_file)
+    routes = {route: summarize([run_cold(route, cache_file) for _ in range(args.runs)]) for route in ROUTES}
+    profile = import_profile()
+    cached_hit = routes['/api/daily-stocks']
+    report = {
+        'runs': args.runs,
+        'routes': routes,
+        'import_profile': profile,
+        'cached_hit_budget_ms': CACHED_HIT_BUDGET_MS,
+        'cached_hit_within_budget': (cached_hit['first_request_ms'] < CACHED_HIT_BUDGET_MS
+                                     and not cached_hit['heavy_modules']),
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"\nCold start, median of {args.runs} fresh processes per route")
+    print(f"{'route':<20}{'process ms':>12}{'fastapi ms':>12}{'app ms':>9}{'1st req ms':>12}  heavy modules")
+    for route, r in routes.items():
+        print(f"{route:<20}{r['process_ms']:>12.1f}{r['fastapi_import_ms']:>12.1f}{r['app_import_ms']:>9.1f}"
+              f"{r['first_request_ms']:>12.1f}  {', '.join(r['heavy_modules']) or '-'}")
+
+    print(f"\nImport profile of index.py ({profile['total_ms']:.1f} ms total), slowest modules by self time:")
+    for row in profile['slowest_self']:
+        print(f"  {row['self_ms']:>8.1f} ms  {row['module']}")
+    print("App modules (cumulative):")
+    for row in profile['app_modules']:
+        print(f"  {row['cumulative_ms']:>8.1f} ms  {row['module']}")
+
+    verdict = 'OK' if report['cached_hit_within_budget'] else 'OVER BUDGET'
+    print(f"\nCached /api/daily-stocks first request: {cached_hit['first_request_ms']:.1f} ms "
+          f"(budget {CACHED_HIT_BUDGET_MS} ms, no heavy imports) - {verdict}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+HTTP Pool Benchmark - Per-call latency with and without connection reuse
+Starts a local stub of the Alpha Vantage API that charges a fixed delay for
+every new connection (standing in for the TCP + TLS handshake) and fetches
+the statement endpoints (income, balance sheet, cash flow) for a set of
+symbols three ways:
+- bare: requests.get per call (a new connection every time)
+- pooled: AlphaVantageService's keep-alive requests.Session
+- pooled async: AlphaVantageService's httpx.AsyncClient (if httpx is installed)
+
+Usage (from api/):
+    python -m benchmarks.http_pool --symbols 20 --handshake-ms 40
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import statistics
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from services.alpha_vantage import AlphaVantageService
+from services.http_client import httpx
+from services.response_cache import ResponseCache
+
+STATEMENT_FUNCTIONS = ['INCOME_STATEMENT', 'BALANCE_SHEET', 'CASH_FLOW']
+
+
+def start_stub_server(handshake_ms: float):
+    """Stub API on a free localhost port; returns (server, base_url, stats)"""
+    stats = {'connections': 0, 'requests': 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # Keep connections open between requests
+
+        def setup(self):
+            super().setup()
+            # Headers and body go out as separate writes; don't let Nagle hold the body
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with lock:
+                stats['connections'] += 1
+            time.sleep(handshake_ms / 1000)
+
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            body = json.dumps({
+                'symbol': query.get('symbol', [''])[0],
+                'function': query.get('function', [''])[0],
+                'annualReports': [{'fiscalDateEnding': '2024-12-31', 'totalRevenue': '1000'}]
+            }).encode()
+            with lock:
+                stats['requests'] += 1
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/query", stats
+
+
+def summarize(name: str, timings: List[float], connections: int) -> Dict[str, float]:
+    return {
+        'name': name,
+        'calls': len(timings),
+        'mean_ms': statistics.mean(timings) * 1000,
+        'median_ms': statistics.median(timings) * 1000,
+        'connections': connections,
+    }
+
+
+def requests_for(symbols: int):
+    for i in range(symbols):
+        for function in STATEMENT_FUNCTIONS:
+            yield {'function': function, 'symbol': f"SYM{i}", 'apikey': 'demo'}
+
+
+def run(symbols: int, handshake_ms: float) -> List[Dict[str, float]]:
+    server, base_url, stats = start_stub_server(handshake_ms)
+    service = AlphaVantageService(api_key='demo', base_url=base_url)
+    service.cache = ResponseCache('benchmark', Path(tempfile.mkdtemp()) / 'responses.sqlite')
+    results = []
+
+    def measure(name: str, call):
+        before = stats['connections']
+        timings = []
+        for params in requests_for(symbols):
+            started = time.perf_counter()
+            call(params)
+            timings.append(time.perf_counter() - started)
+        results.append(summarize(name, timings, stats['connections'] - before))
+
+    measure('bare requests.get', lambda p: requests.get(base_url, params=p, timeout=30).json())
+    measure('pooled session', lambda p: service._fetch(service._cache_key(p), p))
+
+    if httpx is not None:
+        async def run_async():
+            before = stats['connections']
+            timings = []
+            for params in requests_for(symbols):
+                started = time.perf_counter()
+                await service._fetch_async(service._cache_key(params), params)
+                timings.append(time.perf_counter() - started)
+            results.append(summarize('pooled async (httpx)', timings, stats['connections'] - before))
+        asyncio.run(run_async())
+
+    server.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pooled vs unpooled Alpha Vantage calls")
+    parser.add_argument('--symbols', type=int, default=20)
+    parser.add_argument('--handshake-ms', type=float, default=40,
+                        help="Simulated connection setup cost per new connection")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.symbols, args.handshake_ms)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    baseline = results[0]['mean_ms']
+    print(f"\n{args.symbols} symbols x {len(STATEMENT_FUNCTIONS)} statement endpoints, "
+          f"{args.handshake_ms:g} ms simulated handshake")
+    print(f"{'client':<24}{'mean ms':>10}{'median ms':>12}{'connections':>13}{'saved/call':>12}")
+    for r in results:
+        print(f"{r['name']:<24}{r['mean_ms']:>10.2f}{r['median_ms']:>12.2f}{r['connections']:>13}"
+              f"{baseline - r['mean_ms']:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,319 @@
+"""
+Screening Pipeline Benchmark - Stage timings on synthetic universes
+Generates a universe of N tickers with random-walk OHLCV and plausible
+fundamentals behind a SyntheticProvider, then times each screening stage:
+- universe: get_universe
+- pre_screen: screen_universe (market cap / volume)
+- history: get_history for the candidates
+- detail_fetch: get_stock_data on the worker pool (indicator engine included)
+- filter: FilterEngine.filter_masks over every candidate
+- filter_stock: the per-stock StockFilter.filter_stock path, for comparison
+- rank: FilterEngine.run (filter + composite score + sort)
+plus an end-to-end screen_stocks() run. The stage run starts with empty
+indicator state (a first-ever screen); the end-to-end run reuses it, like
+a daily re-screen. Each stage reports seconds, items/second and peak
+traced memory; results are printed as JSON
+
+Usage (from api/):
+    python -m benchmarks.screening --sizes 500,5000,50000 --output bench.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import platform
+import resource
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from services.concurrent_fetch import fetch_concurrently, DETAIL_FETCH_WORKERS
+from services.filter_engine import FilterEngine, build_feature_frame
+from services.indicator_engine import IndicatorEngine
+from services.market_data import MarketDataProvider
+from services.stock_filter import StockFilter
+
+DEFAULT_SIZES = [500, 5000, 50000]
+HISTORY_BARS = 252  # One year of daily bars, like the live screen
+SEED = 42
+
+SECTORS = [
+    'Technology', 'Healthcare', 'Financial Services', 'Consumer Cyclical',
+    'Industrials', 'Communication Services', 'Consumer Defensive', 'Energy',
+    'Utilities', 'Real Estate', 'Basic Materials',
+]
+
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    Deterministic fake market: lognormal market caps and volumes, random-walk
+    prices (some with a recent selloff, so the strict filters pass a few),
+    and fundamentals with occasional gaps like Ticker.info has
+    """
+
+    name = 'synthetic'
+
+    def __init__(self, size: int, seed: int = SEED, indicator_db: Optional[Path] = None):
+        rng = np.random.default_rng(seed)
+        self.seed = seed
+        self.tickers = [f"SYN{i:05d}" for i in range(size)]
+        self.info = {}
+        for symbol in self.tickers:
+            self.info[symbol] = {
+                'longName': f"{symbol} Corp",
+                'marketCap': float(np.exp(rng.normal(np.log(8e9), 1.4))),
+                'averageVolume': float(np.exp(rng.normal(np.log(2e6), 1.0))),
+                'revenueGrowth': self._maybe(rng, rng.normal(0.12, 0.15)),
+                'earningsGrowth': self._maybe(rng, rng.normal(0.10, 0.25)),
+                'grossMargins': self._maybe(rng, rng.uniform(0.1, 0.8)),
+                'debtToEquity': self._maybe(rng, rng.uniform(0, 150)),
+                'trailingPE': self._maybe(rng, rng.uniform(5, 60)),
+                'priceToSalesTrailing12Months': self._maybe(rng, rng.uniform(0.5, 12)),
+                'freeCashflow': float(rng.normal(5e8, 1e9)),
+                'sector': SECTORS[rng.integers(len(SECTORS))],
+                'industry': f"Industry {rng.integers(60)}",
+            }
+        self.indicators = IndicatorEngine(indicator_db or Path(tempfile.mkdtemp()) / 'indicators.sqlite')
+
+    @staticmethod
+    def _maybe(rng: np.random.Generator, value: float, missing: float = 0.05) -> Optional[float]:
+        return None if rng.random() < missing else float(value)
+
+    def get_universe(self, source: str) -> List[str]:
+        return list(self.tickers)
+
+    def screen_universe(self, tickers: List[str],
+                        min_market_cap: float = 5e9,
+                        min_volume: float = 1.5e6,
+                        max_rsi: float = 30) -> List[str]:
+        # Same per-ticker shape as YFinanceService.screen_universe over cached info
+        candidates = []
+        for symbol in tickers:
+            info = self.info[symbol]
+            if info['marketCap'] >= min_market_cap and info['averageVolume'] >= min_volume:
+                candidates.append(symbol)
+        return candidates
+
+    def get_history(self, symbols: List[str], period: str = '1y') -> pd.DataFrame:
+        """Random-walk OHLCV for all symbols at once (a third end in a selloff)"""
+        rng = np.random.default_rng(self.seed + len(symbols))
+        n = len(symbols)
+        dates = pd.bdate_range(end=pd.Timestamp('2024-12-31'), periods=HISTORY_BARS)
+        returns = rng.normal(0.0004, 0.018, (HISTORY_BARS, n))
+        selloff = rng.random(n) < 0.33
+        returns[-30:, selloff] -= 0.012
+        close = 100 * np.exp(np.cumsum(returns, axis=0))
+        spread = np.abs(rng.normal(0, 0.01, (HISTORY_BARS, n)))
+        volume = np.array([self.info[s]['averageVolume'] for s in symbols]) * rng.lognormal(0, 0.3, (HISTORY_BARS, n))
+
+        fields = {
+            'Open': close * (1 + rng.normal(0, 0.003, (HISTORY_BARS, n))),
+            'High': close * (1 + spread),
+            'Low': close * (1 - spread),
+            'Close': close,
+            'Volume': volume,
+        }
+        frame = pd.concat(
+            {field: pd.DataFrame(values, index=dates, columns=symbols) for field, values in fields.items()},
+            axis=1
+        )
+        return frame.swaplevel(0, 1, axis=1).sort_index(axis=1)
+
+    def get_stock_data(self, symbol: str, period: str = '1y',
+                       hist: Optional[pd.DataFrame] = None) -> Optional[Dict[str, Any]]:
+        """Same feature dict as YFinanceService.get_stock_data, indicators computed for real"""
+        if hist is None or hist.empty:
+            return None
+        info = self.info[symbol]
+        indicators = self.indicators.compute(symbol, hist)
+        return {
+            'symbol': symbol,
+            'name': info['longName'],
+            'current_price': float(indicators['current_price']),
+            'market_cap': info['marketCap'],
+            'rsi': indicators['rsi'],
+            'sma_20': indicators['sma_20'],
+            'sma_200': indicators['sma_200'],
+            'high_52w': float(indicators['high_52w']),
+            'low_52w': float(indicators['low_52w']),
+            'avg_volume': float(indicators['avg_volume']),
+            'revenue_growth': info['revenueGrowth'],
+            'eps_growth': info['earningsGrowth'],
+            'gross_margin': info['grossMargins'],
+            'debt_to_equity': info['debtToEquity'] / 100 if info['debtToEquity'] is not None else None,
+            'pe_ratio': info['trailingPE'],
+            'price_to_sales': info['priceToSalesTrailing12Months'],
+            'free_cash_flow': info['freeCashflow'],
+            'sector': info['sector'],
+            'industry': info['industry'],
+            'exchange': 'SYN'
+        }
+
+
+class StageTimer:
+    """Wall time, throughput and peak traced memory per stage"""
+
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    def run(self, name: str, fn: Callable[[], Any], items: Callable[[Any], int]) -> Any:
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - started
+        count = items(result)
+        self.stages[name] = {
+            'seconds': round(seconds, 4),
+            'items': count,
+            'items_per_second': round(count / seconds, 1) if seconds > 0 else None,
+            'peak_memory_mb': round(tracemalloc.get_traced_memory()[1] / 2**20, 2) if self.trace_memory else None,
+        }
+        return result
+
+
+def run_stages(provider: SyntheticProvider, trace_memory: bool) -> Dict[str, Any]:
+    """Time each pipeline stage the way screen_stocks() chains them"""
+    timer = StageTimer(trace_memory)
+    stock_filter = StockFilter(provider)
+    engine = FilterEngine()
+
+    universe = timer.run('universe', lambda: provider.get_universe('synthetic'), len)
+    candidates = timer.run(
+        'pre_screen',
+        lambda: provider.screen_universe(
+            universe,
+            min_market_cap=StockFilter.MIN_MARKET_CAP,
+            min_volume=StockFilter.MIN_AVG_VOLUME
+        ),
+        lambda result: len(universe)
+    )
+    history = timer.run('history', lambda: provider.get_history(candidates), lambda result: len(candidates))
+
+    def fetch_details():
+        return asyncio.run(fetch_concurrently(
+            candidates,
+            lambda ticker: provider.get_stock_data(ticker, hist=provider.extract_history(history, ticker)),
+            max_workers=DETAIL_FETCH_WORKERS
+        ))
+    stock_data = timer.run('detail_fetch', fetch_details, lambda result: len(candidates))
+
+    features = build_feature_frame(stock_data)
+    timer.run('filter', lambda: engine.filter_masks(features), len)
+
+    def scalar_filter():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return [result for result in map(stock_filter.filter_stock, stock_data) if result]
+    timer.run('filter_stock', scalar_filter, lambda result: len(stock_data))
+
+    ranked = timer.run('rank', lambda: engine.run(features), lambda result: len(stock_data))
+
+    return {
+        'universe': len(universe),
+        'candidates': len(candidates),
+        'passed_filters': len(ranked),
+        'stages': timer.stages,
+    }
+
+
+def run_end_to_end(provider: SyntheticProvider, trace_memory: bool) -> Dict[str, Any]:
+    """
+    Full screen_stocks() with the synthetic provider, caches redirected to a
+    temp dir (indicator state is whatever the provider already holds)
+    """
+    import index
+    from services.feature_store import FeatureStore
+    from services.progress_bus import ProgressReporter, progress_bus
+    from services.result_cache import ResultCache
+    from services.result_store import ResultStore
+
+    workdir = Path(tempfile.mkdtemp())
+    index.market_data = provider
+    index.result_cache = ResultCache(workdir / 'filtered_stocks.json')
+    index.result_store = ResultStore(workdir / 'results.sqlite')
+    index.feature_store = FeatureStore(workdir / 'features.pkl')
+
+    class StageProgress(ProgressReporter):
+        """Timestamps each stage change the screen reports"""
+
+        def __init__(self):
+            self.marks = []
+            super().__init__(progress_bus)
+
+        def _publish(self):
+            stage = self.state.get('stage')
+            if not self.marks or self.marks[-1][0] != stage:
+                self.marks.append((stage, time.perf_counter()))
+
+    progress = StageProgress()
+    if trace_memory:
+        tracemalloc.reset_peak()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        top = asyncio.run(index.screen_stocks(progress=progress))
+    finished = time.perf_counter()
+
+    stages = {}
+    marks = progress.marks + [('done', finished)]
+    for (stage, at), (_, until) in zip(marks, marks[1:]):
+        if stage and stage != 'complete':
+            stages[stage] = round(stages.get(stage, 0) + until - at, 4)
+
+    return {
+        'seconds': round(finished - started, 4),
+        'tickers_per_second': round(len(provider.tickers) / (finished - started), 1),
+        'peak_memory_mb': round(tracemalloc.get_traced_memory()[1] / 2**20, 2) if trace_memory else None,
+        'top_stocks': len(top),
+        'stages': stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the screening pipeline on synthetic universes")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="Universe sizes, comma separated")
+    parser.add_argument('--no-end-to-end', action='store_true', help="Skip the full screen_stocks() run")
+    parser.add_argument('--no-trace-memory', action='store_true',
+                        help="Skip tracemalloc (faster, but no peak memory numbers)")
+    parser.add_argument('--output', help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    trace_memory = not args.no_trace_memory
+    if trace_memory:
+        tracemalloc.start()
+
+    runs = []
+    for size in (int(s) for s in args.sizes.split(',')):
+        provider = SyntheticProvider(size)
+        result = {'tickers': size, **run_stages(provider, trace_memory)}
+        if not args.no_end_to_end:
+            result['end_to_end'] = run_end_to_end(provider, trace_memory)
+        runs.append(result)
+
+    report = {
+        'benchmark': 'screening_pipeline',
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'detail_fetch_workers': DETAIL_FETCH_WORKERS,
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'runs': runs,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,21 +9,43 @@ UNIVERSE SIZE ADVANTAGE:
 - Results in 5-10 high-quality filtered stocks
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
-from typing import List, Dict, Any
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from typing import List, Dict, Any, Callable, Optional
 import os
 import json
+import time
 import asyncio
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime
 from pathlib import Path
 
 # Import our services
 import sys
 sys.path.append(str(Path(__file__).parent))
-from services.yfinance_service import yfinance_service
-from services.stock_filter import stock_filter
+# pandas/yfinance-backed services load on first use, so cold starts that only
+# serve cached results skip them (python -m benchmarks.cold_start checks this)
+from services.lazy import lazy
+market_data = lazy('services.providers', 'market_data')
+stock_filter = lazy('services.stock_filter', 'stock_filter')
+filter_engine = lazy('services.filter_engine', 'filter_engine')
+feature_store = lazy('services.feature_store', 'feature_store')
+from services.result_cache import result_cache, encode_json
+from services.result_store import result_store, SORT_KEYS, MAX_PAGE_SIZE, encode_cursor, decode_cursor
+from services.http_cache import build_variants, cached_response, content_etag
+from services.concurrent_fetch import fetch_concurrently, DETAIL_FETCH_WORKERS, DETAIL_FETCH_TIMEOUT
+from services.screening_jobs import screening_jobs
+from services.sharding import (
+    use_sharding, screen_sharded, split_shards, combine_shards, empty_shard, SCREENING_MODE, SHARD_SIZE
+)
+from services.work_queue import work_queue
+from services.queue_worker import QueueWorker, QUEUE_INLINE_WORKER, QUEUE_POLL_SECONDS
+from services.progress_bus import progress_bus, ProgressReporter, ALL_JOBS
+from services.metrics import (
+    registry, CONTENT_TYPE as METRICS_CONTENT_TYPE, STAGE_SECONDS, CACHE_LOOKUPS,
+    TICKERS_SCREENED, TICKERS_PER_SECOND, FILTER_PASSES, PROVIDER_ERRORS, ticker_log
+)
 
 app = FastAPI(title="Stock Screener API")
 
@@ -36,178 +58,355 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global progress state for real-time updates
-progress_state = {
-    'status': 'idle',  # idle, running, complete, error
-    'stage': '',  # fetching_universe, pre_screening, fetching_details, filtering, complete
-    'current': 0,
-    'total': 0,
-    'message': '',
-    'stocks_found': 0
-}
-
 # Stock universe - NO LONGER NEEDED!
 # yfinance can dynamically fetch S&P 500, NASDAQ-100, or any list
 # We'll screen the ENTIRE S&P 500 (~500 stocks) to find the best opportunities
 
 # Universe options:
-UNIVERSE_SOURCE = 'sp500'  # Options: 'sp500', 'nasdaq100', 'both', or custom list
+# 'file:<path>' reads a custom ticker list (one per line), e.g. a Russell 3000 export;
+# large universes can be screened across processes (SCREENING_MODE, see services/sharding.py)
+UNIVERSE_SOURCE = os.getenv('UNIVERSE_SOURCE', 'sp500')  # Options: 'sp500', 'nasdaq100', 'both', 'file:<path>'
 
-# Cache configuration
-CACHE_FILE = Path(__file__).parent / "cache" / "filtered_stocks.json"
-CACHE_DURATION_HOURS = 24  # Refresh once per day
+# Stocks returned per screen
+TOP_STOCKS = 10
 
+# Give up on a queued screen (SCREENING_MODE=queue) whose shards aren't all done by then
+QUEUE_SCREEN_TIMEOUT = float(os.getenv('WORK_QUEUE_SCREEN_TIMEOUT', '3600'))
 
-def load_cache() -> Dict[str, Any]:
-    """Load cached filtered stocks"""
-    if CACHE_FILE.exists():
-        try:
-            with open(CACHE_FILE, 'r') as f:
-                cache = json.load(f)
-                cache_time = datetime.fromisoformat(cache.get('timestamp', '2000-01-01'))
-                
-                # Check if cache is still valid
-                if datetime.now() - cache_time < timedelta(hours=CACHE_DURATION_HOURS):
-                    return cache
-        except Exception as e:
-            print(f"Error loading cache: {e}")
-    return None
+# Idle seconds between SSE keepalive comments on /api/screening-progress
+PROGRESS_HEARTBEAT_SECONDS = 15
+
+# Static part of the /api/daily-stocks response, encoded once
+DAILY_STOCKS_INFO = {
+    'filters_applied': {
+        'exchange': 'NYSE/NASDAQ (S&P 500)',
+        'min_market_cap': '$5B',
+        'min_volume': '1.5M shares',
+        'max_rsi': 28,
+        'max_price_vs_52w': '75%',
+        'min_revenue_growth': '10%',
+        'min_eps_growth': '8% OR positive FCF',
+        'min_gross_margin': '30%',
+        'max_debt_to_equity': 0.80,
+        'max_trailing_pe': 25,
+        'max_price_to_sales': 4.0
+    },
+    'scoring_weights': {
+        'rsi_oversold': '35%',
+        'revenue_growth': '25%',
+        'eps_fcf_strength': '20%',
+        'drawdown_severity': '20%'
+    },
+    'methodology': {
+        'step_1': 'Screen S&P 500 (~500 stocks)',
+        'step_2': 'Pre-filter by market cap + volume',
+        'step_3': 'Fetch detailed data for candidates',
+        'step_4': 'Apply all 12 strict filters',
+        'step_5': 'Rank by composite score',
+        'time': '3-5 minutes',
+        'advantage': 'Finds hidden opportunities across entire market'
+    }
+}
+DAILY_STOCKS_INFO_JSON = encode_json(DAILY_STOCKS_INFO)[1:-1]
 
 
-def save_cache(data: Dict[str, Any]):
-    """Save filtered stocks to cache"""
-    CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
-    try:
-        with open(CACHE_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
-    except Exception as e:
-        print(f"Error saving cache: {e}")
+def daily_stocks_body(stocks_json: bytes, count: int, job_id: Optional[str], last_updated: str) -> bytes:
+    """/api/daily-stocks JSON around an already encoded stocks list"""
+    head = encode_json({'success': True, 'job_id': job_id})[:-1]
+    tail = encode_json({'count': count, 'last_updated': last_updated, 'universe': UNIVERSE_SOURCE})[1:-1]
+    return b''.join([head, b',"stocks":', stocks_json, b',', tail, b',', DAILY_STOCKS_INFO_JSON, b'}'])
+
+
+def daily_stocks_variants(cached: Dict[str, Any]) -> Dict[str, Any]:
+    """Cache-hit /api/daily-stocks body for a cached screen: ETag plus encoded variants"""
+    data = cached['data']
+    body = daily_stocks_body(cached['stocks_json'], len(data['stocks']), None, data['timestamp'])
+    return {'etag': content_etag(body), 'variants': build_variants(body)}
+
 
+def get_stock_universe() -> List[str]:
+    """Resolve UNIVERSE_SOURCE to a list of tickers (from cached snapshots)"""
+    return market_data.get_universe(UNIVERSE_SOURCE)
 
-async def screen_stocks(force_refresh: bool = False) -> List[Dict[str, Any]]:
+
+async def get_screen_results(force_refresh: bool = False,
+                             on_stock: Optional[Callable[[Dict[str, Any]], None]] = None):
     """
-    Screen all stocks in universe and return filtered results
-    This is expensive (many API calls), so we cache results
+    Return (stocks, job, cached) for the current screen
+    Served from the in-memory result cache when possible; otherwise joins the
+    in-flight screening job or starts one, so identical concurrent requests
+    share a single screen
+    job is None on a cache hit; cached is the screen's result cache entry
+    (None if the screen couldn't be cached)
     """
-    global progress_state
-    
-    # Try to load from cache first
+    # Try the result cache first
     if not force_refresh:
-        cached = load_cache()
+        cached = result_cache.get()
+        CACHE_LOOKUPS.inc(cache='screen_results', result='hit' if cached else 'miss')
         if cached:
-            print("Returning cached results")
             # Delete old cache to force fresh screening if 0 stocks
-            if cached.get('passed_filters', 0) == 0:
+            if cached['data'].get('passed_filters', 0) == 0:
                 print("WARNING: Cache has 0 stocks, deleting and re-screening...")
-                CACHE_FILE.unlink(missing_ok=True)
+                result_cache.clear()
             else:
-                return cached['stocks']
+                stocks = cached['data']['stocks']
+                if on_stock:
+                    for stock in stocks:
+                        on_stock(stock)
+                return stocks, None, cached
+    
+    job = screening_jobs.submit(
+        f"screen:{UNIVERSE_SOURCE}",
+        lambda job: screen_stocks(
+            progress=job['progress'],
+            on_stock=lambda stock: screening_jobs.publish_stock(job, stock),
+            streaming=lambda: screening_jobs.has_stock_listeners(job)
+        )
+    )
+    if on_stock:
+        screening_jobs.add_stock_listener(job, on_stock)
+    stocks = await screening_jobs.wait(job)
+    return stocks, job, result_cache.get()
+
+
+async def finish_screen(stock_universe: List[str], candidates: List[str],
+                        candidate_data: List[Dict[str, Any]], passing: List[Dict[str, Any]],
+                        progress: ProgressReporter, screen_started: float) -> List[Dict[str, Any]]:
+    """
+    Shared tail of single-process and sharded screens: rank, store, cache and mark complete
+    passing is every stock that passed all filters (unranked); all of them go
+    to the result store for /api/results, the top stocks to the result cache
+    """
+    from services.filter_engine import rank_stocks
+    
+    # Take top 5-10 (heap top-K, the rest are only ranked by the result store)
+    top_stocks = rank_stocks(passing, TOP_STOCKS)
+    
+    print(f"\n{'='*60}")
+    print(f"Screening complete!")
+    print(f"{len(stock_universe)} stocks screened")
+    print(f"{len(candidates)} candidates identified")
+    print(f"{len(passing)} passed all 12 filters")
+    print(f"Top {len(top_stocks)} stocks selected")
+    print(f"{'='*60}\n")
+    
+    # Show top stocks
+    if top_stocks:
+        print("\nTOP OPPORTUNITIES:")
+        for i, stock in enumerate(top_stocks, 1):
+            print(f"  {i}. {stock['symbol']}: Score {stock['composite_score']}/100 | RSI {stock['rsi']:.1f} | {stock['name']}")
+    
+    # Cache results
+    cache_data = {
+        'timestamp': datetime.now().isoformat(),
+        'universe': UNIVERSE_SOURCE,
+        'total_screened': len(stock_universe),
+        'candidates': len(candidates),
+        'passed_filters': len(passing),
+        'stocks': top_stocks
+    }
+    
+    # Every passing stock, so deeper pages never need another screen
+    # (both writes run off the event loop)
+    with STAGE_SECONDS.time(stage='result_store'):
+        try:
+            cache_data['screen_id'] = await asyncio.to_thread(
+                result_store.save,
+                passing, timestamp=cache_data['timestamp'], universe=UNIVERSE_SOURCE,
+                total_screened=len(stock_universe), candidates=len(candidates)
+            )
+        except Exception as e:
+            print(f"Error saving screen results to the result store: {e}")
+    await asyncio.to_thread(result_cache.save, cache_data)
+    
+    screen_seconds = time.perf_counter() - screen_started
+    STAGE_SECONDS.observe(screen_seconds, stage='total')
+    TICKERS_PER_SECOND.set(len(stock_universe) / max(screen_seconds, 1e-9), stage='universe')
+    print(f"Screen took {screen_seconds:.1f}s ({len(stock_universe) / max(screen_seconds, 1e-9):.1f} tickers/s)")
+    
+    # Mark as complete
+    if len(top_stocks) == 0:
+        progress.set({
+            'status': 'complete',
+            'stage': 'complete',
+            'message': 'WARNING: 0 stocks passed all 12 strict filters. Consider relaxing filter criteria.',
+            'stocks_found': 0,
+            'current': len(candidate_data),
+            'total': len(candidate_data)
+        })
+    else:
+        progress.set({
+            'status': 'complete',
+            'stage': 'complete',
+            'message': f'Screening complete! Found {len(top_stocks)} stocks.',
+            'stocks_found': len(top_stocks),
+            'current': len(candidate_data),
+            'total': len(candidate_data)
+        })
+    
+    return top_stocks
+
+
+async def screen_stocks(progress: Optional[ProgressReporter] = None,
+                        on_stock: Optional[Callable[[Dict[str, Any]], None]] = None,
+                        streaming: Optional[Callable[[], bool]] = None) -> List[Dict[str, Any]]:
+    """
+    Screen all stocks in universe and return filtered results
+    This is expensive (many API calls), so results are cached by the caller
+    progress publishes each stage/counter change to the progress bus
+    on_stock(stock) is called once for every stock that passes all filters:
+    as soon as it is fetched while streaming() is true (default: always),
+    otherwise from the final filter pass
+    """
+    if progress is None:
+        progress = ProgressReporter(progress_bus)  # Not attached to a job
+    screen_started = time.perf_counter()
     
     print(f"\n{'='*60}")
-    print(f"Starting intelligent stock screening with yfinance")
+    print(f"Starting intelligent stock screening with {market_data.name}")
     print(f"Universe: {UNIVERSE_SOURCE.upper()}")
     print(f"{'='*60}\n")
     
-    progress_state = {
+    progress.set({
         'status': 'running',
         'stage': 'fetching_universe',
         'current': 0,
         'total': 0,
         'message': f'Fetching {UNIVERSE_SOURCE.upper()} stock universe...',
         'stocks_found': 0
-    }
+    })
     
-    # STEP 1: Get stock universe
-    if UNIVERSE_SOURCE == 'sp500':
-        stock_universe = yfinance_service.get_sp500_tickers()
-    elif UNIVERSE_SOURCE == 'nasdaq100':
-        stock_universe = yfinance_service.get_nasdaq100_tickers()
-    elif UNIVERSE_SOURCE == 'both':
-        sp500 = yfinance_service.get_sp500_tickers()
-        nasdaq = yfinance_service.get_nasdaq100_tickers()
-        stock_universe = list(set(sp500 + nasdaq))  # Remove duplicates
-    else:
-        stock_universe = []
+    # STEP 1: Get stock universe (snapshot read; a first-run scrape runs off the event loop)
+    with STAGE_SECONDS.time(stage='universe'):
+        stock_universe = await asyncio.to_thread(get_stock_universe)
     
     if not stock_universe:
-        progress_state = {
+        progress.set({
             'status': 'error',
             'stage': 'error',
             'message': 'Failed to fetch stock universe',
             'stocks_found': 0
-        }
+        })
         raise Exception("Failed to fetch stock universe")
     
     print(f"Universe size: {len(stock_universe)} stocks")
-    progress_state.update({
+    progress.update({
         'total': len(stock_universe),
         'message': f'Found {len(stock_universe)} stocks in universe'
     })
     
+    if SCREENING_MODE == 'queue':
+        return await screen_stocks_queued(stock_universe, progress, on_stock, screen_started)
+    if use_sharding(len(stock_universe)):
+        return await screen_stocks_sharded(stock_universe, progress, on_stock, screen_started)
+    
     # STEP 2: Fast pre-screening (reduces 500 -> ~100 candidates)
-    progress_state.update({
+    progress.update({
         'stage': 'pre_screening',
         'message': f'Pre-screening by market cap ≥ ${stock_filter.MIN_MARKET_CAP/1e9:.0f}B and volume ≥ {stock_filter.MIN_AVG_VOLUME/1e6:.1f}M...'
     })
     
-    candidates = yfinance_service.screen_universe(
-        stock_universe,
-        min_market_cap=stock_filter.MIN_MARKET_CAP,
-        min_volume=stock_filter.MIN_AVG_VOLUME,
-        max_rsi=stock_filter.MAX_RSI + 5  # Slightly relaxed for pre-screen
-    )
+    with STAGE_SECONDS.time(stage='pre_screen'):
+        candidates = await asyncio.to_thread(
+            market_data.screen_universe,
+            stock_universe,
+            min_market_cap=stock_filter.MIN_MARKET_CAP,
+            min_volume=stock_filter.MIN_AVG_VOLUME,
+            max_rsi=stock_filter.MAX_RSI + 5  # Slightly relaxed for pre-screen
+        )
+    TICKERS_SCREENED.inc(len(stock_universe))
     
     if not candidates:
         print("No candidates passed pre-screening")
-        progress_state = {
+        progress.set({
             'status': 'complete',
             'stage': 'complete',
             'message': 'WARNING: 0 stocks passed pre-screening filters. Try adjusting filter criteria.',
             'stocks_found': 0,
             'current': len(stock_universe),
             'total': len(stock_universe)
-        }
+        })
         return []
     
     print(f"\nPre-screening found {len(candidates)} candidates")
-    progress_state.update({
+    progress.update({
         'current': len(stock_universe) - len(candidates),
         'message': f'{len(candidates)} candidates passed pre-screening (filtered out {len(stock_universe) - len(candidates)})'
     })
     print(f"Fetching detailed data for candidates...")
     
     # STEP 3: Fetch detailed data (only for candidates - efficient!)
-    progress_state.update({
+    progress.update({
         'stage': 'fetching_details',
         'total': len(candidates),
         'current': 0,
         'message': f'Fetching detailed data for {len(candidates)} candidates... (2-4 minutes)'
     })
     
-    candidate_data = []
-    for i, ticker in enumerate(candidates, 1):
-        stock_data = yfinance_service.get_stock_data(ticker)
-        if stock_data:
-            candidate_data.append(stock_data)
-        
-        # Update progress every stock
-        progress_state.update({
-            'current': i,
-            'message': f'Analyzing {ticker}... ({i}/{len(candidates)})'
+    # History comes from the local price store; only missing bars are downloaded
+    with STAGE_SECONDS.time(stage='history'):
+        history = await asyncio.to_thread(market_data.get_history, candidates)
+    
+    def fetch_details(ticker: str):
+        return market_data.get_stock_data(
+            ticker, hist=market_data.extract_history(history, ticker)
+        )
+    
+    # Stocks already sent to on_stock while the fetch was running
+    streamed = set()
+    pending: List[Dict[str, Any]] = []
+    flushing: Optional[asyncio.Task] = None
+    
+    async def flush_pending():
+        # Filter whatever arrived since the last flush off the event loop;
+        # batches grow on their own while the engine is busy
+        while pending:
+            batch = pending[:]
+            pending.clear()
+            for result in await asyncio.to_thread(filter_engine.passing, batch):
+                streamed.add(result['symbol'])
+                on_stock(result)
+    
+    def on_fetched(ticker: str, stock_data, completed: int):
+        nonlocal flushing
+        # Update progress as each fetch completes
+        progress.update({
+            'current': completed,
+            'message': f'Analyzed {ticker}... ({completed}/{len(candidates)})'
         })
         
         # Log every 10 stocks
-        if i % 10 == 0:
-            print(f"  Progress: {i}/{len(candidates)} stocks analyzed...")
+        if completed % 10 == 0:
+            print(f"  Progress: {completed}/{len(candidates)} stocks analyzed...")
         
-        # Small delay to allow progress updates
-        await asyncio.sleep(0.01)
+        # Streaming clients see passing stocks while the rest are still fetching
+        if on_stock and stock_data and (streaming is None or streaming()):
+            pending.append(stock_data)
+            if flushing is None or flushing.done():
+                flushing = asyncio.create_task(flush_pending())
+    
+    # Fundamentals are fetched on a bounded worker pool with per-ticker timeouts
+    fetch_started = time.perf_counter()
+    try:
+        candidate_data = await fetch_concurrently(
+            candidates,
+            fetch_details,
+            max_workers=DETAIL_FETCH_WORKERS,
+            timeout=DETAIL_FETCH_TIMEOUT,
+            on_complete=on_fetched
+        )
+    finally:
+        if flushing is not None:
+            await flushing
+    fetch_seconds = time.perf_counter() - fetch_started
+    STAGE_SECONDS.observe(fetch_seconds, stage='detail_fetch')
+    TICKERS_PER_SECOND.set(len(candidates) / max(fetch_seconds, 1e-9), stage='detail_fetch')
     
     print(f"\nFetched data for {len(candidate_data)} stocks")
     print(f"Applying all 12 strict filters...")
     
     # STEP 4: Apply all filters
-    progress_state.update({
+    progress.update({
         'stage': 'filtering',
         'total': len(candidate_data),
         'current': 0,
@@ -215,75 +414,191 @@ async def screen_stocks(force_refresh: bool = False) -> List[Dict[str, Any]]:
         'message': f'Applying 12 strict filters to {len(candidate_data)} stocks...'
     })
     
-    filtered_stocks = []
-    for i, stock_data in enumerate(candidate_data, 1):
-        result = stock_filter.filter_stock(stock_data)
-        if result:
-            filtered_stocks.append(result)
-            print(f"{result['symbol']} passed all filters (score: {result['composite_score']})")
-        
-        # Update progress
-        progress_state.update({
-            'current': i,
-            'stocks_found': len(filtered_stocks),
-            'message': f'Filtering... ({i}/{len(candidate_data)}) - {len(filtered_stocks)} stocks found so far'
-        })
-        
-        # Small delay to allow progress updates
-        await asyncio.sleep(0.01)
+    # Keep the full candidate table so /api/what-if can re-run filters offline
+    await asyncio.to_thread(store_features, candidate_data, len(stock_universe))
     
-    # STEP 5: Sort by composite score (descending)
-    filtered_stocks.sort(key=lambda x: x.get('composite_score', 0), reverse=True)
+    # STEP 4: Columnar filter pass with composite scores (ranked in finish_screen)
+    with STAGE_SECONDS.time(stage='filter'):
+        passing = await asyncio.to_thread(filter_engine.passing, candidate_data)
+    if on_stock:
+        for result in passing:
+            if result['symbol'] not in streamed:
+                on_stock(result)
+    for result in passing:
+        ticker_log("{} passed all filters (score: {})", result['symbol'], result['composite_score'])
     
-    # Take top 5-10
-    top_stocks = filtered_stocks[:10]
+    progress.update({
+        'current': len(candidate_data),
+        'stocks_found': len(passing),
+        'message': f'Filtering complete - {len(passing)} stocks passed'
+    })
     
-    print(f"\n{'='*60}")
-    print(f"Screening complete!")
-    print(f"{len(stock_universe)} stocks screened")
-    print(f"{len(candidates)} candidates identified")
-    print(f"{len(filtered_stocks)} passed all 12 filters")
-    print(f"Top {len(top_stocks)} stocks selected")
-    print(f"{'='*60}\n")
+    return await finish_screen(stock_universe, candidates, candidate_data, passing, progress, screen_started)
+
+
+def store_features(candidate_data: List[Dict[str, Any]], total_screened: int):
+    """
+    Save the candidate feature table (read by /api/what-if and /api/funnel)
+    and report the screen's filter funnel from it
+    Blocking (frame build, pickle, funnel): screens run it on a worker thread
+    """
+    from services.filter_engine import build_feature_frame
+    with STAGE_SECONDS.time(stage='feature_store'):
+        features = build_feature_frame(candidate_data)
+        feature_store.save(features, universe=UNIVERSE_SOURCE, total_screened=total_screened)
+    with STAGE_SECONDS.time(stage='funnel'):
+        funnel = filter_engine.funnel(features)
+    report_funnel(funnel)
+
+
+def report_funnel(funnel: Dict[str, Any]):
+    """Log a filter funnel and publish its pass counts as metrics"""
+    print(f"\nFilter funnel ({funnel['candidates']} candidates):")
+    print(f"  {'filter':<20}{'alone':>7}{'cumul.':>8}{'cut':>6}{'only':>6}")
+    for row in funnel['filters']:
+        print(f"  {row['filter']:<20}{row['pass_independent']:>7}{row['pass_cumulative']:>8}"
+              f"{row['eliminated']:>6}{row['sole_blocker']:>6}")
+        FILTER_PASSES.set(row['pass_independent'], filter=row['filter'], mode='independent')
+        FILTER_PASSES.set(row['pass_cumulative'], filter=row['filter'], mode='cumulative')
+    skippable = funnel['price_filters']['fundamentals_fetches_skippable']
+    print(f"  {skippable} candidates fail a price-history filter (their fundamentals fetch was not needed)")
+    if funnel['near_misses']:
+        misses = ', '.join(f"{m['symbol']} ({m['failed_filter']} by {m['gap']:.1%})" for m in funnel['near_misses'][:5])
+        print(f"  {funnel['near_miss_count']} near misses within {funnel['tolerance']:.0%}: {misses}")
+
+
+def prescreen_thresholds() -> Dict[str, float]:
+    """screen_universe() keyword arguments for the pre-screen"""
+    return {
+        'min_market_cap': stock_filter.MIN_MARKET_CAP,
+        'min_volume': stock_filter.MIN_AVG_VOLUME,
+        'max_rsi': stock_filter.MAX_RSI + 5  # Slightly relaxed for pre-screen
+    }
+
+
+async def screen_stocks_sharded(stock_universe: List[str], progress: ProgressReporter,
+                                on_stock: Optional[Callable[[Dict[str, Any]], None]],
+                                screen_started: float) -> List[Dict[str, Any]]:
+    """
+    Steps 2-5 of screen_stocks() on a process pool, one universe shard per task
+    Each shard's top stocks go to on_stock as the shard finishes
+    """
+    prescreen = prescreen_thresholds()
+    shards = -(-len(stock_universe) // SHARD_SIZE)
+    progress.update({
+        'stage': 'fetching_details',
+        'current': 0,
+        'message': f'Screening {len(stock_universe)} stocks in {shards} shards...'
+    })
+    screened = 0
     
-    # Show top stocks
-    if top_stocks:
-        print("\nTOP OPPORTUNITIES:")
-        for i, stock in enumerate(top_stocks, 1):
-            print(f"  {i}. {stock['symbol']}: Score {stock['composite_score']}/100 | RSI {stock['rsi']:.1f} | {stock['name']}")
+    def on_shard(result: Dict[str, Any], completed: int):
+        nonlocal screened
+        screened += result['tickers']
+        progress.update({
+            'current': screened,
+            'message': f'Screened shard {completed}/{shards} ({screened}/{len(stock_universe)} stocks)'
+        })
+        if on_stock:
+            for stock in result['ranked']:
+                on_stock(stock)
     
-    # Cache results
-    cache_data = {
-        'timestamp': datetime.now().isoformat(),
-        'universe': UNIVERSE_SOURCE,
-        'total_screened': len(stock_universe),
-        'candidates': len(candidates),
-        'passed_filters': len(filtered_stocks),
-        'stocks': top_stocks
-    }
-    save_cache(cache_data)
+    with STAGE_SECONDS.time(stage='sharded_screen'):
+        merged = await screen_sharded(stock_universe, prescreen, top_k=TOP_STOCKS, on_shard=on_shard)
+    return await finish_sharded_screen(stock_universe, merged, progress, screen_started)
+
+
+def log_inline_worker(future: asyncio.Future):
+    """Report an inline queue worker that stopped on an error (it runs fire-and-forget)"""
+    if not future.cancelled() and future.exception() is not None:
+        PROVIDER_ERRORS.inc(provider='work_queue', call='inline_worker')
+        print(f"Inline queue worker stopped: {future.exception()!r}")
+
+
+async def screen_stocks_queued(stock_universe: List[str], progress: ProgressReporter,
+                               on_stock: Optional[Callable[[Dict[str, Any]], None]],
+                               screen_started: float) -> List[Dict[str, Any]]:
+    """
+    Steps 2-5 of screen_stocks() through the shared work queue
+    Shards become queue tasks that any worker sharing the queue can claim;
+    a replica already running the same screen is joined instead. This
+    process works on the tasks too (unless WORK_QUEUE_INLINE_WORKER=0) and
+    aggregates the results once every shard is done or has failed
+    """
+    shards = split_shards(stock_universe)
+    screen_id = await asyncio.to_thread(
+        work_queue.enqueue_screen,
+        f"screen:{UNIVERSE_SOURCE}",
+        [{'tickers': shard} for shard in shards],
+        {'prescreen': prescreen_thresholds(), 'top_k': TOP_STOCKS}
+    )
+    print(f"Queued screen {screen_id}: {len(shards)} shards on {work_queue.db_file}")
+    progress.update({
+        'stage': 'fetching_details',
+        'current': 0,
+        'message': f'Screening {len(stock_universe)} stocks in {len(shards)} queued shards...'
+    })
     
-    # Mark as complete
-    if len(top_stocks) == 0:
-        progress_state = {
-            'status': 'complete',
-            'stage': 'complete',
-            'message': 'WARNING: 0 stocks passed all 12 strict filters. Consider relaxing filter criteria.',
-            'stocks_found': 0,
-            'current': len(candidate_data),
-            'total': len(candidate_data)
-        }
-    else:
-        progress_state = {
-            'status': 'complete',
-            'stage': 'complete',
-            'message': f'Screening complete! Found {len(top_stocks)} stocks.',
-            'stocks_found': len(top_stocks),
-            'current': len(candidate_data),
-            'total': len(candidate_data)
-        }
+    stop = threading.Event()
+    inline_worker = None
+    if QUEUE_INLINE_WORKER:
+        worker = QueueWorker()
+        inline_worker = asyncio.get_running_loop().run_in_executor(None, worker.run, stop, screen_id)
+        inline_worker.add_done_callback(log_inline_worker)
     
-    return top_stocks
+    deadline = time.monotonic() + QUEUE_SCREEN_TIMEOUT
+    reported = -1
+    try:
+        with STAGE_SECONDS.time(stage='queued_screen'):
+            while True:
+                status = await asyncio.to_thread(work_queue.status, screen_id)
+                finished = status['done'] + status['failed']
+                if finished != reported:
+                    reported = finished
+                    progress.update({
+                        'current': finished,
+                        'total': status['total'],
+                        'message': f'Queued shards finished: {finished}/{status["total"]}'
+                    })
+                if finished == status['total']:
+                    break
+                if time.monotonic() > deadline:
+                    # Abandon it, or every replica keeps joining it for JOIN_WITHIN_SECONDS
+                    await asyncio.to_thread(work_queue.finish_screen, screen_id)
+                    raise Exception(f"Queued screen {screen_id} not finished after {QUEUE_SCREEN_TIMEOUT:g}s")
+                await asyncio.sleep(QUEUE_POLL_SECONDS)
+    finally:
+        stop.set()  # The inline worker returns after its current task
+    
+    if status['failed']:
+        print(f"WARNING: {status['failed']} of {status['total']} shards failed, screening without them")
+    results = await asyncio.to_thread(work_queue.results, screen_id)
+    await asyncio.to_thread(work_queue.finish_screen, screen_id)
+    merged = combine_shards([result or empty_shard() for result in results], TOP_STOCKS)
+    if on_stock:
+        for stock in merged['ranked']:
+            on_stock(stock)
+    return await finish_sharded_screen(stock_universe, merged, progress, screen_started)
+
+
+async def finish_sharded_screen(stock_universe: List[str], merged: Dict[str, Any],
+                                progress: ProgressReporter, screen_started: float) -> List[Dict[str, Any]]:
+    """Save the merged shards' feature table, then finish like a single-process screen"""
+    TICKERS_SCREENED.inc(len(stock_universe))
+    candidate_data = merged['stocks']
+    print(f"\nShards found {len(merged['candidates'])} candidates, fetched data for {len(candidate_data)} stocks")
+    
+    await asyncio.to_thread(store_features, candidate_data, len(stock_universe))
+    
+    progress.update({
+        'stage': 'filtering',
+        'total': len(candidate_data),
+        'current': len(candidate_data),
+        'stocks_found': merged['passed'],
+        'message': f'Filtering complete - {merged["passed"]} stocks passed'
+    })
+    return await finish_screen(stock_universe, merged['candidates'], candidate_data, merged['passing'],
+                               progress, screen_started)
 
 
 @app.get("/")
@@ -292,79 +607,304 @@ async def root():
 
 
 @app.get("/api/screening-progress")
-async def screening_progress():
-    """Server-Sent Events endpoint for real-time progress updates"""
+async def screening_progress(job_id: Optional[str] = None):
+    """
+    Server-Sent Events endpoint for real-time progress updates
+    Query param: job_id to follow a specific screening job (defaults to whichever job runs)
+    Pushed from the progress bus as stages publish; ends when the job finishes
+    """
+    if job_id is not None and screening_jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown screening job: {job_id}")
+    
     async def event_generator():
         last_state = None
-        timeout = 300  # 5 minutes max
-        elapsed = 0
-        
-        while elapsed < timeout:
-            # Only send if state changed
-            current_state = progress_state.copy()
-            if current_state != last_state:
-                yield f"data: {json.dumps(current_state)}\n\n"
-                last_state = current_state
-            
-            # Stop streaming when done or error
-            if current_state['status'] in ['complete', 'error']:
-                await asyncio.sleep(1)  # Give time for final update to be sent
-                break
-            
-            await asyncio.sleep(0.5)  # Check every 500ms
-            elapsed += 0.5
+        async for state in progress_bus.subscribe(job_id or ALL_JOBS, heartbeat=PROGRESS_HEARTBEAT_SECONDS):
+            if state is None:
+                yield ": keepalive\n\n"  # SSE comment keeps proxies from closing an idle stream
+            elif state != last_state:
+                yield f"data: {json.dumps(state)}\n\n"
+                last_state = state
     
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
 
+@app.get("/api/daily-stocks/stream")
+async def stream_daily_stocks(force_refresh: bool = False):
+    """
+    Streaming variant of /api/daily-stocks (NDJSON, one event per line)
+    - {"type": "stock", "stock": {...}} as soon as a stock passes all filters
+    - {"type": "summary", "stocks": [...], ...} with the final ranked top stocks
+    - {"type": "error", "message": "..."} if screening fails
+    """
+    events: asyncio.Queue = asyncio.Queue()
+    
+    async def run_screen():
+        try:
+            stocks, job, cached = await get_screen_results(
+                force_refresh=force_refresh,
+                on_stock=lambda stock: events.put_nowait({'type': 'stock', 'stock': stock})
+            )
+            events.put_nowait({
+                'type': 'summary',
+                'job_id': job['id'] if job else None,
+                'stocks': stocks,
+                'count': len(stocks),
+                'universe': UNIVERSE_SOURCE,
+                'last_updated': cached['data']['timestamp'] if cached else datetime.now().isoformat()
+            })
+        except Exception as e:
+            events.put_nowait({'type': 'error', 'message': str(e)})
+        finally:
+            events.put_nowait(None)
+    
+    async def event_stream():
+        # The screening job keeps running (and caches) even if the client disconnects
+        screen_task = asyncio.create_task(run_screen())
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+            yield json.dumps(event) + "\n"
+        await screen_task
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
 @app.get("/api/daily-stocks")
-async def get_daily_stocks(force_refresh: bool = False):
+async def get_daily_stocks(request: Request, force_refresh: bool = False):
     """
     Main endpoint: Return filtered stocks
     Query param: force_refresh=true to bypass cache
+    Cache hits carry an ETag for the cached screen (If-None-Match -> 304)
+    and are sent pre-compressed (br/gzip) when the client accepts it
     """
     try:
-        stocks = await screen_stocks(force_refresh=force_refresh)
+        stocks, job, cached = await get_screen_results(force_refresh=force_refresh)
+        if job is None and cached['stocks_json'] is not None:
+            daily = result_cache.derived(cached, 'daily_stocks', daily_stocks_variants)
+            return cached_response(request, daily['variants'], daily['etag'])
         
-        return JSONResponse(content={
-            'success': True,
-            'stocks': stocks,
-            'count': len(stocks),
-            'last_updated': datetime.now().isoformat(),
-            'universe': UNIVERSE_SOURCE,
-            'filters_applied': {
-                'exchange': 'NYSE/NASDAQ (S&P 500)',
-                'min_market_cap': '$5B',
-                'min_volume': '1.5M shares',
-                'max_rsi': 28,
-                'max_price_vs_52w': '75%',
-                'min_revenue_growth': '10%',
-                'min_eps_growth': '8% OR positive FCF',
-                'min_gross_margin': '30%',
-                'max_debt_to_equity': 0.80,
-                'max_trailing_pe': 25,
-                'max_price_to_sales': 4.0
-            },
-            'scoring_weights': {
-                'rsi_oversold': '35%',
-                'revenue_growth': '25%',
-                'eps_fcf_strength': '20%',
-                'drawdown_severity': '20%'
-            },
-            'methodology': {
-                'step_1': 'Screen S&P 500 (~500 stocks)',
-                'step_2': 'Pre-filter by market cap + volume',
-                'step_3': 'Fetch detailed data for candidates',
-                'step_4': 'Apply all 12 strict filters',
-                'step_5': 'Rank by composite score',
-                'time': '3-5 minutes',
-                'advantage': 'Finds hidden opportunities across entire market'
-            }
-        })
+        last_updated = cached['data']['timestamp'] if cached else datetime.now().isoformat()
+        body = daily_stocks_body(encode_json(stocks), len(stocks), job['id'] if job else None, last_updated)
+        return Response(content=body, media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def threshold_overrides(request: Request, reserved: List[str]) -> Dict[str, float]:
+    """Filter threshold overrides from the query string (any param not in reserved)"""
+    from services.filter_engine import THRESHOLD_NAMES
+    overrides = {}
+    for key, value in request.query_params.items():
+        if key in reserved:
+            continue
+        name = key.upper()
+        if name not in THRESHOLD_NAMES:
+            raise HTTPException(status_code=400, detail=f"Unknown threshold: {key}")
+        try:
+            overrides[name] = float(value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Threshold {key} must be a number")
+    return overrides
+
+
+@app.get("/api/what-if")
+async def what_if(request: Request, limit: int = 10):
+    """
+    Re-run filters and scoring over the last screen's candidate table
+    Query params: any threshold as lowercase name (e.g. max_rsi=32,
+    min_market_cap=2e9), limit=N for how many ranked stocks to return
+    No network calls - answers from the cached feature table
+    """
+    from services.filter_engine import FilterEngine, rank_stocks
+    overrides = threshold_overrides(request, reserved=['limit'])
+    engine = FilterEngine(overrides)
+    
+    def run():
+        # Snapshot load and filter pass block, so they run on a worker thread
+        snapshot = feature_store.load()
+        if snapshot is None:
+            return None
+        meta, features = snapshot
+        started = time.perf_counter()
+        passed = engine.passing(features)
+        stocks = rank_stocks(passed, max(limit, 0))
+        return meta, features, passed, stocks, (time.perf_counter() - started) * 1000
+    
+    result = await asyncio.to_thread(run)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No screen has been run yet - call /api/daily-stocks first")
+    meta, features, passed, stocks, elapsed_ms = result
+    
+    return {
+        'success': True,
+        'overrides': {name.lower(): value for name, value in overrides.items()},
+        'thresholds': {name.lower(): value for name, value in engine.thresholds().items()},
+        'stocks': stocks,
+        'count': len(stocks),
+        'passed_filters': len(passed),
+        'candidates': len(features),
+        'features_as_of': meta['timestamp'],
+        'universe': meta.get('universe'),
+        'elapsed_ms': round(elapsed_ms, 2)
+    }
+
+
+@app.get("/api/funnel")
+async def filter_funnel(request: Request, tolerance: float = 0.10, near_misses: int = 20):
+    """
+    Filter funnel for the last screen's candidates: per filter, how many pass
+    it on its own and together with every filter before it, how many it
+    eliminates and how many it alone blocks, plus near misses (stocks failing
+    one filter by at most tolerance, relative to the threshold)
+    Query params: tolerance=0.10, near_misses=N to list, and any threshold
+    override as in /api/what-if
+    No network calls - answers from the cached feature table
+    """
+    from services.filter_engine import FilterEngine
+    overrides = threshold_overrides(request, reserved=['tolerance', 'near_misses'])
+    if tolerance < 0:
+        raise HTTPException(status_code=400, detail="tolerance must be >= 0")
+    
+    def run():
+        # Snapshot load and funnel compute block, so they run on a worker thread
+        snapshot = feature_store.load()
+        if snapshot is None:
+            return None
+        meta, features = snapshot
+        started = time.perf_counter()
+        report = FilterEngine(overrides).funnel(features, tolerance=tolerance, near_miss_limit=near_misses)
+        return meta, report, (time.perf_counter() - started) * 1000
+    
+    result = await asyncio.to_thread(run)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No screen has been run yet - call /api/daily-stocks first")
+    meta, report, elapsed_ms = result
+    
+    return {
+        'success': True,
+        'overrides': {name.lower(): value for name, value in overrides.items()},
+        **report,
+        'features_as_of': meta['timestamp'],
+        'universe': meta.get('universe'),
+        'elapsed_ms': round(elapsed_ms, 2)
+    }
+
+
+def sector_stats_variants(meta: Dict[str, Any], features) -> Dict[str, Any]:
+    """/api/sector-stats body for a feature snapshot: ETag plus encoded variants"""
+    from services.sector_stats import sector_stats
+    with STAGE_SECONDS.time(stage='sector_stats'):
+        report = sector_stats(features)
+    body = encode_json({
+        'success': True,
+        **report,
+        'candidates_count': len(report['candidates']),
+        'features_as_of': meta['timestamp'],
+        'universe': meta.get('universe'),
+    })
+    return {'etag': content_etag(body), 'variants': build_variants(body)}
+
+
+@app.get("/api/sector-stats")
+async def get_sector_stats(request: Request):
+    """
+    Sector and industry aggregates over the last screen's candidates:
+    count, median and 10/25/75/90th percentiles of RSI, drawdown, P/E, P/S,
+    revenue and EPS growth per group, plus each candidate's values and
+    percentile rank within its sector
+    Computed once per screen from the cached feature table (no data fetches);
+    responses carry an ETag and are sent pre-compressed like /api/daily-stocks
+    """
+    stats = await asyncio.to_thread(feature_store.derived, 'sector_stats', sector_stats_variants)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="No screen has been run yet - call /api/daily-stocks first")
+    return cached_response(request, stats['variants'], stats['etag'])
+
+
+@app.get("/api/results")
+async def get_results(sort: str = 'score', order: Optional[str] = None,
+                      sector: Optional[List[str]] = Query(None), limit: int = 50,
+                      cursor: Optional[str] = None):
+    """
+    Every stock that passed the last screen, one page at a time
+    Query params: sort=score|rsi|pe|drawdown, order=asc|desc (default per
+    key: best first), sector=<name> (repeatable), limit=N (max 500), and
+    cursor=<next_cursor> from the previous page. A cursor keeps its sort,
+    order, sectors and screen, so paging stays consistent when a new screen
+    lands meanwhile. Stocks carry their composite-score rank
+    No screening - answers from the result store
+    """
+    after = None
+    if cursor:
+        try:
+            state = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        screen_id, sort, order, sector = state['screen_id'], state['sort'], state['order'], state['sectors']
+        after = (state['value'], state['rank'])
+    else:
+        screen_id = None
+    if sort not in SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"Unknown sort key: {sort} (use {', '.join(SORT_KEYS)})")
+    order = order or SORT_KEYS[sort][1]
+    if order not in ('asc', 'desc'):
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
+    
+    screen = await asyncio.to_thread(result_store.screen, screen_id)
+    if screen is None:
+        if screen_id:
+            raise HTTPException(status_code=410, detail="Cursor's screen is no longer stored - start again without a cursor")
+        raise HTTPException(status_code=404, detail="No screen has been run yet - call /api/daily-stocks first")
+    
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    page = await asyncio.to_thread(
+        result_store.page, screen['screen_id'], sort, order, sector, limit, after
+    )
+    next_cursor = None
+    if page['next']:
+        next_cursor = encode_cursor({
+            'screen_id': screen['screen_id'], 'sort': sort, 'order': order, 'sectors': sector,
+            'value': page['next'][0], 'rank': page['next'][1]
+        })
+    
+    # Stocks are stored encoded; splice them in rather than decode and re-encode
+    head = encode_json({
+        'success': True,
+        'screen_id': screen['screen_id'],
+        'last_updated': screen['timestamp'],
+        'universe': screen['universe'],
+        'sort': sort,
+        'order': order,
+        'sectors': sector,
+        'total': page['total'],
+        'count': page['count'],
+        'next_cursor': next_cursor,
+    })[:-1]
+    return Response(content=head + b',"stocks":' + page['stocks_json'] + b'}', media_type="application/json")
+
+
+@app.get("/api/screening-jobs")
+async def list_screening_jobs():
+    """Recent screening jobs, newest first"""
+    return {'jobs': screening_jobs.list()}
+
+
+@app.get("/api/screening-jobs/{job_id}")
+async def get_screening_job(job_id: str):
+    """Status and progress of one screening job"""
+    job = screening_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown screening job: {job_id}")
+    return screening_jobs.describe(job)
+
+
+@app.get("/api/metrics")
+async def metrics():
+    """Screener metrics in Prometheus text format (stage/provider latency, errors, cache hits)"""
+    return PlainTextResponse(registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
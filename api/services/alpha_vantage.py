@@ -3,54 +3,234 @@ Alpha Vantage Service - Stock Data Fetching
 Handles all API calls to Alpha Vantage with proper error handling and rate limiting
 """
 
+import asyncio
 import os
-import requests
-import time
-from typing import Dict, List, Optional, Any
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 
+import numpy as np
+import pandas as pd
+
+from .http_client import build_session, build_async_client
+from .indicator_engine import indicator_engine
+from .market_data import MarketDataProvider, PERIOD_DAYS
+from .metrics import PROVIDER_CALL_SECONDS, PROVIDER_ERRORS, CACHE_LOOKUPS, ticker_log
+from .rate_limiter import TokenBucket
+from .response_cache import ResponseCache
+from .universe_store import universe_store, read_universe_file, UNIVERSE_FILE_PREFIX
+
 API_KEY = os.getenv('VITE_ALPHA_VANTAGE_API_KEY', '')
 BASE_URL = 'https://www.alphavantage.co/query'
 
 # Rate limiting: Alpha Vantage free tier = 5 calls/minute, 25 calls/day
-CALL_DELAY = 12  # seconds between calls
+CALLS_PER_MINUTE = 5
+CALLS_PER_DAY = 25
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
 
+# How long a cached response is reused, per API function
+RESPONSE_TTLS = {
+    'GLOBAL_QUOTE': 15 * MINUTE,
+    'TIME_SERIES_DAILY_ADJUSTED': 12 * HOUR,
+    'RSI': 12 * HOUR,
+    'SMA': 12 * HOUR,
+    'OVERVIEW': DAY,
+    'INCOME_STATEMENT': 7 * DAY,
+    'BALANCE_SHEET': 7 * DAY,
+    'CASH_FLOW': 7 * DAY,
+    'EARNINGS': 7 * DAY,
+}
+DEFAULT_TTL = HOUR
 
-class AlphaVantageService:
-    def __init__(self, api_key: str = API_KEY):
+
+class AlphaVantageService(MarketDataProvider):
+    """
+    Alpha Vantage client that spends quota on new data only:
+    - responses are cached on disk per request with a TTL per function
+    - identical requests already in flight share one API call
+    - a token bucket spaces calls to the per-minute limit (await-able from
+      async code), and the daily limit is counted across restarts
+    - calls reuse pooled keep-alive connections (requests.Session for sync
+      callers, httpx.AsyncClient for async ones)
+    Also implements MarketDataProvider, so a screen can run on Alpha Vantage
+    data (within the free tier's daily quota)
+    """
+    
+    name = 'alpha_vantage'
+    
+    def __init__(self, api_key: str = API_KEY, base_url: str = BASE_URL):
         self.api_key = api_key
-        self.last_call_time = 0
+        self.base_url = base_url
+        self.session = build_session()
+        self._async_client = None
+        self._async_loop = None
+        self.bucket = TokenBucket(CALLS_PER_MINUTE, MINUTE)
+        self.cache = ResponseCache('alpha_vantage')
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
     
-    def _rate_limit(self):
-        """Enforce rate limiting between API calls"""
-        elapsed = time.time() - self.last_call_time
-        if elapsed < CALL_DELAY:
-            time.sleep(CALL_DELAY - elapsed)
-        self.last_call_time = time.time()
+    @staticmethod
+    def _cache_key(params: Dict[str, Any]) -> str:
+        """function + symbol + remaining parameters (the API key excluded)"""
+        rest = '&'.join(f"{k}={params[k]}" for k in sorted(params) if k not in ('function', 'symbol', 'apikey'))
+        return f"{params['function']}:{params.get('symbol', '')}:{rest}"
     
-    def _make_request(self, params: Dict[str, str]) -> Optional[Dict]:
-        """Make rate-limited request to Alpha Vantage"""
-        self._rate_limit()
-        params['apikey'] = self.api_key
+    def _lookup(self, params: Dict[str, Any]) -> Tuple[str, Optional[Dict]]:
+        """Cache key for a request and its cached response, if still fresh"""
+        key = self._cache_key(params)
+        cached = self.cache.get(key, RESPONSE_TTLS.get(params['function'], DEFAULT_TTL))
+        CACHE_LOOKUPS.inc(cache='alpha_vantage', result='miss' if cached is None else 'hit')
+        return key, cached
+    
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        """In-flight future for a request, and whether this caller has to make it"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+            future = self._inflight[key] = Future()
+            return future, True
+    
+    def _finish(self, key: str, future: Future, data: Optional[Dict]):
+        with self._lock:
+            self._inflight.pop(key, None)
+        future.set_result(data)
+    
+    def _within_daily_limit(self) -> bool:
+        if self.cache.reserve_call(CALLS_PER_DAY):
+            return True
+        print(f"Alpha Vantage daily limit ({CALLS_PER_DAY} calls) reached, skipping request")
+        return False
+    
+    def _accept(self, key: str, data: Dict, function: str) -> Optional[Dict]:
+        """Check a response for API errors and cache it if it's good"""
+        if 'Error Message' in data:
+            PROVIDER_ERRORS.inc(provider='alpha_vantage', call=function)
+            print(f"API Error: {data['Error Message']}")
+            return None
+        if 'Note' in data or 'Information' in data:
+            PROVIDER_ERRORS.inc(provider='alpha_vantage', call=function)
+            print(f"API Rate Limit: {data.get('Note') or data.get('Information')}")
+            return None
         
+        self.cache.put(key, data)
+        return data
+    
+    def _fetch(self, key: str, params: Dict[str, str]) -> Optional[Dict]:
+        """Make the HTTP call on the pooled session (rate limit already applied)"""
+        params = {**params, 'apikey': self.api_key}
+        
+        function = params['function']
         try:
-            response = requests.get(BASE_URL, params=params, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Check for API error messages
-            if 'Error Message' in data:
-                print(f"API Error: {data['Error Message']}")
-                return None
-            if 'Note' in data:
-                print(f"API Rate Limit: {data['Note']}")
-                return None
-                
-            return data
+            with PROVIDER_CALL_SECONDS.time(provider='alpha_vantage', call=function):
+                response = self.session.get(self.base_url, params=params, timeout=30)
+                response.raise_for_status()
+                data = response.json()
+            return self._accept(key, data, function)
         except Exception as e:
+            PROVIDER_ERRORS.inc(provider='alpha_vantage', call=function)
             print(f"Request failed: {e}")
             return None
     
+    async def _get_async_client(self):
+        """
+        Pooled async client for the running event loop (None without httpx)
+        A client is bound to the loop it was made on, so a new loop gets a new
+        client and the previous one is closed
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            stale, stale_loop = self._async_client, self._async_loop
+            self._async_client = build_async_client()
+            self._async_loop = loop
+            if stale is not None:
+                await self._close_async_client(stale, stale_loop)
+        return self._async_client
+    
+    @staticmethod
+    async def _close_async_client(client, loop: Optional[asyncio.AbstractEventLoop]):
+        """Close a client on its own loop if that is still running, else here"""
+        try:
+            if loop is not None and loop.is_running():
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            else:
+                await client.aclose()
+        except Exception as e:
+            print(f"Error closing Alpha Vantage async client: {e}")
+    
+    async def _fetch_async(self, key: str, params: Dict[str, str]) -> Optional[Dict]:
+        """Async HTTP call on the pooled httpx client"""
+        client = await self._get_async_client()
+        if client is None:
+            return await asyncio.to_thread(self._fetch, key, params)
+        
+        params = {**params, 'apikey': self.api_key}
+        function = params['function']
+        try:
+            with PROVIDER_CALL_SECONDS.time(provider='alpha_vantage', call=function):
+                response = await client.get(self.base_url, params=params)
+                response.raise_for_status()
+                data = response.json()
+            # _accept() writes good responses to the SQLite cache
+            return await asyncio.to_thread(self._accept, key, data, function)
+        except Exception as e:
+            PROVIDER_ERRORS.inc(provider='alpha_vantage', call=function)
+            print(f"Request failed: {e}")
+            return None
+    
+    def _make_request(self, params: Dict[str, str]) -> Optional[Dict]:
+        """Cached, coalesced, rate-limited request (waits on the calling thread)"""
+        key, cached = self._lookup(params)
+        if cached is not None:
+            return cached
+        
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        
+        data = None
+        try:
+            if self._within_daily_limit():
+                self.bucket.acquire()
+                data = self._fetch(key, params)
+        finally:
+            self._finish(key, future, data)
+        return data
+    
+    async def _make_request_async(self, params: Dict[str, str]) -> Optional[Dict]:
+        """
+        Same as _make_request, but never blocks the event loop: the cache
+        lookup and the daily-quota reservation (SQLite, possibly waiting on
+        a write lock) run in a worker thread, the rate limit is awaited
+        """
+        key, cached = await asyncio.to_thread(self._lookup, params)
+        if cached is not None:
+            return cached
+        
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        
+        data = None
+        try:
+            if await asyncio.to_thread(self._within_daily_limit):
+                await self.bucket.acquire_async()
+                data = await self._fetch_async(key, params)
+        finally:
+            self._finish(key, future, data)
+        return data
+    
+    async def fetch(self, function: str, symbol: str, **params) -> Optional[Dict]:
+        """
+        Raw response for any API function, for async callers
+        e.g. await alpha_vantage.fetch('OVERVIEW', 'AAPL')
+        """
+        return await self._make_request_async({'function': function, 'symbol': symbol, **params})
+    
     def get_global_quote(self, symbol: str) -> Optional[Dict]:
         """Get current price and basic quote data"""
         params = {
@@ -146,6 +326,144 @@ class AlphaVantageService:
             'symbol': symbol
         }
         return self._make_request(params)
+    
+    # ---- MarketDataProvider ----
+    
+    @staticmethod
+    def _number(value: Any) -> Optional[float]:
+        """Alpha Vantage sends numbers as strings, with 'None' / '-' for missing"""
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None
+        return None if np.isnan(number) else number
+    
+    def get_universe(self, source: str) -> List[str]:
+        """
+        Alpha Vantage has no index membership endpoint, so this serves the
+        last stored universe snapshot (written by the yfinance provider)
+        """
+        if source.startswith(UNIVERSE_FILE_PREFIX):
+            return read_universe_file(source[len(UNIVERSE_FILE_PREFIX):])
+        names = ['sp500', 'nasdaq100'] if source == 'both' else [source]
+        tickers = set()
+        for name in names:
+            snapshot = universe_store.load(name)
+            if snapshot is None:
+                print(f"No stored {name} universe snapshot for Alpha Vantage")
+                continue
+            tickers.update(snapshot['tickers'])
+        return sorted(tickers)
+    
+    def _daily_history(self, symbol: str) -> pd.DataFrame:
+        """Split/dividend-adjusted daily OHLCV (same convention as yfinance auto_adjust)"""
+        series = self.get_daily_adjusted(symbol, outputsize='full')
+        if not series:
+            return pd.DataFrame()
+        
+        raw = pd.DataFrame.from_dict(series, orient='index').astype(float)
+        raw.index = pd.to_datetime(raw.index)
+        raw = raw.sort_index()
+        factor = raw['5. adjusted close'] / raw['4. close']
+        return pd.DataFrame({
+            'Open': raw['1. open'] * factor,
+            'High': raw['2. high'] * factor,
+            'Low': raw['3. low'] * factor,
+            'Close': raw['5. adjusted close'],
+            'Volume': raw['6. volume'],
+        })
+    
+    def get_history(self, symbols: List[str], period: str = '1y') -> pd.DataFrame:
+        """Daily history per symbol (one API call each, cached 12h)"""
+        start = pd.Timestamp.now().normalize() - pd.Timedelta(days=PERIOD_DAYS.get(period, 366))
+        frames = {}
+        for symbol in dict.fromkeys(symbols):
+            bars = self._daily_history(symbol)
+            if not bars.empty:
+                frames[symbol] = bars[bars.index >= start]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1).sort_index()
+    
+    def screen_universe(self, tickers: List[str],
+                        min_market_cap: float = 5e9,
+                        min_volume: float = 1.5e6,
+                        max_rsi: float = 30) -> List[str]:
+        """
+        Market cap (OVERVIEW) and 20-day volume pre-screen
+        Costs two calls per uncached ticker, so the free tier only covers a
+        handful of tickers per day
+        """
+        candidates = []
+        for symbol in tickers:
+            overview = self.get_company_overview(symbol) or {}
+            market_cap = self._number(overview.get('MarketCapitalization')) or 0
+            if market_cap < min_market_cap:
+                continue
+            bars = self._daily_history(symbol)
+            if not bars.empty and bars['Volume'].tail(20).mean() >= min_volume:
+                candidates.append(symbol)
+        print(f"Pre-screening complete: {len(candidates)} candidates from {len(tickers)} stocks")
+        return candidates
+    
+    def get_stock_data(self, symbol: str, period: str = '1y',
+                       hist: Optional[pd.DataFrame] = None) -> Optional[Dict[str, Any]]:
+        """Feature dict from OVERVIEW, balance sheet, cash flow and daily history"""
+        try:
+            if hist is None:
+                hist = self.extract_history(self.get_history([symbol], period=period), symbol)
+            overview = self.get_company_overview(symbol)
+            if hist.empty or not overview or not overview.get('Symbol'):
+                ticker_log("  No Alpha Vantage data for {}", symbol)
+                return None
+            
+            # Separate indicator state so it never mixes with Yahoo's series
+            indicators = indicator_engine.compute(f"{self.name}:{symbol}", hist)
+            
+            number = self._number
+            revenue_ttm = number(overview.get('RevenueTTM'))
+            gross_profit_ttm = number(overview.get('GrossProfitTTM'))
+            
+            debt_to_equity = None
+            balance = self.get_balance_sheet(symbol) or {}
+            if balance.get('annualReports'):
+                latest = balance['annualReports'][0]
+                debt = number(latest.get('shortLongTermDebtTotal'))
+                equity = number(latest.get('totalShareholderEquity'))
+                if debt is not None and equity and equity > 0:
+                    debt_to_equity = debt / equity
+            
+            free_cash_flow = 0
+            cash_flow = self.get_cash_flow(symbol) or {}
+            if cash_flow.get('annualReports'):
+                latest = cash_flow['annualReports'][0]
+                free_cash_flow = (number(latest.get('operatingCashflow')) or 0) - (number(latest.get('capitalExpenditures')) or 0)
+            
+            return {
+                'symbol': symbol,
+                'name': overview.get('Name', symbol),
+                'current_price': float(indicators['current_price']),
+                'market_cap': number(overview.get('MarketCapitalization')) or 0,
+                'rsi': indicators['rsi'],
+                'sma_20': indicators['sma_20'],
+                'sma_200': indicators['sma_200'],
+                'high_52w': float(indicators['high_52w']),
+                'low_52w': float(indicators['low_52w']),
+                'avg_volume': float(indicators['avg_volume']),
+                'revenue_growth': number(overview.get('QuarterlyRevenueGrowthYOY')),
+                'eps_growth': number(overview.get('QuarterlyEarningsGrowthYOY')),
+                'gross_margin': gross_profit_ttm / revenue_ttm if gross_profit_ttm is not None and revenue_ttm else None,
+                'debt_to_equity': debt_to_equity,
+                'pe_ratio': number(overview.get('PERatio')),
+                'price_to_sales': number(overview.get('PriceToSalesRatioTTM')),
+                'free_cash_flow': free_cash_flow,
+                'sector': overview.get('Sector', 'Unknown'),
+                'industry': overview.get('Industry', 'Unknown'),
+                'exchange': overview.get('Exchange', 'Unknown')
+            }
+        except Exception as e:
+            print(f"  Error fetching {symbol}: {e}")
+            return None
 
 
 # Singleton instance
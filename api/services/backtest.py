@@ -0,0 +1,325 @@
+"""
+Backtest Engine - Historical replay of the oversold-value screen
+Rebuilds the price-derived filters (RSI, 52-week high, SMA 20/200, average
+volume) for every trading day and every ticker as whole date x ticker
+matrices, ranks each rebalance day's passing tickers by the price part of
+composite_score, and reports forward returns of the top-K picks
+
+Fundamental filters (market cap, growth, margins, valuation) are not
+replayed: Yahoo only exposes today's values, and applying them to past
+dates would leak future information
+
+Usage (from api/):
+    python -m services.backtest --universe sp500 --period 5y --top-k 10 --max-rsi 32
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .filter_engine import FilterEngine
+from .indicator_engine import RSI_WINDOW, SMA_SHORT, SMA_LONG, VOLUME_WINDOW, EXTREMES_WINDOW
+from .market_data import PERIOD_DAYS
+from .price_store import price_store
+
+# Forward return horizons in trading days (~1 week, 1 month, 1 quarter)
+HORIZONS = [5, 21, 63]
+DEFAULT_TOP_K = 10
+REBALANCE_DAYS = 21  # Pick a new portfolio roughly monthly
+
+# Thresholds that only involve price/volume data (the rest need fundamentals)
+PRICE_THRESHOLDS = [
+    'MIN_AVG_VOLUME',
+    'MAX_RSI',
+    'MAX_PRICE_VS_52W_HIGH',
+    'MIN_PRICE_VS_200D_SMA',
+]
+
+# Trading days per year, for annualizing the rebalance equity curve
+TRADING_DAYS = 252
+
+
+def price_matrices(history: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Split a (symbol, field) history frame (price_store.load / get_history)
+    into one date x symbol matrix per OHLCV field
+    """
+    return {
+        field: history.xs(field, axis=1, level=1).sort_index(axis=1)
+        for field in ('High', 'Low', 'Close', 'Volume')
+    }
+
+
+def indicator_matrices(prices: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """
+    Every indicator get_stock_data() uses, for every day and ticker at once
+    Same definitions as IndicatorEngine (Wilder RSI seeded by the first bar,
+    SMAs need a full window, 52-week extremes over the last 252 bars)
+    """
+    close = prices['Close']
+    listed = close.notna()
+
+    # Wilder RSI: the first bar of each ticker contributes a zero change
+    diff = close.diff()
+    first_bar = listed & diff.isna()
+    gain = diff.clip(lower=0).mask(first_bar, 0.0)
+    loss = (-diff).clip(lower=0).mask(first_bar, 0.0)
+    avg_gain = gain.ewm(alpha=1 / RSI_WINDOW, min_periods=RSI_WINDOW, adjust=False).mean()
+    avg_loss = loss.ewm(alpha=1 / RSI_WINDOW, min_periods=RSI_WINDOW, adjust=False).mean()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = (100 - 100 / (1 + avg_gain / avg_loss)).mask(avg_loss == 0, 100.0)
+
+    return {
+        'current_price': close,
+        'rsi': rsi.where(listed),
+        'sma_20': close.rolling(SMA_SHORT).mean(),
+        'sma_200': close.rolling(SMA_LONG).mean(),
+        'high_52w': prices['High'].rolling(EXTREMES_WINDOW, min_periods=1).max().where(listed),
+        'avg_volume': prices['Volume'].rolling(VOLUME_WINDOW, min_periods=1).mean().where(listed),
+    }
+
+
+# Indicators get_stock_data() reports as None when NaN (or, for sma_200, 0);
+# the rest are passed through float(), so a NaN there is a (truthy) value
+NONE_WHEN_NAN = ['rsi', 'sma_20', 'sma_200']
+
+
+def indicator_flags(indicators: Dict[str, pd.DataFrame]) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    FilterEngine._flags() for every indicator matrix, with missing/truthy
+    set the way build_feature_frame() would for the get_stock_data() row
+    of that day and ticker
+    """
+    flags = {}
+    for name, frame in indicators.items():
+        value = frame.to_numpy(dtype=float)
+        missing = np.isnan(value) if name in NONE_WHEN_NAN else np.zeros(value.shape, bool)
+        if name == 'sma_200':
+            missing |= value == 0
+        flags[name] = {
+            'value': value,
+            'missing': missing,
+            'real': ~missing,
+            'truthy': ~missing & (value != 0),  # bool(nan) is True
+        }
+    return flags
+
+
+def _row_mean(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Mean of each row's masked values (NaN for rows with none)"""
+    counts = mask.sum(axis=1)
+    totals = np.where(mask, values, 0.0).sum(axis=1)
+    return np.where(counts > 0, totals / np.maximum(counts, 1), np.nan)
+
+
+def forward_returns(close: pd.DataFrame, horizon: int) -> np.ndarray:
+    """Return from each day's close to the close `horizon` trading days later"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (close.shift(-horizon) / close - 1).to_numpy()
+
+
+class Backtester:
+    """
+    Vectorized replay of the screen's price-derived filters
+
+    Thresholds default to the StockFilter constants; overrides work like
+    FilterEngine (e.g. {'MAX_RSI': 32})
+    """
+
+    def __init__(self, overrides: Optional[Dict[str, float]] = None,
+                 top_k: int = DEFAULT_TOP_K, horizons: Optional[List[int]] = None,
+                 rebalance_days: int = REBALANCE_DAYS):
+        self.engine = FilterEngine(overrides)
+        self.top_k = top_k
+        self.horizons = horizons or HORIZONS
+        self.rebalance_days = rebalance_days
+
+    def signals(self, indicators: Dict[str, pd.DataFrame]):
+        """
+        (passed, score) date x ticker arrays
+        passed is FilterEngine.price_masks() over the day's indicators, i.e.
+        what filter_masks() decides for the price filters on a live screen;
+        score is the RSI (35%) + drawdown (20%) part of composite_score
+        """
+        engine = self.engine
+        f = indicator_flags(indicators)
+        price, rsi, high = f['current_price']['value'], f['rsi']['value'], f['high_52w']
+
+        masks = engine.price_masks(f)
+        passed = ~np.isnan(price)  # Listed that day (get_stock_data() needs history)
+        for mask in masks.values():
+            passed &= mask
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            price_vs_52w = price / high['value']
+            rsi_part = (engine.MAX_RSI - rsi) / engine.MAX_RSI * 35
+            # Same guard as FilterEngine.score() (a NaN ratio is truthy)
+            drawdown_part = np.where(
+                high['truthy'] & (price_vs_52w != 0),
+                (engine.MAX_PRICE_VS_52W_HIGH - price_vs_52w) / engine.MAX_PRICE_VS_52W_HIGH * 20,
+                0.0
+            )
+
+        return passed, rsi_part + drawdown_part
+
+    def run(self, history: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Backtest over a (symbol, field) history frame
+        The first 252 bars only warm up the indicators; picks are made every
+        rebalance_days after that
+        """
+        started = time.perf_counter()
+        prices = price_matrices(history)
+        close = prices['Close']
+        dates, symbols = close.index, close.columns
+
+        indicators = indicator_matrices(prices)
+        passed, score = self.signals(indicators)
+
+        rows = np.arange(EXTREMES_WINDOW, len(dates), self.rebalance_days)
+        if len(rows) == 0:
+            raise ValueError(f"Need more than {EXTREMES_WINDOW} bars of history, got {len(dates)}")
+
+        # Top-K per rebalance day: rank scores with failing tickers pushed to -inf
+        ranked = np.where(passed[rows], score[rows], -np.inf)
+        order = np.argsort(-ranked, axis=1, kind='stable')[:, :self.top_k]
+        picked = np.take_along_axis(ranked, order, axis=1) > -np.inf
+
+        report_horizons = {}
+        for horizon in self.horizons:
+            fwd = forward_returns(close, horizon)[rows]
+            pick_returns = np.take_along_axis(fwd, order, axis=1)
+            valid = picked & ~np.isnan(pick_returns)
+            values = pick_returns[valid]
+            benchmark = _row_mean(fwd, ~np.isnan(fwd))
+            days = valid.any(axis=1)
+            day_means = _row_mean(pick_returns, valid)
+            report_horizons[horizon] = {
+                'picks': int(valid.sum()),
+                'days_with_picks': int(days.sum()),
+                'mean_return': float(values.mean()) if values.size else None,
+                'median_return': float(np.median(values)) if values.size else None,
+                'hit_rate': float((values > 0).mean()) if values.size else None,
+                'benchmark_mean_return': float(np.nanmean(benchmark[days])) if days.any() else None,
+                'excess_return': float(np.nanmean(day_means[days] - benchmark[days])) if days.any() else None,
+            }
+
+        equity = self._equity_curve(close, rows, order, picked)
+
+        rebalances = [
+            {
+                'date': dates[row].strftime('%Y-%m-%d'),
+                'picks': [symbols[i] for i, ok in zip(order[n], picked[n]) if ok]
+            }
+            for n, row in enumerate(rows)
+        ]
+
+        return {
+            'start': dates[rows[0]].strftime('%Y-%m-%d'),
+            'end': dates[-1].strftime('%Y-%m-%d'),
+            'trading_days': len(dates) - EXTREMES_WINDOW,
+            'tickers': len(symbols),
+            'top_k': self.top_k,
+            'rebalance_days': self.rebalance_days,
+            'thresholds': {name: getattr(self.engine, name) for name in PRICE_THRESHOLDS},
+            'signal_days': int(passed[EXTREMES_WINDOW:].any(axis=1).sum()),
+            'horizons': report_horizons,
+            'equity': equity,
+            'rebalances': rebalances,
+            'elapsed_seconds': round(time.perf_counter() - started, 3)
+        }
+
+    def _equity_curve(self, close: pd.DataFrame, rows: np.ndarray,
+                      order: np.ndarray, picked: np.ndarray) -> Dict[str, Any]:
+        """
+        Equal-weight the picks from one rebalance day to the next (cash when
+        nothing passes), against an equal-weight hold of the whole universe
+        """
+        fwd = forward_returns(close, self.rebalance_days)[rows]
+        pick_returns = np.take_along_axis(fwd, order, axis=1)
+        valid = picked & ~np.isnan(pick_returns)
+        period = np.nan_to_num(_row_mean(pick_returns, valid))
+        benchmark = np.nan_to_num(_row_mean(fwd, ~np.isnan(fwd)))
+
+        # The last rebalance may not have a full period of prices after it
+        complete = rows + self.rebalance_days < len(close.index)
+        period, benchmark = period[complete], benchmark[complete]
+        if not len(period):
+            return {'periods': 0}
+
+        curve = np.cumprod(1 + period)
+        years = len(period) * self.rebalance_days / TRADING_DAYS
+        return {
+            'periods': int(len(period)),
+            'total_return': float(curve[-1] - 1),
+            'annualized_return': float(curve[-1] ** (1 / years) - 1),
+            'max_drawdown': float((curve / np.maximum.accumulate(curve) - 1).min()),
+            'benchmark_total_return': float(np.prod(1 + benchmark) - 1),
+        }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Backtest the screen's price-derived filters")
+    parser.add_argument('--universe', default='sp500', help="sp500, nasdaq100 or both")
+    parser.add_argument('--period', default='5y', help="History to replay (2y, 5y, 10y)")
+    parser.add_argument('--offline', action='store_true', help="Use only bars already in the price store")
+    parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K)
+    parser.add_argument('--rebalance-days', type=int, default=REBALANCE_DAYS)
+    parser.add_argument('--horizons', default=','.join(map(str, HORIZONS)),
+                        help="Forward return horizons in trading days, comma separated")
+    parser.add_argument('--output', help="Write the full JSON report here")
+    for name in PRICE_THRESHOLDS:
+        parser.add_argument('--' + name.lower().replace('_', '-'), type=float, dest=name)
+    args = parser.parse_args(argv)
+
+    overrides = {name: getattr(args, name) for name in PRICE_THRESHOLDS if getattr(args, name) is not None}
+
+    # Imported here so the engine itself doesn't pull in a data provider
+    from .providers import market_data
+    symbols = market_data.get_universe(args.universe)
+    if args.offline:
+        start = pd.Timestamp.now().normalize() - pd.Timedelta(days=PERIOD_DAYS.get(args.period, 1827))
+        history = price_store.load(symbols, start=start)
+    else:
+        history = market_data.get_history(symbols, period=args.period)
+    if history.empty:
+        raise SystemExit("No price history available")
+
+    backtester = Backtester(
+        overrides,
+        top_k=args.top_k,
+        horizons=[int(h) for h in args.horizons.split(',')],
+        rebalance_days=args.rebalance_days
+    )
+    report = backtester.run(history)
+
+    print(f"\n{'='*60}")
+    print(f"Backtest {report['start']} -> {report['end']} | {report['tickers']} tickers | top {report['top_k']}")
+    print(f"Thresholds: {report['thresholds']}")
+    print(f"Days with at least one pass: {report['signal_days']}/{report['trading_days']}")
+    print(f"{'='*60}")
+    for horizon, stats in report['horizons'].items():
+        if stats['mean_return'] is None:
+            print(f"  {horizon:>3}d: no picks")
+            continue
+        print(f"  {horizon:>3}d: mean {stats['mean_return']:+.2%} | median {stats['median_return']:+.2%} | "
+              f"hit {stats['hit_rate']:.0%} | vs universe {stats['excess_return']:+.2%} | {stats['picks']} picks")
+    equity = report['equity']
+    if equity['periods']:
+        print(f"  Rebalanced every {report['rebalance_days']}d: total {equity['total_return']:+.1%} "
+              f"(annualized {equity['annualized_return']:+.1%}, max drawdown {equity['max_drawdown']:.1%}) "
+              f"vs universe {equity['benchmark_total_return']:+.1%}")
+    print(f"Computed in {report['elapsed_seconds']}s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
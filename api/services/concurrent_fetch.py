@@ -0,0 +1,100 @@
+"""
+Concurrent Fetch Stage - Runs blocking per-ticker fetches on worker threads
+Keeps the event loop free so progress and health endpoints stay responsive
+while a screen is running
+"""
+
+import os
+import asyncio
+import threading
+from typing import Any, Callable, List, Optional
+
+from .metrics import FETCH_TIMEOUTS, PROVIDER_ERRORS, ticker_log
+
+# Parallelism and per-ticker timeout (override via environment)
+DETAIL_FETCH_WORKERS = int(os.getenv('DETAIL_FETCH_WORKERS', '8'))
+DETAIL_FETCH_TIMEOUT = float(os.getenv('DETAIL_FETCH_TIMEOUT', '30'))
+
+
+def _start_thread(loop: asyncio.AbstractEventLoop, fn: Callable[[str], Optional[Any]],
+                  ticker: str) -> asyncio.Future:
+    """
+    Run fn(ticker) on a new daemon thread; the returned future resolves on loop
+    A fetch that hangs past its timeout keeps only its own thread, so later
+    tickers never queue behind it
+    """
+    future = loop.create_future()
+
+    def resolve(result, error):
+        if not future.done():  # Abandoned after a timeout
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def run():
+        try:
+            result, error = fn(ticker), None
+        except Exception as e:
+            result, error = None, e
+        try:
+            loop.call_soon_threadsafe(resolve, result, error)
+        except RuntimeError:  # The loop closed while this fetch was hung
+            pass
+
+    threading.Thread(target=run, name=f'detail-fetch-{ticker}', daemon=True).start()
+    return future
+
+
+async def fetch_concurrently(
+    tickers: List[str],
+    fetch_fn: Callable[[str], Optional[Any]],
+    max_workers: int = DETAIL_FETCH_WORKERS,
+    timeout: float = DETAIL_FETCH_TIMEOUT,
+    on_complete: Optional[Callable[[str, Optional[Any], int], None]] = None
+) -> List[Any]:
+    """
+    Run fetch_fn(ticker) for every ticker on worker threads
+
+    - At most max_workers fetches are in flight at once
+    - A fetch running longer than timeout seconds is abandoned (counted as no
+      data) and frees its slot; its thread finishes on its own, and the next
+      ticker starts on a fresh thread
+    - on_complete(ticker, result, completed_count) fires as each fetch finishes
+
+    Returns the non-empty results in the same order as tickers
+    """
+    if not tickers:
+        return []
+
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max(1, max_workers))
+    results: List[Optional[Any]] = [None] * len(tickers)
+
+    async def run_one(index: int, ticker: str):
+        async with semaphore:
+            try:
+                result = await asyncio.wait_for(_start_thread(loop, fetch_fn, ticker), timeout=timeout)
+            except asyncio.TimeoutError:
+                FETCH_TIMEOUTS.inc()
+                ticker_log("  Timed out fetching {} after {:g}s", ticker, timeout)
+                result = None
+            except Exception as e:
+                PROVIDER_ERRORS.inc(provider='detail_fetch', call=getattr(fetch_fn, '__name__', 'fetch'))
+                ticker_log("  Error fetching {}: {}", ticker, e)
+                result = None
+        results[index] = result
+        return ticker, result
+
+    tasks = [asyncio.create_task(run_one(i, t)) for i, t in enumerate(tickers)]
+    try:
+        for completed, next_done in enumerate(asyncio.as_completed(tasks), 1):
+            ticker, result = await next_done
+            if on_complete:
+                on_complete(ticker, result, completed)
+    finally:
+        # on_complete raised or the caller was cancelled: don't leave fetches queued
+        for task in tasks:
+            task.cancel()
+
+    return [r for r in results if r]
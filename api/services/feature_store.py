@@ -0,0 +1,92 @@
+"""
+Feature Store - Candidate feature table from the last full screen
+Persists the build_feature_frame() table so filters and scoring can be
+re-run with different thresholds without fetching anything from Yahoo
+"""
+
+import os
+import pickle
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+FEATURES_FILE = Path(__file__).parent.parent / "cache" / "features.pkl"
+
+
+class FeatureStore:
+    """
+    Single snapshot: {'meta': {...}, 'frame': DataFrame}
+    Kept in memory after the first read and reloaded only when the file
+    changes (another worker finished a screen); derived() memoizes values
+    computed from a snapshot until the next screen
+    """
+
+    def __init__(self, path: Path = FEATURES_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._loaded: Optional[Tuple[float, Dict[str, Any], pd.DataFrame]] = None
+        self._derived_lock = threading.Lock()
+        self._derived: Dict[str, Tuple[str, Any]] = {}  # name -> (snapshot timestamp, value)
+
+    def save(self, frame: pd.DataFrame, **meta) -> Dict[str, Any]:
+        """Write the feature table atomically (temp file + rename)"""
+        meta = {'timestamp': datetime.now().isoformat(), 'rows': len(frame), **meta}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            with open(tmp, 'wb') as f:
+                pickle.dump({'meta': meta, 'frame': frame}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"Error saving feature table: {e}")
+            tmp.unlink(missing_ok=True)
+            return meta
+
+        with self._lock:
+            self._loaded = (self.path.stat().st_mtime, meta, frame)
+        return meta
+
+    def load(self) -> Optional[Tuple[Dict[str, Any], pd.DataFrame]]:
+        """(meta, frame) of the last screen, or None if no screen has run yet"""
+        try:
+            mtime = self.path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            if self._loaded is not None and self._loaded[0] == mtime:
+                return self._loaded[1], self._loaded[2]
+
+        try:
+            with open(self.path, 'rb') as f:
+                snapshot = pickle.load(f)
+        except Exception as e:
+            print(f"Error loading feature table: {e}")
+            return None
+
+        with self._lock:
+            self._loaded = (mtime, snapshot['meta'], snapshot['frame'])
+        return snapshot['meta'], snapshot['frame']
+
+    def derived(self, name: str, build: Callable[[Dict[str, Any], pd.DataFrame], Any]) -> Optional[Any]:
+        """
+        build(meta, frame) for the current snapshot, computed once per screen
+        (e.g. sector aggregates); None if no screen has run yet
+        """
+        snapshot = self.load()
+        if snapshot is None:
+            return None
+        meta, frame = snapshot
+        with self._derived_lock:
+            memo = self._derived.get(name)
+            if memo is None or memo[0] != meta['timestamp']:
+                memo = (meta['timestamp'], build(meta, frame))
+                self._derived[name] = memo
+            return memo[1]
+
+
+# Singleton instance
+feature_store = FeatureStore()
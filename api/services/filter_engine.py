@@ -0,0 +1,446 @@
+"""
+Vectorized Filter Engine - Columnar version of StockFilter.filter_stock
+Applies the 12 strict filters as boolean masks over every candidate at once
+and computes composite_score with array math
+
+Produces the same pass/fail decisions, scores and ranking as calling
+filter_stock() on each stock, without a Python loop or per-stock logging
+"""
+
+import heapq
+from numbers import Real
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Union
+
+import numpy as np
+import pandas as pd
+
+from .stock_filter import StockFilter
+
+# Threshold constants read from StockFilter (overridable per engine instance)
+THRESHOLD_NAMES = [
+    'MIN_MARKET_CAP',
+    'MIN_AVG_VOLUME',
+    'MAX_RSI',
+    'MAX_PRICE_VS_52W_HIGH',
+    'MIN_PRICE_VS_200D_SMA',
+    'MIN_REVENUE_GROWTH',
+    'MIN_EPS_GROWTH',
+    'MAX_DEBT_TO_EQUITY',
+    'MAX_PRICE_TO_SALES',
+    'MIN_GROSS_MARGIN',
+    'MAX_TRAILING_PE',
+]
+
+# Numeric feature columns produced by get_stock_data()
+NUMERIC_COLUMNS = [
+    'current_price', 'market_cap', 'rsi', 'sma_20', 'sma_200',
+    'high_52w', 'low_52w', 'avg_volume', 'revenue_growth', 'eps_growth',
+    'gross_margin', 'debt_to_equity', 'pe_ratio', 'price_to_sales',
+    'free_cash_flow',
+]
+
+TEXT_COLUMNS = ['symbol', 'name', 'sector', 'industry']
+
+# Keys filter_stock() reads with stock_data[key] rather than .get()
+REQUIRED_KEYS = ['current_price', 'market_cap', 'avg_volume', 'name']
+
+# Filter names in filter_stock() order (1-12)
+FILTER_NAMES = [
+    'market_cap',
+    'avg_volume',
+    'rsi',
+    'price_vs_52w_high',
+    'sma_20',
+    'sma_200',
+    'revenue_growth',
+    'eps_or_fcf',
+    'debt_to_equity',
+    'gross_margin',
+    'trailing_pe',
+    'price_to_sales',
+]
+
+# Where each filter's inputs come from: 'price' filters need only the stored
+# price history, 'fundamentals' ones the (slow, rate-limited) Ticker.info fetch
+FILTER_SOURCES = {
+    'market_cap': 'fundamentals',
+    'avg_volume': 'price',
+    'rsi': 'price',
+    'price_vs_52w_high': 'price',
+    'sma_20': 'price',
+    'sma_200': 'price',
+    'revenue_growth': 'fundamentals',
+    'eps_or_fcf': 'fundamentals',
+    'debt_to_equity': 'fundamentals',
+    'gross_margin': 'fundamentals',
+    'trailing_pe': 'fundamentals',
+    'price_to_sales': 'fundamentals',
+}
+
+# Threshold each filter compares against (sma_20 compares price with the SMA itself)
+FILTER_THRESHOLDS = {
+    'market_cap': 'MIN_MARKET_CAP',
+    'avg_volume': 'MIN_AVG_VOLUME',
+    'rsi': 'MAX_RSI',
+    'price_vs_52w_high': 'MAX_PRICE_VS_52W_HIGH',
+    'sma_20': None,
+    'sma_200': 'MIN_PRICE_VS_200D_SMA',
+    'revenue_growth': 'MIN_REVENUE_GROWTH',
+    'eps_or_fcf': 'MIN_EPS_GROWTH',
+    'debt_to_equity': 'MAX_DEBT_TO_EQUITY',
+    'gross_margin': 'MIN_GROSS_MARGIN',
+    'trailing_pe': 'MAX_TRAILING_PE',
+    'price_to_sales': 'MAX_PRICE_TO_SALES',
+}
+
+# A stock failing a single filter by at most this relative gap is a near miss
+NEAR_MISS_TOLERANCE = 0.10
+
+
+def build_feature_frame(stocks: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Build the candidate feature table from get_stock_data() rows
+    Each numeric column holds the value as a float (NaN when it is None or
+    not a real number, e.g. 'Infinity'), plus the flags filter_stock()'s
+    Python semantics depend on: '<column>_missing' (None / absent key),
+    '<column>_invalid' (present but not a number) and '<column>_truthy'
+    (bool(value), so NaN counts as set and 0 as unset)
+    """
+    frame = pd.DataFrame({
+        column: [s.get(column, 'Unknown' if column in ('sector', 'industry') else None) for s in stocks]
+        for column in TEXT_COLUMNS
+    })
+
+    for column in NUMERIC_COLUMNS:
+        # filter_stock() defaults a missing free_cash_flow key to 0
+        default = 0 if column == 'free_cash_flow' else None
+        raw = [s.get(column, default) for s in stocks]
+        frame[column] = np.array([float(v) if isinstance(v, Real) else np.nan for v in raw], dtype=float)
+        frame[f'{column}_missing'] = np.array([v is None for v in raw], dtype=bool)
+        frame[f'{column}_invalid'] = np.array([v is not None and not isinstance(v, Real) for v in raw], dtype=bool)
+        frame[f'{column}_truthy'] = np.array([bool(v) for v in raw], dtype=bool)
+
+    # filter_stock() indexes these keys directly, so a row without them is rejected
+    frame['incomplete'] = np.array([any(key not in s for key in REQUIRED_KEYS) for s in stocks], dtype=bool)
+    return frame
+
+
+class FilterEngine:
+    """
+    Columnar filter + scoring engine
+
+    Thresholds default to the StockFilter class constants; pass overrides
+    (e.g. {'MAX_RSI': 32}) to evaluate a what-if screen
+    """
+
+    def __init__(self, overrides: Optional[Dict[str, float]] = None):
+        for name in THRESHOLD_NAMES:
+            setattr(self, name, getattr(StockFilter, name))
+        for name, value in (overrides or {}).items():
+            if name not in THRESHOLD_NAMES:
+                raise ValueError(f"Unknown threshold: {name}")
+            setattr(self, name, float(value))
+
+    def thresholds(self) -> Dict[str, float]:
+        """Thresholds this engine applies"""
+        return {name: getattr(self, name) for name in THRESHOLD_NAMES}
+
+    @staticmethod
+    def _flags(frame: pd.DataFrame, column: str) -> Dict[str, np.ndarray]:
+        """
+        Value and Python-semantics flags of one numeric column
+        'real' is a usable number (NaN included, as filter_stock() sees it)
+        """
+        value = frame[column].to_numpy(dtype=float)
+        if f'{column}_truthy' in frame:
+            missing = frame[f'{column}_missing'].to_numpy(dtype=bool)
+            invalid = frame[f'{column}_invalid'].to_numpy(dtype=bool)
+            truthy = frame[f'{column}_truthy'].to_numpy(dtype=bool)
+        else:
+            # Tables stored before the flags existed: NaN stands for missing
+            invalid = frame[f'{column}_invalid'].to_numpy(dtype=bool)
+            missing = np.isnan(value) & ~invalid
+            truthy = invalid | (~np.isnan(value) & (value != 0))
+        return {'value': value, 'missing': missing, 'real': ~missing & ~invalid, 'truthy': truthy}
+
+    def filter_masks(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Evaluate each of the 12 filters independently for every row
+        Returns a boolean pass matrix with one column per FILTER_NAMES entry
+
+        Mirrors filter_stock() step by step: guards use Python truthiness,
+        comparisons with NaN are False (so NaN gets through where the scalar
+        check does), and a None or non-numeric value rejects the stock only
+        where filter_stock() formats or compares it (raising TypeError/ValueError)
+        """
+        f = {c: self._flags(frame, c) for c in NUMERIC_COLUMNS}
+        incomplete = frame['incomplete'].to_numpy(dtype=bool) if 'incomplete' in frame else np.zeros(len(frame), bool)
+
+        def minimum(column, threshold):  # Skipped when None, else fails below threshold
+            return f[column]['missing'] | (f[column]['real'] & ~(f[column]['value'] < threshold))
+
+        def maximum_if_set(column, threshold):  # Skipped when falsy, else fails above threshold
+            return ~f[column]['truthy'] | (f[column]['real'] & ~(f[column]['value'] > threshold))
+
+        eps, fcf = f['eps_growth'], f['free_cash_flow']
+
+        masks = {
+            'market_cap': ~incomplete & f['market_cap']['real'] & ~(f['market_cap']['value'] < self.MIN_MARKET_CAP),
+            **self.price_masks(f),
+            'revenue_growth': minimum('revenue_growth', self.MIN_REVENUE_GROWTH),
+            'eps_or_fcf': fcf['real'] & (~eps['truthy'] | eps['real']) & (
+                (eps['truthy'] & (eps['value'] >= self.MIN_EPS_GROWTH)) | (fcf['value'] > 0)
+            ),
+            'debt_to_equity': f['debt_to_equity']['missing'] | (
+                f['debt_to_equity']['real'] & ~(f['debt_to_equity']['value'] > self.MAX_DEBT_TO_EQUITY)
+            ),
+            'gross_margin': minimum('gross_margin', self.MIN_GROSS_MARGIN),
+            'trailing_pe': maximum_if_set('pe_ratio', self.MAX_TRAILING_PE),
+            'price_to_sales': maximum_if_set('price_to_sales', self.MAX_PRICE_TO_SALES),
+        }
+
+        return pd.DataFrame(masks, index=frame.index)[FILTER_NAMES]
+
+    def price_masks(self, f: Dict[str, Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+        """
+        The price-history filters (FILTER_SOURCES 'price') from per-column
+        _flags() dicts, as filter_masks() evaluates them
+        Works on arrays of any shape (the backtest passes date x ticker matrices)
+        """
+        price = f['current_price']
+
+        def ratio_guard(column):  # Guard taken: price and column must both be numbers
+            return ~f[column]['truthy'], f[column]['real'] & price['real']
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            price_vs_52w = price['value'] / f['high_52w']['value']
+            price_vs_sma200 = price['value'] / f['sma_200']['value']
+
+        skip_high, usable_high = ratio_guard('high_52w')
+        skip_sma20, usable_sma20 = ratio_guard('sma_20')
+        skip_sma200, usable_sma200 = ratio_guard('sma_200')
+
+        return {
+            'avg_volume': f['avg_volume']['real'] & ~(f['avg_volume']['value'] < self.MIN_AVG_VOLUME),
+            'rsi': f['rsi']['truthy'] & f['rsi']['real'] & ~(f['rsi']['value'] > self.MAX_RSI),
+            'price_vs_52w_high': skip_high | (usable_high & ~(price_vs_52w > self.MAX_PRICE_VS_52W_HIGH)),
+            'sma_20': skip_sma20 | (usable_sma20 & ~(price['value'] > f['sma_20']['value'])),
+            'sma_200': skip_sma200 | (usable_sma200 & ~(price_vs_sma200 < self.MIN_PRICE_VS_200D_SMA)),
+        }
+
+    def filter_gaps(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        How far each row is past each filter's threshold, relative to the
+        threshold (0.05 = 5% on the failing side); <= 0 where the value is
+        on the passing side, NaN where there is no value to compare
+        """
+        col = {c: frame[c].to_numpy(dtype=float) for c in NUMERIC_COLUMNS}
+        price = col['current_price']
+
+        def below(value, minimum):  # Fails when value < minimum
+            return (minimum - value) / abs(minimum)
+
+        def above(value, maximum):  # Fails when value > maximum
+            return (value - maximum) / abs(maximum)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gaps = {
+                'market_cap': below(col['market_cap'], self.MIN_MARKET_CAP),
+                'avg_volume': below(col['avg_volume'], self.MIN_AVG_VOLUME),
+                'rsi': above(col['rsi'], self.MAX_RSI),
+                'price_vs_52w_high': above(price / col['high_52w'], self.MAX_PRICE_VS_52W_HIGH),
+                'sma_20': price / col['sma_20'] - 1,
+                'sma_200': below(price / col['sma_200'], self.MIN_PRICE_VS_200D_SMA),
+                'revenue_growth': below(col['revenue_growth'], self.MIN_REVENUE_GROWTH),
+                'eps_or_fcf': below(col['eps_growth'], self.MIN_EPS_GROWTH),
+                'debt_to_equity': above(col['debt_to_equity'], self.MAX_DEBT_TO_EQUITY),
+                'gross_margin': below(col['gross_margin'], self.MIN_GROSS_MARGIN),
+                'trailing_pe': above(col['pe_ratio'], self.MAX_TRAILING_PE),
+                'price_to_sales': above(col['price_to_sales'], self.MAX_PRICE_TO_SALES),
+            }
+        frame_gaps = pd.DataFrame(gaps, index=frame.index)[FILTER_NAMES]
+        return frame_gaps.where(np.isfinite(frame_gaps.to_numpy()))
+
+    def funnel(self, frame: pd.DataFrame, tolerance: float = NEAR_MISS_TOLERANCE,
+               near_miss_limit: Optional[int] = 20) -> Dict[str, Any]:
+        """
+        Selectivity of each filter over a candidate feature table, from one
+        pass matrix: candidates passing it on its own (independent), passing
+        it and every filter before it in filter_stock() order (cumulative),
+        eliminated at it, and blocked by it alone. Near misses fail exactly
+        one filter by at most `tolerance` (relative to its threshold), closest first
+        """
+        masks = self.filter_masks(frame).to_numpy()
+        rows, _ = masks.shape
+        cumulative = np.logical_and.accumulate(masks, axis=1) if rows else masks
+        misses = (~masks).sum(axis=1)
+        sole = (misses == 1)[:, None] & ~masks
+
+        independent_counts = masks.sum(axis=0)
+        cumulative_counts = cumulative.sum(axis=0)
+        remaining = np.concatenate([[rows], cumulative_counts[:-1]])
+        filters = [{
+            'filter': name,
+            'source': FILTER_SOURCES[name],
+            'threshold': getattr(self, FILTER_THRESHOLDS[name]) if FILTER_THRESHOLDS[name] else None,
+            'pass_independent': int(independent_counts[i]),
+            'pass_cumulative': int(cumulative_counts[i]),
+            'eliminated': int(remaining[i] - cumulative_counts[i]),
+            'sole_blocker': int(sole[:, i].sum()),
+        } for i, name in enumerate(FILTER_NAMES)]
+
+        # Candidates the price-history filters alone reject never needed a fundamentals fetch
+        price_columns = [i for i, name in enumerate(FILTER_NAMES) if FILTER_SOURCES[name] == 'price']
+        price_pass = int(masks[:, price_columns].all(axis=1).sum()) if rows else 0
+
+        near_misses = []
+        near_rows = np.flatnonzero(misses == 1)
+        if len(near_rows):
+            failed = np.argmax(~masks[near_rows], axis=1)
+            gaps = self.filter_gaps(frame).to_numpy()[near_rows, failed]
+            close = (gaps > 0) & (gaps <= tolerance)
+            scores = self.score(frame)
+            for position, filter_index, gap in sorted(
+                zip(near_rows[close], failed[close], gaps[close]), key=lambda miss: miss[2]
+            ):
+                row = frame.iloc[position]
+                near_misses.append({
+                    'symbol': row['symbol'],
+                    'name': row['name'],
+                    'sector': row['sector'],
+                    'failed_filter': FILTER_NAMES[filter_index],
+                    'gap': round(float(gap), 4),
+                    'composite_score': round(float(scores[position]), 2),
+                })
+
+        return {
+            'candidates': rows,
+            'passed': int(cumulative_counts[-1]) if rows else 0,
+            'tolerance': tolerance,
+            'filters': filters,
+            'price_filters': {
+                'pass': price_pass,
+                'fundamentals_fetches_skippable': rows - price_pass,
+            },
+            'near_miss_count': len(near_misses),
+            'near_misses': near_misses if near_miss_limit is None else near_misses[:max(near_miss_limit, 0)],
+        }
+
+    def score(self, frame: pd.DataFrame) -> np.ndarray:
+        """
+        Composite score (0-100) for every row, same formula as filter_stock()
+        RSI 35%, Revenue 25%, EPS/FCF 20%, Drawdown 20%
+        """
+        rsi = frame['rsi'].to_numpy(dtype=float)
+        revenue = self._flags(frame, 'revenue_growth')
+        eps = self._flags(frame, 'eps_growth')
+        high = self._flags(frame, 'high_52w')
+        price = frame['current_price'].to_numpy(dtype=float)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            price_vs_52w = price / high['value']
+
+            rsi_part = (self.MAX_RSI - rsi) / self.MAX_RSI * 35
+            revenue_part = np.where(
+                revenue['truthy'],
+                np.minimum((revenue['value'] - self.MIN_REVENUE_GROWTH) / 0.40, 1.0) * 25,
+                0.0
+            )
+            eps_part = np.where(
+                eps['truthy'],
+                np.minimum((eps['value'] - self.MIN_EPS_GROWTH) / 0.32, 1.0) * 20,
+                0.0
+            )
+            # `if high_52w and price_vs_52w` (a NaN ratio is truthy)
+            drawdown_part = np.where(
+                high['truthy'] & (price_vs_52w != 0),
+                (self.MAX_PRICE_VS_52W_HIGH - price_vs_52w) / self.MAX_PRICE_VS_52W_HIGH * 20,
+                0.0
+            )
+
+        # Same summation order as the scalar version so scores match bit-for-bit
+        return ((rsi_part + revenue_part) + eps_part) + drawdown_part
+
+    def passing(self, stocks: Union[List[Dict[str, Any]], pd.DataFrame]) -> List[Dict[str, Any]]:
+        """
+        Every stock that passes all filters, with its composite_score, in input order
+        Accepts get_stock_data() rows or a build_feature_frame() table
+        """
+        frame = stocks if isinstance(stocks, pd.DataFrame) else build_feature_frame(stocks)
+        if frame.empty:
+            return []
+
+        passed = self.filter_masks(frame).to_numpy().all(axis=1)
+        scores = self.score(frame)
+
+        positions = np.flatnonzero(passed)
+        timestamp = datetime.now().isoformat()
+        if isinstance(stocks, pd.DataFrame):
+            sources = [self._row_to_dict(frame.iloc[p]) for p in positions]
+        else:
+            # Keep the caller's original values (ints stay ints, etc.)
+            sources = [stocks[p] for p in positions]
+        # Round like filter_stock() does before ranking
+        return [
+            self._to_result(source, round(float(scores[p]), 2), timestamp)
+            for source, p in zip(sources, positions)
+        ]
+
+    def run(self, stocks: Union[List[Dict[str, Any]], pd.DataFrame],
+            top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Filter and rank a whole candidate set in one pass
+        Accepts get_stock_data() rows or a build_feature_frame() table
+        Returns passing stocks ranked by composite_score (top_k if given)
+        """
+        return rank_stocks(self.passing(stocks), top_k)
+
+    @staticmethod
+    def _row_to_dict(row: pd.Series) -> Dict[str, Any]:
+        """Feature-table row back to a get_stock_data()-style dict"""
+        data = {}
+        for column in TEXT_COLUMNS + NUMERIC_COLUMNS:
+            v = row[column]
+            data[column] = None if pd.isna(v) else (float(v) if column in NUMERIC_COLUMNS else v)
+        return data
+
+    def _to_result(self, stock_data: Dict[str, Any], score: float, timestamp: str) -> Dict[str, Any]:
+        """Shape a passing stock like filter_stock()'s return value"""
+        current_price = stock_data['current_price']
+        high_52w = stock_data.get('high_52w')
+        return {
+            'symbol': stock_data['symbol'],
+            'name': stock_data['name'],
+            'current_price': current_price,
+            'market_cap': stock_data['market_cap'],
+            'rsi': stock_data.get('rsi'),
+            'price_vs_52w_high': current_price / high_52w if high_52w else None,
+            'revenue_growth': stock_data.get('revenue_growth'),
+            'eps_growth': stock_data.get('eps_growth'),
+            'gross_margin': stock_data.get('gross_margin'),
+            'debt_to_equity': stock_data.get('debt_to_equity'),
+            'pe_ratio': stock_data.get('pe_ratio'),
+            'price_to_sales': stock_data.get('price_to_sales'),
+            'avg_volume': stock_data['avg_volume'],
+            'sma_20': stock_data.get('sma_20'),
+            'sma_200': stock_data.get('sma_200'),
+            'composite_score': score,
+            'sector': stock_data.get('sector', 'Unknown'),
+            'industry': stock_data.get('industry', 'Unknown'),
+            'last_updated': timestamp
+        }
+
+
+def rank_stocks(stocks: List[Dict[str, Any]], top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Stocks by composite_score, descending (ties keep input order)
+    With top_k, a heap keeps only the best k instead of sorting everything
+    """
+    if top_k is None:
+        return sorted(stocks, key=lambda stock: -stock['composite_score'])
+    return heapq.nsmallest(max(top_k, 0), stocks, key=lambda stock: -stock['composite_score'])
+
+
+# Singleton instance (default thresholds)
+filter_engine = FilterEngine()
@@ -0,0 +1,196 @@
+"""
+Fundamentals Cache - Two-tier (memory + SQLite) cache for yfinance Ticker.info
+Every field has its own TTL: slow-moving fundamentals are kept for days,
+market-driven fields like marketCap only for minutes
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .metrics import CACHE_LOOKUPS
+
+FUNDAMENTALS_DB_FILE = Path(__file__).parent.parent / "cache" / "fundamentals.sqlite"
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+# Ticker.info fields the screener uses, with how long each stays fresh
+FIELD_TTLS = {
+    # Market-driven (move with price)
+    'marketCap': 15 * MINUTE,
+    'trailingPE': 15 * MINUTE,
+    'priceToSalesTrailing12Months': 15 * MINUTE,
+    'averageVolume': 6 * HOUR,
+    # Reported fundamentals (change at most quarterly)
+    'trailingEps': 3 * DAY,
+    'totalRevenue': 3 * DAY,
+    'revenueGrowth': 3 * DAY,
+    'earningsGrowth': 3 * DAY,
+    'freeCashflow': 3 * DAY,
+    'grossMargins': 7 * DAY,
+    'debtToEquity': 7 * DAY,
+    # Reference data
+    'longName': 30 * DAY,
+    'sector': 30 * DAY,
+    'industry': 30 * DAY,
+    'exchange': 30 * DAY,
+}
+
+# Symbols kept in the memory tier before least-recently-used eviction
+MEMORY_MAX_SYMBOLS = 2000
+
+# Disk rows older than the longest TTL are pruned every N writes
+PRUNE_EVERY_WRITES = 500
+
+
+class FundamentalsCache:
+    """
+    Per-field TTL cache for Ticker.info
+    - Memory tier: LRU of symbol -> {field: (present, value, fetched_at)}
+    - Disk tier: SQLite, survives restarts and is shared across workers
+    A field missing from Ticker.info is cached as absent, so callers can
+    still tell "not reported" apart from "not fetched yet"
+    """
+
+    def __init__(self, db_file: Path = FUNDAMENTALS_DB_FILE,
+                 max_symbols: int = MEMORY_MAX_SYMBOLS):
+        self.db_file = Path(db_file)
+        self.max_symbols = max_symbols
+        self._memory: "OrderedDict[str, Dict[str, tuple]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS fundamentals (
+                    symbol TEXT NOT NULL,
+                    field TEXT NOT NULL,
+                    present INTEGER NOT NULL,
+                    value TEXT,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (symbol, field)
+                ) WITHOUT ROWID
+            """)
+            self._initialized = True
+        return conn
+
+    def _remember(self, symbol: str, fields: Dict[str, tuple]):
+        """Insert into the memory tier (newest fetch per field wins), evicting least-recently-used symbols"""
+        with self._lock:
+            entry = self._memory.setdefault(symbol, {})
+            for field, cached in fields.items():
+                if field not in entry or cached[2] >= entry[field][2]:
+                    entry[field] = cached
+            self._memory.move_to_end(symbol)
+            while len(self._memory) > self.max_symbols:
+                self._memory.popitem(last=False)
+
+    def _load_from_disk(self, symbol: str) -> Dict[str, tuple]:
+        try:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    "SELECT field, present, value, fetched_at FROM fundamentals WHERE symbol = ?",
+                    (symbol,)
+                ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Error reading fundamentals cache: {e}")
+            return {}
+        fields = {
+            field: (bool(present), json.loads(value) if present else None, fetched_at)
+            for field, present, value, fetched_at in rows
+        }
+        if fields:
+            self._remember(symbol, fields)
+        return fields
+
+    @staticmethod
+    def _fresh(entry: Dict[str, tuple], now: float) -> Dict[str, tuple]:
+        return {
+            field: cached for field, cached in entry.items()
+            if now - cached[2] <= FIELD_TTLS.get(field, HOUR)
+        }
+
+    def lookup(self, symbol: str, fields: Optional[Iterable[str]] = None) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        (fresh cached values, requested fields that are stale or not cached)
+        Values are info-style (fresh fields only, absent ones omitted); fields
+        defaults to all. A memory entry with stale fields is re-read from disk,
+        where another worker may already have refreshed them
+        """
+        requested = list(FIELD_TTLS if fields is None else fields)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(symbol)
+            if entry is not None:
+                self._memory.move_to_end(symbol)
+                entry = dict(entry)
+
+        fresh = self._fresh(entry or {}, now)
+        if entry is None or any(field not in fresh for field in requested):
+            self._load_from_disk(symbol)
+            with self._lock:
+                entry = dict(self._memory.get(symbol, {}))
+            fresh = self._fresh(entry, now)
+
+        stale = [field for field in requested if field not in fresh]
+        with self._lock:
+            if stale:
+                self.misses += 1
+            else:
+                self.hits += 1
+        CACHE_LOOKUPS.inc(cache='fundamentals', result='miss' if stale else 'hit')
+        return {field: value for field, (present, value, _) in fresh.items() if present}, stale
+
+    def get(self, symbol: str, fields: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Cached info for symbol if every requested field (default: all) is still fresh
+        Returns an info-style dict (absent fields omitted), or None on a miss
+        """
+        values, stale = self.lookup(symbol, fields)
+        return None if stale else values
+
+    def put(self, symbol: str, info: Dict[str, Any], fields: Optional[Iterable[str]] = None):
+        """
+        Cache a fresh fetch: the FIELD_TTLS fields of Ticker.info by default,
+        or only `fields` (a field missing from info is cached as absent)
+        """
+        now = time.time()
+        fields = {
+            field: (field in info, info.get(field), now)
+            for field in (FIELD_TTLS if fields is None else fields)
+        }
+        self._remember(symbol, fields)
+
+        rows = [
+            (symbol, field, int(present), json.dumps(value) if present else None, fetched_at)
+            for field, (present, value, fetched_at) in fields.items()
+        ]
+        try:
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO fundamentals VALUES (?, ?, ?, ?, ?)", rows
+                )
+                with self._lock:
+                    self._writes += 1
+                    prune = self._writes % PRUNE_EVERY_WRITES == 0
+                if prune:
+                    conn.execute(
+                        "DELETE FROM fundamentals WHERE fetched_at < ?",
+                        (now - max(FIELD_TTLS.values()),)
+                    )
+        except sqlite3.Error as e:
+            print(f"Error writing fundamentals cache: {e}")
@@ -0,0 +1,68 @@
+"""
+Host Semaphore - Counting semaphore shared by every process on a machine
+Built on flock()ed lock files in the cache directory, so the parent, shard
+workers and queue workers on one host draw from the same slots; a slot is
+released automatically if its holder dies
+
+Without fcntl (non-POSIX hosts) it degrades to a per-process semaphore
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process bound
+    fcntl = None
+
+LOCK_DIR = Path(__file__).parent.parent / "cache" / "locks"
+
+# How often a waiter re-checks the slots
+POLL_SECONDS = 0.05
+
+
+class HostSemaphore:
+    """At most `slots` holders at once across all processes on this host"""
+
+    def __init__(self, name: str, slots: int, lock_dir: Path = LOCK_DIR):
+        self.name = name
+        self.slots = max(1, slots)
+        self.lock_dir = Path(lock_dir)
+        self._local = threading.BoundedSemaphore(self.slots)
+
+    def _try_slot(self, index: int):
+        """Open file descriptor holding slot `index`, or None if it is taken"""
+        fd = os.open(self.lock_dir / f"{self.name}.{index}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return fd
+        except OSError:
+            os.close(fd)
+            return None
+
+    @contextmanager
+    def hold(self) -> Iterator[None]:
+        """Wait for a free slot and hold it for the body of the with-block"""
+        with self._local:
+            if fcntl is None:
+                yield
+                return
+
+            self.lock_dir.mkdir(parents=True, exist_ok=True)
+            fd = None
+            while fd is None:
+                for index in range(self.slots):
+                    fd = self._try_slot(index)
+                    if fd is not None:
+                        break
+                else:
+                    time.sleep(POLL_SECONDS)
+            try:
+                yield
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
@@ -0,0 +1,109 @@
+"""
+HTTP Cache - ETags, conditional GETs and pre-compressed response variants
+A response body that only changes when a new screen lands is encoded once
+per screen (identity, gzip and, with the brotli package installed, br).
+Polling clients that send If-None-Match get a bodyless 304 until it changes
+
+brotli is optional: without it clients get gzip
+"""
+
+import gzip
+import hashlib
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # Brotli-capable clients get gzip instead
+    brotli = None
+
+# Clients may keep the body but must revalidate (cheap 304) before using it
+CACHE_CONTROL = 'no-cache'
+
+# Preferred content codings, best first
+ENCODINGS = ('br', 'gzip')
+
+
+def build_variants(body: bytes) -> Dict[str, bytes]:
+    """Encoded bodies by content coding ('identity' is the body itself)"""
+    variants = {
+        'identity': body,
+        'gzip': gzip.compress(body, compresslevel=9, mtime=0),  # mtime=0 keeps the bytes reproducible
+    }
+    if brotli is not None:
+        variants['br'] = brotli.compress(body)
+    return variants
+
+
+def content_etag(body: bytes) -> str:
+    """Strong validator for a body: a hash of its uncompressed bytes"""
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    """Accept-Encoding codings and their q-values"""
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(request: Request, variants: Dict[str, bytes]) -> str:
+    """Best pre-encoded variant the client accepts"""
+    accepted = _accepted_encodings(request.headers.get('accept-encoding', ''))
+    for coding in ENCODINGS:
+        if coding in variants and accepted.get(coding, accepted.get('*', 0)) > 0:
+            return coding
+    return 'identity'
+
+
+def _variant_etag(etag: str, coding: str) -> str:
+    # Each coding is a different representation, so it gets its own tag
+    return f'"{etag}"' if coding == 'identity' else f'"{etag}-{coding}"'
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    """Whether If-None-Match names any variant of this content (or *)"""
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag == '*':
+            return True
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        if tag == etag or tag.rsplit('-', 1)[0] == etag:
+            return True
+    return False
+
+
+def cached_response(request: Request, variants: Dict[str, bytes], etag: str,
+                    media_type: str = 'application/json',
+                    headers: Optional[Dict[str, str]] = None) -> Response:
+    """304 for a matching If-None-Match, else the best pre-encoded variant"""
+    coding = choose_encoding(request, variants)
+    response_headers = {
+        'ETag': _variant_etag(etag, coding),
+        'Cache-Control': CACHE_CONTROL,
+        'Vary': 'Accept-Encoding',
+        **(headers or {}),
+    }
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=response_headers)
+    if coding != 'identity':
+        response_headers['Content-Encoding'] = coding
+    return Response(content=variants[coding], media_type=media_type, headers=response_headers)
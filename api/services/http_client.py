@@ -0,0 +1,61 @@
+"""
+HTTP Client - Pooled keep-alive sessions for outbound API calls
+One session per service keeps TCP/TLS connections open between calls, so
+back-to-back requests to the same host skip the handshake
+
+Async callers use httpx (in requirements.txt); in an environment without
+it they fall back to the pooled requests session on a worker thread
+"""
+
+import os
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import httpx
+except ImportError:  # Async pooling falls back to the requests session
+    httpx = None
+
+# Open connections kept per host
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '10'))
+# Retries for connection errors and 5xx responses
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', '3'))
+# Exponential backoff between retries: backoff * 2**(retry - 1) seconds
+HTTP_BACKOFF = float(os.getenv('HTTP_BACKOFF', '0.5'))
+
+# 429 is not retried: a resent request would spend quota that the daily
+# call counter (reserve_call) never saw, and the rate limit answers it anyway
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+def build_session(pool_size: int = HTTP_POOL_SIZE, retries: int = HTTP_RETRIES,
+                  backoff: float = HTTP_BACKOFF) -> requests.Session:
+    """requests.Session with a keep-alive connection pool and retries on GET"""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=['GET'],
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def build_async_client(pool_size: int = HTTP_POOL_SIZE, retries: int = HTTP_RETRIES,
+                       timeout: float = 30) -> Optional["httpx.AsyncClient"]:
+    """
+    httpx.AsyncClient with the same pool size (None without httpx)
+    httpx only retries failed connections, not error statuses
+    """
+    if httpx is None:
+        return None
+    limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+    transport = httpx.AsyncHTTPTransport(retries=retries, limits=limits)
+    return httpx.AsyncClient(transport=transport, timeout=timeout)
@@ -0,0 +1,279 @@
+"""
+Incremental Indicator Engine - O(1) per-bar RSI / SMA / 52-week extremes
+Keeps rolling state per symbol (persisted next to the price store) so a new
+daily bar updates every indicator without rescanning the history:
+- RSI(14): Wilder averages (same EWM recurrence as ta.momentum.RSIIndicator)
+- SMA(20/200) and 20-day average volume: running window sums (missing
+  volumes are skipped, like pandas mean())
+- 52-week high/low: monotonic deques over the last 252 bars
+
+State only covers settled bars. The most recent bar may still be changing
+(intraday screens), so it is applied tentatively on every read and committed
+once a newer bar arrives
+"""
+
+import json
+import math
+import sqlite3
+import threading
+from collections import deque
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from .price_store import PRICE_DB_FILE
+
+RSI_WINDOW = 14
+SMA_SHORT = 20
+SMA_LONG = 200
+VOLUME_WINDOW = 20
+EXTREMES_WINDOW = 252  # ~52 weeks of trading days
+
+# Wilder smoothing as pandas ewm(alpha=1/14, adjust=False) computes it
+_ALPHA = 1 / RSI_WINDOW
+_DECAY = 1 - _ALPHA
+
+# Relative change in a settled close that means the history was re-adjusted
+ADJUSTMENT_TOLERANCE = 1e-6
+
+
+def _new_state() -> Dict[str, Any]:
+    return {
+        'last_date': None,
+        'count': 0,
+        'last_close': None,
+        'avg_gain': 0.0,
+        'avg_loss': 0.0,
+        'closes_short': deque(), 'sum_short': 0.0,
+        'closes_long': deque(), 'sum_long': 0.0,
+        'volumes': deque(), 'sum_volume': 0.0, 'volume_count': 0,  # sum/count of non-NaN volumes
+        'max_high': deque(),  # (bar index, high), highs decreasing
+        'min_low': deque(),   # (bar index, low), lows increasing
+    }
+
+
+def _wilder(previous: float, value: float, first: bool) -> float:
+    """One step of ewm(adjust=False): the first observation seeds the average"""
+    if first:
+        return value
+    return (_DECAY * previous + _ALPHA * value) / (_DECAY + _ALPHA)
+
+
+def _window_push(window: deque, total: float, value: float, size: int) -> float:
+    """Append to a fixed-size window and return the new running sum"""
+    window.append(value)
+    total += value
+    if len(window) > size:
+        total -= window.popleft()
+    return total
+
+
+def _valid(value: Optional[float]) -> bool:
+    return value is not None and not math.isnan(value)
+
+
+def _volume_push(state: Dict[str, Any], volume: Optional[float]):
+    """Append to the volume window; NaN bars take a slot but not part of the sum/count"""
+    window = state['volumes']
+    window.append(volume if _valid(volume) else None)
+    if window[-1] is not None:
+        state['sum_volume'] += volume
+        state['volume_count'] += 1
+    if len(window) > VOLUME_WINDOW:
+        dropped = window.popleft()
+        if dropped is not None:
+            state['sum_volume'] -= dropped
+            state['volume_count'] -= 1
+
+
+class IndicatorEngine:
+    """Per-symbol rolling indicator state with O(1) bar updates"""
+
+    def __init__(self, db_file: Path = PRICE_DB_FILE):
+        self.db_file = Path(db_file)
+        self._initialized = False
+        self._memory: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    # ---- persistence ----
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        if not self._initialized:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS indicator_state (
+                    symbol TEXT PRIMARY KEY,
+                    state TEXT NOT NULL
+                )
+            """)
+            self._initialized = True
+        return conn
+
+    @staticmethod
+    def _encode(state: Dict[str, Any]) -> str:
+        return json.dumps({k: list(v) if isinstance(v, deque) else v for k, v in state.items()})
+
+    @staticmethod
+    def _decode(raw: str) -> Dict[str, Any]:
+        state = json.loads(raw)
+        for key in ('closes_short', 'closes_long', 'volumes'):
+            state[key] = deque(state[key])
+        for key in ('max_high', 'min_low'):
+            state[key] = deque(tuple(item) for item in state[key])
+        # States saved before NaN volumes were skipped stored them as 0.0
+        state.setdefault('volume_count', len(state['volumes']))
+        return state
+
+    def _load(self, symbol: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if symbol in self._memory:
+                return self._memory[symbol]
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT state FROM indicator_state WHERE symbol = ?", (symbol,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading indicator state for {symbol}: {e}")
+            return None
+        return self._decode(row[0]) if row else None
+
+    def _save(self, symbol: str, state: Dict[str, Any]):
+        with self._lock:
+            self._memory[symbol] = state
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO indicator_state VALUES (?, ?)",
+                    (symbol, self._encode(state))
+                )
+        except sqlite3.Error as e:
+            print(f"Error saving indicator state for {symbol}: {e}")
+
+    # ---- bar updates ----
+
+    def _commit(self, state: Dict[str, Any], date: pd.Timestamp,
+                high: float, low: float, close: float, volume: float):
+        """Fold one settled bar into the state (amortized O(1))"""
+        n = state['count']
+
+        diff = 0.0 if state['last_close'] is None else close - state['last_close']
+        state['avg_gain'] = _wilder(state['avg_gain'], max(diff, 0.0), n == 0)
+        state['avg_loss'] = _wilder(state['avg_loss'], max(-diff, 0.0), n == 0)
+
+        state['sum_short'] = _window_push(state['closes_short'], state['sum_short'], close, SMA_SHORT)
+        state['sum_long'] = _window_push(state['closes_long'], state['sum_long'], close, SMA_LONG)
+        _volume_push(state, volume)
+
+        # Re-sum once per window length so running sums don't drift
+        if n % SMA_SHORT == 0:
+            state['sum_short'] = math.fsum(state['closes_short'])
+            state['sum_volume'] = math.fsum(v for v in state['volumes'] if v is not None)
+        if n % SMA_LONG == 0:
+            state['sum_long'] = math.fsum(state['closes_long'])
+
+        max_high, min_low = state['max_high'], state['min_low']
+        while max_high and max_high[-1][1] <= high:
+            max_high.pop()
+        max_high.append((n, high))
+        while min_low and min_low[-1][1] >= low:
+            min_low.pop()
+        min_low.append((n, low))
+        expired = n - EXTREMES_WINDOW
+        while max_high[0][0] <= expired:
+            max_high.popleft()
+        while min_low[0][0] <= expired:
+            min_low.popleft()
+
+        state['count'] = n + 1
+        state['last_close'] = close
+        state['last_date'] = date.strftime('%Y-%m-%d')
+
+    def _snapshot(self, state: Dict[str, Any], high: float, low: float,
+                  close: float, volume: float) -> Dict[str, Optional[float]]:
+        """Indicators with the latest (possibly unsettled) bar applied tentatively, O(1)"""
+        n = state['count']
+        total = n + 1
+
+        diff = 0.0 if state['last_close'] is None else close - state['last_close']
+        gain = _wilder(state['avg_gain'], max(diff, 0.0), n == 0)
+        loss = _wilder(state['avg_loss'], max(-diff, 0.0), n == 0)
+        rsi = None
+        if total >= RSI_WINDOW:
+            rsi = 100.0 if loss == 0 else 100 - (100 / (1 + gain / loss))
+
+        def window_mean(window: deque, running: float, value: float, size: int) -> Optional[float]:
+            if len(window) == size:
+                return (running - window[0] + value) / size
+            if len(window) + 1 == size:
+                return (running + value) / size
+            return None
+
+        # Volume window with the latest bar swapped in for the oldest one
+        volume_sum, volume_count = state['sum_volume'], state['volume_count']
+        volumes = state['volumes']
+        if len(volumes) == VOLUME_WINDOW and volumes[0] is not None:
+            volume_sum -= volumes[0]
+            volume_count -= 1
+        if _valid(volume):
+            volume_sum += volume
+            volume_count += 1
+
+        # Only the oldest deque entry can fall out of the 252-bar window
+        expired = n - EXTREMES_WINDOW
+        highs = [v for i, v in islice(state['max_high'], 2) if i > expired]
+        lows = [v for i, v in islice(state['min_low'], 2) if i > expired]
+
+        return {
+            'current_price': close,
+            'rsi': rsi,
+            'sma_20': window_mean(state['closes_short'], state['sum_short'], close, SMA_SHORT),
+            'sma_200': window_mean(state['closes_long'], state['sum_long'], close, SMA_LONG),
+            'high_52w': max([high] + highs[:1]),
+            'low_52w': min([low] + lows[:1]),
+            'avg_volume': volume_sum / volume_count if volume_count else math.nan,
+        }
+
+    # ---- public API ----
+
+    def compute(self, symbol: str, hist: pd.DataFrame) -> Dict[str, Optional[float]]:
+        """
+        Latest indicators for a symbol's stored history
+        Commits any newly settled bars (usually one per day) to the saved state;
+        rebuilds from hist only on first use or after an upstream re-adjustment
+        """
+        dates = hist.index
+        state = self._load(symbol)
+
+        needs_rebuild = state is None
+        if state is not None and state['last_date'] is not None:
+            last = pd.Timestamp(state['last_date'])
+            if last not in dates or last >= dates[-1]:
+                needs_rebuild = True
+            else:
+                stored = hist.at[last, 'Close']
+                needs_rebuild = abs(stored / state['last_close'] - 1) > ADJUSTMENT_TOLERANCE
+
+        if needs_rebuild:
+            state = _new_state()
+            settled = hist.iloc[:-1]
+        else:
+            settled = hist.iloc[:-1]
+            if state['last_date'] is not None:
+                settled = settled[settled.index > pd.Timestamp(state['last_date'])]
+
+        if needs_rebuild or not settled.empty:
+            for date, bar in zip(settled.index, settled[['High', 'Low', 'Close', 'Volume']].itertuples(index=False)):
+                self._commit(state, date, bar.High, bar.Low, bar.Close, bar.Volume)
+            self._save(symbol, state)
+
+        latest = hist.iloc[-1]
+        return self._snapshot(state, latest['High'], latest['Low'], latest['Close'], latest['Volume'])
+
+
+# Singleton instance
+indicator_engine = IndicatorEngine()
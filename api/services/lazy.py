@@ -0,0 +1,51 @@
+"""
+Lazy - Deferred imports for the serverless entry point
+index.py refers to the pandas/yfinance-backed singletons through these
+proxies, so a cold function that only serves cached results (or /, or
+/api/health) never imports them. The module is imported on first use
+"""
+
+import importlib
+import threading
+from typing import Any
+
+
+class LazyObject:
+    """
+    Stands in for `module.attribute` and imports it on first attribute access
+    Attribute reads and writes go to the real object once it is loaded
+    """
+
+    def __init__(self, module: str, attribute: str):
+        object.__setattr__(self, '_module', module)
+        object.__setattr__(self, '_attribute', attribute)
+        object.__setattr__(self, '_target', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def _resolve(self) -> Any:
+        target = object.__getattribute__(self, '_target')
+        if target is None:
+            with object.__getattribute__(self, '_lock'):
+                target = object.__getattribute__(self, '_target')
+                if target is None:
+                    module = importlib.import_module(object.__getattribute__(self, '_module'))
+                    target = getattr(module, object.__getattribute__(self, '_attribute'))
+                    object.__setattr__(self, '_target', target)
+        return target
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(self._resolve(), name, value)
+
+    def __repr__(self) -> str:
+        module = object.__getattribute__(self, '_module')
+        attribute = object.__getattribute__(self, '_attribute')
+        state = 'loaded' if object.__getattribute__(self, '_target') is not None else 'not loaded'
+        return f"<lazy {module}.{attribute} ({state})>"
+
+
+def lazy(module: str, attribute: str) -> Any:
+    """Proxy for module.attribute (typed Any so call sites read like the real object)"""
+    return LazyObject(module, attribute)
@@ -0,0 +1,53 @@
+"""
+Market Data Provider - Interface the screening pipeline fetches data through
+YFinanceService and AlphaVantageService implement it, and services/providers.py
+adds record/replay providers, so a screen can run against any of them
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+# Calendar days covered by each yfinance-style period string
+PERIOD_DAYS = {'1mo': 31, '3mo': 92, '6mo': 183, '1y': 366, '2y': 731, '5y': 1827, '10y': 3653}
+
+
+class MarketDataProvider(ABC):
+    """
+    Everything screen_stocks() needs from a data source (a provider missing
+    any of these can't be instantiated):
+    - get_universe: ticker list for 'sp500', 'nasdaq100' or 'both'
+    - screen_universe: cheap market cap / volume pre-screen
+    - get_history: OHLCV for many symbols as one (symbol, field) frame
+    - get_stock_data: the feature dict StockFilter.filter_stock() expects
+    """
+
+    name = 'base'
+
+    @abstractmethod
+    def get_universe(self, source: str) -> List[str]:
+        ...
+
+    @abstractmethod
+    def screen_universe(self, tickers: List[str],
+                        min_market_cap: float = 5e9,
+                        min_volume: float = 1.5e6,
+                        max_rsi: float = 30) -> List[str]:
+        ...
+
+    @abstractmethod
+    def get_history(self, symbols: List[str], period: str = '1y') -> pd.DataFrame:
+        ...
+
+    @abstractmethod
+    def get_stock_data(self, symbol: str, period: str = '1y',
+                       hist: Optional[pd.DataFrame] = None) -> Optional[Dict[str, Any]]:
+        ...
+
+    @staticmethod
+    def extract_history(bulk: pd.DataFrame, symbol: str) -> pd.DataFrame:
+        """Pull one symbol's OHLCV out of a get_history() frame"""
+        if bulk.empty or symbol not in bulk.columns.get_level_values(0):
+            return pd.DataFrame()
+        return bulk[symbol].dropna(how='all')
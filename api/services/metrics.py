@@ -0,0 +1,240 @@
+"""
+Metrics - In-process screener instrumentation in Prometheus text format
+Latency histograms per screening stage and per provider call, error and
+timeout counters, cache lookups and screen throughput, rendered for
+/api/metrics. Also holds the switch for per-ticker logging, which is off
+by default so the hot path doesn't pay for console output
+"""
+
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+# Per-ticker log lines (fetch/filter details) only when SCREENER_TICKER_LOGGING=1
+TICKER_LOGGING = os.getenv('SCREENER_TICKER_LOGGING', '') == '1'
+
+# Histogram buckets in seconds (provider calls are ms, stages are minutes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Prometheus text exposition format (the response adds '; charset=utf-8')
+CONTENT_TYPE = 'text/plain; version=0.0.4'
+
+
+def ticker_log(message: str, *args):
+    """
+    print() for per-ticker detail, skipped unless ticker logging is on
+    message is a str.format() template filled from args only when printed,
+    so a disabled line costs a call and no formatting
+    """
+    if TICKER_LOGGING:
+        print(message.format(*args) if args else message)
+
+
+def _escape(text: str, quotes: bool = True) -> str:
+    """Exposition-format escaping: backslash, newline and (in label values) double quote"""
+    text = text.replace('\\', '\\\\').replace('\n', '\\n')
+    return text.replace('"', '\\"') if quotes else text
+
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(ABC):
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        help_line = f"# HELP {self.name} {_escape(self.help, quotes=False)}"
+        return [help_line, f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Sample lines for every label set"""
+
+
+class Counter(_Metric):
+    """Monotonic count per label set"""
+
+    kind = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def labelsets(self) -> List[Tuple[str, ...]]:
+        with self._lock:
+            return list(self._values)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    """Last value per label set"""
+
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count per label set"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._values: Dict[Tuple[str, ...], List[float]] = {}  # bucket counts..., sum, count
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the wall time of a with-block (works across awaits)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[-1] if state else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = []
+        for key, state in items:
+            for bound, count in zip(self.buckets, state):
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {state[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics plus collect hooks that refresh derived values before rendering"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def on_collect(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Prometheus text exposition of every registered metric"""
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# Singleton registry and the screener's metrics
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    'screener_stage_seconds', 'Duration of each screening stage', ['stage'])
+PROVIDER_CALL_SECONDS = registry.histogram(
+    'screener_provider_call_seconds', 'Latency of individual data provider calls', ['provider', 'call'])
+PROVIDER_ERRORS = registry.counter(
+    'screener_provider_errors_total', 'Data provider calls that raised or returned an error', ['provider', 'call'])
+FETCH_TIMEOUTS = registry.counter(
+    'screener_fetch_timeouts_total', 'Per-ticker detail fetches abandoned after the timeout')
+CACHE_LOOKUPS = registry.counter(
+    'screener_cache_lookups_total', 'Cache lookups by cache and result (hit/miss)', ['cache', 'result'])
+CACHE_HIT_RATIO = registry.gauge(
+    'screener_cache_hit_ratio', 'Hits / lookups since process start', ['cache'])
+SCREENS = registry.counter(
+    'screener_screens_total', 'Completed screening runs by outcome', ['status'])
+TICKERS_SCREENED = registry.counter(
+    'screener_tickers_screened_total', 'Universe tickers processed by screening runs')
+TICKERS_PER_SECOND = registry.gauge(
+    'screener_tickers_per_second', 'Throughput of the last screen by stage (universe for total)', ['stage'])
+FILTER_PASSES = registry.gauge(
+    'screener_filter_pass_candidates',
+    'Candidates passing each filter in the last screen, on its own (independent) or with all before it (cumulative)',
+    ['filter', 'mode'])
+
+
+def _update_hit_ratios():
+    caches = {key[0] for key in CACHE_LOOKUPS.labelsets()}
+    for cache in caches:
+        hits = CACHE_LOOKUPS.value(cache=cache, result='hit')
+        total = hits + CACHE_LOOKUPS.value(cache=cache, result='miss')
+        if total:
+            CACHE_HIT_RATIO.set(hits / total, cache=cache)
+
+
+registry.on_collect(_update_hit_ratios)
@@ -0,0 +1,148 @@
+"""
+Price Store - Persistent local OHLCV history (SQLite under api/cache/)
+Bars are keyed by symbol and date, so a daily screen only has to download
+the bars added since the last stored date instead of a full year per ticker
+"""
+
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+PRICE_DB_FILE = Path(__file__).parent.parent / "cache" / "prices.sqlite"
+
+# Columns stored per bar (same names as yfinance history frames)
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# SQLite caps bound parameters per statement; query symbols in batches
+_QUERY_BATCH = 500
+
+
+class PriceStore:
+    """
+    On-disk OHLCV store
+    - ohlcv: one row per (symbol, date)
+    - coverage: earliest date fetched per symbol, so a longer lookback
+      than previously downloaded triggers a backfill
+    """
+
+    def __init__(self, db_file: Path = PRICE_DB_FILE):
+        self.db_file = Path(db_file)
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection (one per call, safe across worker threads)"""
+        if not self._initialized:
+            self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS ohlcv (
+                    symbol TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    open REAL, high REAL, low REAL, close REAL, volume REAL,
+                    PRIMARY KEY (symbol, date)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS coverage (
+                    symbol TEXT PRIMARY KEY,
+                    first_date TEXT NOT NULL
+                );
+            """)
+            self._initialized = True
+        return conn
+
+    @staticmethod
+    def _batches(symbols: List[str]):
+        for start in range(0, len(symbols), _QUERY_BATCH):
+            yield symbols[start:start + _QUERY_BATCH]
+
+    def coverage(self, symbols: List[str]) -> Dict[str, Dict[str, pd.Timestamp]]:
+        """
+        Stored range per symbol: {symbol: {'first': date, 'last': date, 'prev': date}}
+        'prev' is the second-to-last bar (last fully settled bar), if any
+        """
+        result = {}
+        with self._connect() as conn:
+            for batch in self._batches(symbols):
+                marks = ','.join('?' * len(batch))
+                rows = conn.execute(f"""
+                    SELECT c.symbol, c.first_date, MAX(o.date),
+                           (SELECT date FROM ohlcv p WHERE p.symbol = c.symbol
+                            ORDER BY date DESC LIMIT 1 OFFSET 1)
+                    FROM coverage c JOIN ohlcv o ON o.symbol = c.symbol
+                    WHERE c.symbol IN ({marks})
+                    GROUP BY c.symbol
+                """, batch).fetchall()
+                for symbol, first, last, prev in rows:
+                    result[symbol] = {
+                        'first': pd.Timestamp(first),
+                        'last': pd.Timestamp(last),
+                        'prev': pd.Timestamp(prev) if prev else None
+                    }
+        return result
+
+    def close_on(self, symbol: str, date: pd.Timestamp) -> Optional[float]:
+        """Stored close for one bar"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT close FROM ohlcv WHERE symbol = ? AND date = ?",
+                (symbol, date.strftime('%Y-%m-%d'))
+            ).fetchone()
+        return row[0] if row else None
+
+    def write(self, symbol: str, bars: pd.DataFrame, replace: bool = False,
+              first_date: Optional[pd.Timestamp] = None):
+        """
+        Upsert a symbol's bars
+        replace=True drops the symbol's stored history first (full refetch)
+        first_date records how far back this download reached
+        """
+        bars = bars.dropna(subset=['Close'])
+        rows = [
+            (symbol, ts.strftime('%Y-%m-%d'), *(None if pd.isna(v) else float(v) for v in values))
+            for ts, values in zip(bars.index, bars[OHLCV_COLUMNS].itertuples(index=False))
+        ]
+        with self._connect() as conn:
+            if replace:
+                conn.execute("DELETE FROM ohlcv WHERE symbol = ?", (symbol,))
+                conn.execute("DELETE FROM coverage WHERE symbol = ?", (symbol,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO ohlcv VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            if first_date is not None:
+                conn.execute("""
+                    INSERT INTO coverage VALUES (?, ?)
+                    ON CONFLICT(symbol) DO UPDATE SET first_date = MIN(first_date, excluded.first_date)
+                """, (symbol, first_date.strftime('%Y-%m-%d')))
+
+    def load(self, symbols: List[str], start: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """
+        Load stored bars as one date-aligned frame with (symbol, field) columns
+        (same layout as YFinanceService.get_bulk_history)
+        """
+        start_str = start.strftime('%Y-%m-%d') if start is not None else '0000-00-00'
+        frames = []
+        with self._connect() as conn:
+            for batch in self._batches(symbols):
+                marks = ','.join('?' * len(batch))
+                frames.append(pd.read_sql_query(
+                    f"SELECT * FROM ohlcv WHERE symbol IN ({marks}) AND date >= ? ORDER BY date",
+                    conn, params=[*batch, start_str]
+                ))
+
+        data = pd.concat(frames) if frames else pd.DataFrame()
+        if data.empty:
+            return pd.DataFrame()
+
+        data['date'] = pd.to_datetime(data['date'])
+        data = data.rename(columns={c.lower(): c for c in OHLCV_COLUMNS})
+        wide = data.pivot(index='date', columns='symbol', values=OHLCV_COLUMNS)
+        wide.columns = wide.columns.swaplevel(0, 1)
+        wide.index.name = 'Date'
+        return wide.sort_index(axis=1)
+
+
+# Singleton instance
+price_store = PriceStore()
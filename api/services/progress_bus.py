@@ -0,0 +1,131 @@
+"""
+Progress Bus - Publish/subscribe delivery of screening progress
+Screening stages publish progress snapshots; each subscriber is woken as
+soon as something changes, so watching a screen costs nothing while idle.
+Subscribers only ever see the newest snapshot (a slow client skips
+intermediate states instead of buffering them)
+"""
+
+import asyncio
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+# Channel that mirrors every job's progress (used when no job_id is given)
+ALL_JOBS = '*'
+
+# Progress statuses after which a subscription ends
+TERMINAL_STATUSES = ('complete', 'error')
+
+
+def idle_progress() -> Dict[str, Any]:
+    """Progress record for a job that hasn't reported anything yet"""
+    return {
+        'status': 'idle',  # idle, running, complete, error
+        'stage': '',  # fetching_universe, pre_screening, fetching_details, filtering, complete
+        'current': 0,
+        'total': 0,
+        'message': '',
+        'stocks_found': 0
+    }
+
+
+class _Subscription:
+    """Latest-value mailbox for one subscriber"""
+
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+        self._pending: Optional[Dict[str, Any]] = None
+
+    def push(self, snapshot: Dict[str, Any]):
+        self._pending = snapshot
+        try:
+            same_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            same_loop = False
+        if same_loop:
+            self._ready.set()
+        else:
+            self._loop.call_soon_threadsafe(self._ready.set)
+
+    async def next(self) -> Dict[str, Any]:
+        await self._ready.wait()
+        self._ready.clear()
+        return self._pending
+
+
+class ProgressBus:
+    """In-process progress pub/sub keyed by channel (job id)"""
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[_Subscription]] = defaultdict(set)
+        self._latest: Dict[str, Dict[str, Any]] = {}
+
+    def publish(self, channel: str, snapshot: Dict[str, Any]):
+        """Record a channel's newest snapshot and wake its subscribers"""
+        snapshot = {**snapshot, 'job_id': channel}
+        for name in (channel, ALL_JOBS):
+            self._latest[name] = snapshot
+            for subscription in self._subscribers.get(name, ()):
+                subscription.push(snapshot)
+
+    def latest(self, channel: str) -> Optional[Dict[str, Any]]:
+        return self._latest.get(channel)
+
+    def forget(self, channel: str):
+        """Drop a pruned job's last snapshot"""
+        self._latest.pop(channel, None)
+
+    async def subscribe(self, channel: str = ALL_JOBS,
+                        heartbeat: Optional[float] = None) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Yield the channel's current snapshot, then each new one as it's published
+        Ends after a terminal status; yields None every `heartbeat` seconds of
+        silence so callers can keep the connection alive
+        """
+        subscription = _Subscription()
+        self._subscribers[channel].add(subscription)
+        try:
+            snapshot = self._latest.get(channel) or idle_progress()
+            while True:
+                yield snapshot
+                if snapshot.get('status') in TERMINAL_STATUSES:
+                    return
+                while True:
+                    try:
+                        snapshot = await asyncio.wait_for(subscription.next(), heartbeat)
+                        break
+                    except asyncio.TimeoutError:
+                        yield None
+        finally:
+            self._subscribers[channel].discard(subscription)
+            if not self._subscribers[channel]:
+                del self._subscribers[channel]
+
+
+class ProgressReporter:
+    """A job's progress record; every change is published to the bus"""
+
+    def __init__(self, bus: ProgressBus, channel: Optional[str] = None):
+        self.bus = bus
+        self.channel = channel
+        self.state = idle_progress()
+        self._publish()
+
+    def _publish(self):
+        if self.channel is not None:
+            self.bus.publish(self.channel, self.state)
+
+    def update(self, fields: Dict[str, Any]):
+        """Merge fields into the current progress"""
+        self.state.update(fields)
+        self._publish()
+
+    def set(self, state: Dict[str, Any]):
+        """Replace the progress record"""
+        self.state = dict(state)
+        self._publish()
+
+
+# Singleton instance
+progress_bus = ProgressBus()
@@ -0,0 +1,172 @@
+"""
+Market Data Providers - Provider selection plus record/replay
+RecordingProvider captures every response a live provider returns into a
+directory; ReplayProvider serves that directory back at disk speed, so a
+screen can be rerun offline with identical inputs
+
+Selected with environment variables:
+- MARKET_DATA_PROVIDER: 'yfinance' (default), 'alpha_vantage' or 'replay'
+- MARKET_DATA_RECORD=1: record the live provider's responses while screening
+- MARKET_DATA_RECORDING_DIR: recording directory (default cache/recordings/default)
+"""
+
+import json
+import os
+import pickle
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from .market_data import MarketDataProvider
+
+RECORDINGS_DIR = Path(__file__).parent.parent / "cache" / "recordings"
+DEFAULT_RECORDING_DIR = RECORDINGS_DIR / "default"
+
+MARKET_DATA_PROVIDER = os.getenv('MARKET_DATA_PROVIDER', 'yfinance')
+MARKET_DATA_RECORD = os.getenv('MARKET_DATA_RECORD', '') == '1'
+MARKET_DATA_RECORDING_DIR = Path(os.getenv('MARKET_DATA_RECORDING_DIR', str(DEFAULT_RECORDING_DIR)))
+
+
+class Recording:
+    """
+    Directory layout of one recording:
+    - universe/<source>.json: ticker list
+    - prescreen.json: {ticker: passed} from screen_universe
+    - history/<symbol>.pkl: OHLCV frame
+    - stock_data/<symbol>.json: get_stock_data() result (null if it failed)
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+
+    def _path(self, kind: str, name: str, suffix: str) -> Path:
+        safe = name.replace('/', '_')
+        return self.directory / kind / f"{safe}{suffix}"
+
+    def _write(self, path: Path, data: bytes):
+        """Atomic write (temp file + rename), safe from worker threads"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def write_json(self, kind: str, name: str, value: Any):
+        self._write(self._path(kind, name, '.json'), json.dumps(value).encode())
+
+    def read_json(self, kind: str, name: str, default: Any = None) -> Any:
+        try:
+            with open(self._path(kind, name, '.json'), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return default
+
+    def write_frame(self, kind: str, name: str, frame: pd.DataFrame):
+        self._write(self._path(kind, name, '.pkl'), pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def read_frame(self, kind: str, name: str) -> Optional[pd.DataFrame]:
+        try:
+            with open(self._path(kind, name, '.pkl'), 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+
+    def merge_prescreen(self, results: Dict[str, bool]):
+        with self._lock:
+            recorded = self.read_json('.', 'prescreen', {})
+            recorded.update(results)
+            self.write_json('.', 'prescreen', recorded)
+
+
+class RecordingProvider(MarketDataProvider):
+    """Pass-through to a live provider that saves every response it returns"""
+
+    def __init__(self, inner: MarketDataProvider, directory: Path = DEFAULT_RECORDING_DIR):
+        self.inner = inner
+        self.name = f"record:{inner.name}"
+        self.recording = Recording(directory)
+
+    def get_universe(self, source: str) -> List[str]:
+        tickers = self.inner.get_universe(source)
+        self.recording.write_json('universe', source, tickers)
+        return tickers
+
+    def screen_universe(self, tickers: List[str], **kwargs) -> List[str]:
+        candidates = self.inner.screen_universe(tickers, **kwargs)
+        passed = set(candidates)
+        self.recording.merge_prescreen({ticker: ticker in passed for ticker in tickers})
+        return candidates
+
+    def get_history(self, symbols: List[str], period: str = '1y') -> pd.DataFrame:
+        history = self.inner.get_history(symbols, period=period)
+        for symbol in symbols:
+            bars = self.extract_history(history, symbol)
+            if not bars.empty:
+                self.recording.write_frame('history', symbol, bars)
+        return history
+
+    def get_stock_data(self, symbol: str, period: str = '1y',
+                       hist: Optional[pd.DataFrame] = None) -> Optional[Dict[str, Any]]:
+        stock_data = self.inner.get_stock_data(symbol, period=period, hist=hist)
+        self.recording.write_json('stock_data', symbol, stock_data)
+        return stock_data
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Serves a recording without touching the network
+    Anything that wasn't recorded behaves like a ticker with no data;
+    screen_universe replays the recorded pass/fail (thresholds are ignored)
+    """
+
+    name = 'replay'
+
+    def __init__(self, directory: Path = DEFAULT_RECORDING_DIR):
+        self.recording = Recording(directory)
+        if not self.recording.directory.exists():
+            print(f"Replay recording {self.recording.directory} does not exist")
+
+    def get_universe(self, source: str) -> List[str]:
+        return self.recording.read_json('universe', source, [])
+
+    def screen_universe(self, tickers: List[str], **kwargs) -> List[str]:
+        recorded = self.recording.read_json('.', 'prescreen', {})
+        missing = sum(1 for ticker in tickers if ticker not in recorded)
+        if missing:
+            print(f"Replay: {missing} tickers have no recorded pre-screen result, skipping them")
+        return [ticker for ticker in tickers if recorded.get(ticker)]
+
+    def get_history(self, symbols: List[str], period: str = '1y') -> pd.DataFrame:
+        frames = {}
+        for symbol in dict.fromkeys(symbols):
+            bars = self.recording.read_frame('history', symbol)
+            if bars is not None:
+                frames[symbol] = bars
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1).sort_index()
+
+    def get_stock_data(self, symbol: str, period: str = '1y',
+                       hist: Optional[pd.DataFrame] = None) -> Optional[Dict[str, Any]]:
+        return self.recording.read_json('stock_data', symbol)
+
+
+def build_provider(name: str = MARKET_DATA_PROVIDER, record: bool = MARKET_DATA_RECORD,
+                   directory: Path = MARKET_DATA_RECORDING_DIR) -> MarketDataProvider:
+    """Provider by name, optionally wrapped to record its responses"""
+    if name == 'replay':
+        return ReplayProvider(directory)
+    if name == 'alpha_vantage':
+        from .alpha_vantage import alpha_vantage as provider
+    elif name == 'yfinance':
+        from .yfinance_service import yfinance_service as provider
+    else:
+        raise ValueError(f"Unknown market data provider: {name}")
+    return RecordingProvider(provider, directory) if record else provider
+
+
+# Singleton instance (configured provider)
+market_data = build_provider()
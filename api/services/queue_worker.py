@@ -0,0 +1,111 @@
+"""
+Queue Worker - Pulls screening shard tasks from the work queue
+Run as many as there are cores to spare, on any host that shares the queue
+file; API replicas also run one inline while they wait for a queued screen
+
+Usage (from api/):
+    python -m services.queue_worker --processes 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import socket
+import threading
+import uuid
+from typing import Any, Dict, Optional
+
+from .sharding import screen_shard
+from .work_queue import WorkQueue, work_queue
+
+# Seconds an idle worker waits before polling the queue again
+QUEUE_POLL_SECONDS = float(os.getenv('WORK_QUEUE_POLL_SECONDS', '1'))
+
+# Whether an API replica waiting on a queued screen works on its tasks too
+QUEUE_INLINE_WORKER = os.getenv('WORK_QUEUE_INLINE_WORKER', '1') == '1'
+
+
+class QueueWorker:
+    """Claim -> run screen_shard() -> ack, renewing the lease in the background"""
+
+    def __init__(self, queue: WorkQueue = work_queue, worker_id: Optional[str] = None):
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+    def _renew_until(self, task_id: int, done: threading.Event):
+        # Renew at a third of the lease so one missed renewal doesn't lose it
+        while not done.wait(self.queue.lease_seconds / 3):
+            if not self.queue.renew(task_id, self.worker_id):
+                print(f"Worker {self.worker_id} lost the lease on task {task_id}")
+                return
+
+    def run_task(self, task: Dict[str, Any]) -> bool:
+        """Run one claimed task; True if its result was accepted"""
+        params = task['params']
+        done = threading.Event()
+        renewer = threading.Thread(target=self._renew_until, args=(task['task_id'], done), daemon=True)
+        renewer.start()
+        try:
+            result = screen_shard(task['payload']['tickers'], params['prescreen'], params.get('top_k'))
+            # Storing the result can fail too (encoding, SQLite); that fails the task like a shard error
+            return self.queue.ack(task['task_id'], self.worker_id, result)
+        except Exception as e:
+            print(f"Worker {self.worker_id} failed task {task['task_id']} (attempt {task['attempts']}): {e}")
+            try:
+                self.queue.fail(task['task_id'], self.worker_id, str(e))
+            except Exception as fail_error:  # The lease runs out and the task is claimed again
+                print(f"Worker {self.worker_id} could not record failure of task {task['task_id']}: {fail_error}")
+            return False
+        finally:
+            done.set()
+
+    def run_once(self) -> bool:
+        """Claim and run one task; False if the queue had nothing to claim"""
+        task = self.queue.claim(self.worker_id)
+        if task is None:
+            return False
+        self.run_task(task)
+        return True
+
+    def run(self, stop: Optional[threading.Event] = None, until_screen_done: Optional[str] = None):
+        """
+        Work until stop is set (forever by default)
+        until_screen_done: also stop once that screen has no pending or leased tasks
+        """
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            if self.run_once():
+                continue
+            if until_screen_done:
+                status = self.queue.status(until_screen_done)
+                if status['pending'] + status['leased'] == 0:
+                    return
+            stop.wait(QUEUE_POLL_SECONDS)
+
+
+def _work_forever():
+    QueueWorker().run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run screening workers against the shared work queue")
+    parser.add_argument('--processes', type=int, default=1, help="Worker processes on this host")
+    args = parser.parse_args()
+
+    print(f"Starting {args.processes} screening worker(s) on queue {work_queue.db_file}")
+    if args.processes <= 1:
+        _work_forever()
+        return
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=_work_forever, daemon=True) for _ in range(args.processes)]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
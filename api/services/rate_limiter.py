@@ -0,0 +1,45 @@
+"""
+Rate Limiter - Token bucket usable from threads and coroutines
+Callers reserve a token and wait out any deficit: sync callers sleep their
+own thread, async callers await, so the event loop is never blocked
+"""
+
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    `capacity` calls per `per_seconds`, with bursts up to `capacity`
+    Reservations are first come, first served: a waiting caller has already
+    been given its slot, so later callers queue behind it
+    """
+
+    def __init__(self, capacity: int, per_seconds: float):
+        self.capacity = capacity
+        self.rate = capacity / per_seconds  # tokens per second
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token (possibly going into debt); returns seconds to wait"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self):
+        """Block the calling thread until a call is allowed"""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Wait (without blocking the event loop) until a call is allowed"""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
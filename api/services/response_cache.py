@@ -0,0 +1,113 @@
+"""
+Response Cache - On-disk (SQLite) cache of raw API responses
+Entries are keyed by request (function + symbol + parameters) and expire
+by a TTL the caller picks per endpoint. Also keeps a per-day call count so
+a daily quota is shared across restarts and workers
+"""
+
+import json
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+RESPONSE_DB_FILE = Path(__file__).parent.parent / "cache" / "responses.sqlite"
+
+
+class ResponseCache:
+    """
+    - responses: key -> JSON payload + fetched_at
+    - usage: calls made per (namespace, UTC day)
+    """
+
+    def __init__(self, namespace: str, db_file: Path = RESPONSE_DB_FILE):
+        self.namespace = namespace
+        self.db_file = Path(db_file)
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS usage (
+                    namespace TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    calls INTEGER NOT NULL,
+                    PRIMARY KEY (namespace, day)
+                );
+            """)
+            self._initialized = True
+        return conn
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str, ttl: float) -> Optional[Dict[str, Any]]:
+        """Cached payload if it is younger than ttl seconds"""
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT payload, fetched_at FROM responses WHERE key = ?", (self._key(key),)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading response cache: {e}")
+            return None
+        if row is None or time.time() - row[1] > ttl:
+            return None
+        return json.loads(row[0])
+
+    def put(self, key: str, payload: Dict[str, Any]):
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                    (self._key(key), json.dumps(payload), time.time())
+                )
+        except sqlite3.Error as e:
+            print(f"Error writing response cache: {e}")
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+    def calls_today(self) -> int:
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT calls FROM usage WHERE namespace = ? AND day = ?",
+                    (self.namespace, self._today())
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading API usage: {e}")
+            return 0
+        return row[0] if row else 0
+
+    def reserve_call(self, daily_limit: int) -> bool:
+        """Count one call against today's quota; False if the quota is used up"""
+        try:
+            with self._connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT calls FROM usage WHERE namespace = ? AND day = ?",
+                    (self.namespace, self._today())
+                ).fetchone()
+                calls = row[0] if row else 0
+                if calls >= daily_limit:
+                    return False
+                conn.execute(
+                    "INSERT OR REPLACE INTO usage VALUES (?, ?, ?)",
+                    (self.namespace, self._today(), calls + 1)
+                )
+                return True
+        except sqlite3.Error as e:
+            print(f"Error updating API usage: {e}")
+            return True  # Don't block calls because bookkeeping failed
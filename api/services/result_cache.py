@@ -0,0 +1,128 @@
+"""
+Result Cache - Last screen's results, kept in memory and backed by one file
+Cache hits are served from memory, including the stocks list already
+serialized for the response, so /api/daily-stocks doesn't re-read or
+re-encode anything. The file is written atomically in compact JSON, and
+workers notice another worker's write by its size/mtime and reload
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+RESULT_CACHE_FILE = Path(__file__).parent.parent / "cache" / "filtered_stocks.json"
+RESULT_CACHE_HOURS = 24  # Refresh once per day
+
+# How often a cache hit re-checks the file for another worker's write
+CHANGE_CHECK_SECONDS = 1.0
+
+
+def encode_json(value: Any) -> bytes:
+    """Compact UTF-8 JSON, byte-identical to what JSONResponse sends"""
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+
+
+class ResultCache:
+    """
+    Entry: {'data': cache dict, 'stocks_json': encoded data['stocks'] (None if
+    it can't be encoded), 'expires_at': datetime, 'derived': per-screen memo}
+    """
+
+    def __init__(self, path: Path = RESULT_CACHE_FILE,
+                 max_age_hours: float = RESULT_CACHE_HOURS,
+                 check_seconds: float = CHANGE_CHECK_SECONDS):
+        self.path = Path(path)
+        self.max_age = timedelta(hours=max_age_hours)
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._derived_lock = threading.Lock()
+        self._entry: Optional[Dict[str, Any]] = None
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._checked_at = float('-inf')
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _make_entry(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            stocks_json = encode_json(data.get('stocks', []))
+        except ValueError as e:
+            print(f"Cached stocks can't be pre-encoded: {e}")
+            stocks_json = None
+        timestamp = datetime.fromisoformat(data.get('timestamp', '2000-01-01'))
+        return {'data': data, 'stocks_json': stocks_json, 'expires_at': timestamp + self.max_age, 'derived': {}}
+
+    def _reload(self, signature: Optional[Tuple[int, int, int]]):
+        """Replace the memory entry with the file's contents (caller holds the lock)"""
+        entry = None
+        if signature is not None:
+            try:
+                with open(self.path, 'rb') as f:
+                    entry = self._make_entry(json.loads(f.read()))
+            except Exception as e:
+                print(f"Error loading cache: {e}")
+        self._entry = entry
+        self._signature = signature
+
+    def get(self) -> Optional[Dict[str, Any]]:
+        """Entry for the last screen if it's still fresh"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked_at >= self.check_seconds:
+                self._checked_at = now
+                signature = self._stat()
+                if signature != self._signature:
+                    self._reload(signature)
+            entry = self._entry
+        if entry is None or datetime.now() >= entry['expires_at']:
+            return None
+        return entry
+
+    def derived(self, entry: Dict[str, Any], name: str,
+                build: Callable[[Dict[str, Any]], Any]) -> Any:
+        """
+        build(entry), computed once per cached screen and kept with it
+        (e.g. encoded response variants); a new screen starts a fresh memo
+        """
+        with self._derived_lock:
+            if name not in entry['derived']:
+                entry['derived'][name] = build(entry)
+            return entry['derived'][name]
+
+    def save(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Write the results atomically (temp file + rename) and keep them in memory"""
+        entry = self._make_entry(data)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"Error saving cache: {e}")
+            tmp.unlink(missing_ok=True)
+        with self._lock:
+            self._entry = entry
+            self._signature = self._stat()
+            self._checked_at = time.monotonic()
+        return entry
+
+    def clear(self):
+        """Drop the cached results (memory and file)"""
+        self.path.unlink(missing_ok=True)
+        with self._lock:
+            self._entry = None
+            self._signature = None
+            self._checked_at = float('-inf')
+
+
+# Singleton instance
+result_cache = ResultCache()
@@ -0,0 +1,240 @@
+"""
+Result Store - Every stock that passed a screen, not just the top 10
+Each screen's passing stocks are kept in SQLite with their rank and the
+columns results can be sorted or filtered by, indexed per screen, so
+/api/results pages through rank 11, 50 or 500 without another screen.
+Pages use keyset cursors pinned to one screen: a new screen landing
+between two pages doesn't shift or repeat rows
+"""
+
+import base64
+import json
+import math
+import os
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+RESULT_STORE_DB_FILE = Path(__file__).parent.parent / "cache" / "results.sqlite"
+
+# Screens kept; older ones (and cursors into them) expire
+RESULT_STORE_KEEP_SCREENS = int(os.getenv('RESULT_STORE_KEEP_SCREENS', '10'))
+
+# Sort key -> (column, default order). A missing value is stored as NULL and
+# pages last in either order
+SORT_KEYS = {
+    'score': ('composite_score', 'desc'),
+    'rsi': ('rsi', 'asc'),              # Most oversold first
+    'pe': ('pe_ratio', 'asc'),          # Cheapest first
+    'drawdown': ('drawdown', 'desc'),   # Furthest below the 52-week high first
+}
+
+MAX_PAGE_SIZE = 500
+
+
+def _finite(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)) and math.isfinite(value):
+        return float(value)
+    return None
+
+
+def _clean(stock: Dict[str, Any]) -> Dict[str, Any]:
+    """NaN/inf -> None, so every stored row is valid JSON"""
+    return {k: None if isinstance(v, float) and not math.isfinite(v) else v for k, v in stock.items()}
+
+
+def _sort_values(stock: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    price_vs_high = _finite(stock.get('price_vs_52w_high'))
+    return {
+        'composite_score': _finite(stock.get('composite_score')),
+        'rsi': _finite(stock.get('rsi')),
+        'pe_ratio': _finite(stock.get('pe_ratio')),
+        'drawdown': 1 - price_vs_high if price_vs_high is not None else None,
+    }
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Cursor state; ValueError if it isn't one of ours"""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not {'screen_id', 'sort', 'order', 'sectors', 'value', 'rank'} <= set(state):
+            raise ValueError
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return state
+
+
+class ResultStore:
+    """
+    - screens: screen_id, timestamp, universe, counts
+    - results: one row per passing stock with its rank (by composite_score,
+      1 = best), sector, sort columns and the stock as JSON
+    Indexes lead with screen_id, then the sort column and rank, so a page is
+    an index range scan that starts right after the cursor. Each sort column
+    has one index per direction: ties always go by rank ascending, and an
+    index only serves ORDER BY terms that all run with it or all against it.
+    Rows without a sort value (NULL) follow the others by rank, as a second
+    range of the same index
+    """
+
+    def __init__(self, db_file: Path = RESULT_STORE_DB_FILE,
+                 keep_screens: int = RESULT_STORE_KEEP_SCREENS):
+        self.db_file = Path(db_file)
+        self.keep_screens = keep_screens
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Stores from before missing sort values were NULL hold sentinels in
+            # NOT NULL columns; they only cache recent screens, so start over
+            columns = {row[1]: row[3] for row in conn.execute("PRAGMA table_info(results)")}
+            if columns.get('rsi'):
+                conn.executescript("DROP TABLE results; DROP TABLE IF EXISTS screens;")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS screens (
+                    screen_id TEXT PRIMARY KEY,
+                    timestamp TEXT NOT NULL,
+                    universe TEXT,
+                    total_screened INTEGER,
+                    candidates INTEGER,
+                    passed INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS results (
+                    screen_id TEXT NOT NULL,
+                    rank INTEGER NOT NULL,
+                    symbol TEXT NOT NULL,
+                    sector TEXT,
+                    composite_score REAL,
+                    rsi REAL,
+                    pe_ratio REAL,
+                    drawdown REAL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (screen_id, rank)
+                );
+                CREATE INDEX IF NOT EXISTS results_score ON results (screen_id, composite_score, rank);
+                CREATE INDEX IF NOT EXISTS results_score_desc ON results (screen_id, composite_score DESC, rank);
+                CREATE INDEX IF NOT EXISTS results_rsi ON results (screen_id, rsi, rank);
+                CREATE INDEX IF NOT EXISTS results_rsi_desc ON results (screen_id, rsi DESC, rank);
+                CREATE INDEX IF NOT EXISTS results_pe ON results (screen_id, pe_ratio, rank);
+                CREATE INDEX IF NOT EXISTS results_pe_desc ON results (screen_id, pe_ratio DESC, rank);
+                CREATE INDEX IF NOT EXISTS results_drawdown ON results (screen_id, drawdown, rank);
+                CREATE INDEX IF NOT EXISTS results_drawdown_desc ON results (screen_id, drawdown DESC, rank);
+                CREATE INDEX IF NOT EXISTS results_sector ON results (screen_id, sector, rank);
+            """)
+            self._initialized = True
+        return conn
+
+    def save(self, stocks: List[Dict[str, Any]], **meta) -> str:
+        """
+        Store a screen's passing stocks (any order; ranked here by
+        composite_score, ties keeping the given order) and drop screens
+        beyond keep_screens; returns the new screen_id
+        """
+        screen_id = uuid.uuid4().hex[:12]
+        rows = []
+        for rank, stock in enumerate(sorted(stocks, key=lambda stock: -stock['composite_score']), 1):
+            values = _sort_values(stock)
+            rows.append((
+                screen_id, rank, stock['symbol'], stock.get('sector'),
+                values['composite_score'], values['rsi'], values['pe_ratio'], values['drawdown'],
+                json.dumps({**_clean(stock), 'rank': rank}, separators=(',', ':'), allow_nan=False)
+            ))
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO screens VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (screen_id, meta.get('timestamp') or time.strftime('%Y-%m-%dT%H:%M:%S'), meta.get('universe'),
+                 meta.get('total_screened'), meta.get('candidates'), len(stocks), time.time())
+            )
+            conn.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            expired = [row[0] for row in conn.execute(
+                "SELECT screen_id FROM screens ORDER BY created_at DESC LIMIT -1 OFFSET ?", (self.keep_screens,)
+            )]
+            for old_id in expired:
+                conn.execute("DELETE FROM results WHERE screen_id = ?", (old_id,))
+                conn.execute("DELETE FROM screens WHERE screen_id = ?", (old_id,))
+        return screen_id
+
+    def screen(self, screen_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """A stored screen's metadata (the latest if screen_id is None)"""
+        query = "SELECT screen_id, timestamp, universe, total_screened, candidates, passed FROM screens "
+        with self._connect() as conn:
+            if screen_id is None:
+                row = conn.execute(query + "ORDER BY created_at DESC LIMIT 1").fetchone()
+            else:
+                row = conn.execute(query + "WHERE screen_id = ?", (screen_id,)).fetchone()
+        if row is None:
+            return None
+        keys = ['screen_id', 'timestamp', 'universe', 'total_screened', 'candidates', 'passed']
+        return dict(zip(keys, row))
+
+    def page(self, screen_id: str, sort: str = 'score', order: Optional[str] = None,
+             sectors: Optional[List[str]] = None, limit: int = 50,
+             after: Optional[Tuple[float, int]] = None) -> Dict[str, Any]:
+        """
+        One page of a screen's results
+        after: (sort value, rank) of the previous page's last row (value None
+        for a stock without one)
+        Returns {'stocks_json': encoded JSON array, 'count', 'total' (rows
+        matching the sector filter), 'next': (value, rank) or None if last page}
+        """
+        column, default_order = SORT_KEYS[sort]
+        order = order or default_order
+        direction, comparison = ('ASC', '>') if order == 'asc' else ('DESC', '<')
+
+        where = ["screen_id = ?"]
+        params: List[Any] = [screen_id]
+        if sectors:
+            where.append(f"sector IN ({','.join('?' * len(sectors))})")
+            params.extend(sectors)
+        filtered = ' AND '.join(where)
+
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        with self._connect() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM results WHERE {filtered}", params).fetchone()[0]
+
+            rows = []
+            if after is None or after[0] is not None:
+                seek, seek_params = "", []
+                if after is not None:
+                    # Ties on the sort value are broken by rank, best first; the extra
+                    # inclusive bound lets SQLite seek straight to the cursor in the index
+                    seek = f" AND {column} {comparison}= ? AND ({column} {comparison} ? OR ({column} = ? AND rank > ?))"
+                    seek_params = [after[0], after[0], after[0], after[1]]
+                rows = conn.execute(
+                    f"SELECT {column}, rank, data FROM results WHERE {filtered} AND {column} IS NOT NULL{seek} "
+                    f"ORDER BY {column} {direction}, rank ASC LIMIT ?",
+                    params + seek_params + [limit + 1]
+                ).fetchall()
+
+            if len(rows) <= limit:
+                # Then the stocks without a sort value, by rank
+                after_rank = after[1] if after is not None and after[0] is None else 0
+                rows += conn.execute(
+                    f"SELECT {column}, rank, data FROM results WHERE {filtered} AND {column} IS NULL AND rank > ? "
+                    f"ORDER BY rank ASC LIMIT ?",
+                    params + [after_rank, limit + 1 - len(rows)]
+                ).fetchall()
+
+        more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            'stocks_json': ('[' + ','.join(row[2] for row in rows) + ']').encode('utf-8'),
+            'count': len(rows),
+            'total': total,
+            'next': (rows[-1][0], rows[-1][1]) if more else None,
+        }
+
+
+# Singleton instance
+result_store = ResultStore()
@@ -0,0 +1,130 @@
+"""
+Screening Job Manager - Single-flight screening jobs with per-job progress
+Concurrent requests for the same screen join the one in-flight job instead
+of starting duplicate multi-minute screens
+"""
+
+import asyncio
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .metrics import SCREENS
+from .progress_bus import ProgressBus, ProgressReporter, progress_bus
+
+# Finished jobs kept around for /api/screening-progress and status lookups
+MAX_FINISHED_JOBS = 20
+
+
+class ScreeningJobManager:
+    """
+    Tracks screening jobs by ID
+    Each job record holds its own progress reporter (published on the
+    progress bus under the job id), the stocks that have passed so far,
+    and the asyncio task running the screen
+    """
+
+    def __init__(self, bus: ProgressBus = progress_bus, max_finished: int = MAX_FINISHED_JOBS):
+        self.bus = bus
+        self.max_finished = max_finished
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[str, str] = {}  # job key -> job id
+
+    def submit(self, key: str, run: Callable[[Dict[str, Any]], Awaitable[Any]]) -> Dict[str, Any]:
+        """
+        Start run(job) as a new job, or return the in-flight job with the same key
+        """
+        job_id = self._inflight.get(key)
+        if job_id is not None:
+            return self._jobs[job_id]
+
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            'id': job_id,
+            'key': key,
+            'status': 'running',
+            'created_at': datetime.now().isoformat(),
+            'finished_at': None,
+            'progress': ProgressReporter(self.bus, channel=job_id),
+            'passed': [],
+            'stock_listeners': [],
+            'error': None,
+        }
+        self._jobs[job['id']] = job
+        self._inflight[key] = job['id']
+        job['task'] = asyncio.create_task(self._run(job, run))
+        self._prune()
+        return job
+
+    async def _run(self, job: Dict[str, Any], run: Callable[[Dict[str, Any]], Awaitable[Any]]):
+        try:
+            result = await run(job)
+            job['status'] = 'complete'
+            SCREENS.inc(status='complete')
+            return result
+        except Exception as e:
+            job['status'] = 'error'
+            SCREENS.inc(status='error')
+            job['error'] = str(e)
+            job['progress'].update({'status': 'error', 'stage': 'error', 'message': str(e)})
+            raise
+        finally:
+            job['finished_at'] = datetime.now().isoformat()
+            job['stock_listeners'].clear()
+            if self._inflight.get(job['key']) == job['id']:
+                del self._inflight[job['key']]
+
+    async def wait(self, job: Dict[str, Any]) -> Any:
+        """Await a job's result; a cancelled waiter doesn't cancel the job"""
+        return await asyncio.shield(job['task'])
+
+    def publish_stock(self, job: Dict[str, Any], stock: Dict[str, Any]):
+        """Record a stock that passed all filters and notify stream listeners"""
+        job['passed'].append(stock)
+        for listener in list(job['stock_listeners']):
+            listener(stock)
+
+    def add_stock_listener(self, job: Dict[str, Any], listener: Callable[[Dict[str, Any]], None]):
+        """Replay stocks passed so far to a late joiner, then follow new ones"""
+        for stock in job['passed']:
+            listener(stock)
+        if job['status'] == 'running':
+            job['stock_listeners'].append(listener)
+
+    def has_stock_listeners(self, job: Dict[str, Any]) -> bool:
+        """Whether anyone is following the job's stocks as they pass"""
+        return bool(job['stock_listeners'])
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._jobs.get(job_id)
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Most recently started job"""
+        return next(reversed(self._jobs.values()), None)
+
+    def describe(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """JSON-safe job summary"""
+        return {
+            'job_id': job['id'],
+            'key': job['key'],
+            'status': job['status'],
+            'created_at': job['created_at'],
+            'finished_at': job['finished_at'],
+            'progress': dict(job['progress'].state),
+            'stocks_found': len(job['passed']),
+            'error': job['error'],
+        }
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [self.describe(job) for job in reversed(self._jobs.values())]
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job['status'] != 'running']
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+            self.bus.forget(job_id)
+
+
+# Singleton instance
+screening_jobs = ScreeningJobManager()
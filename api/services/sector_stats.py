@@ -0,0 +1,92 @@
+"""
+Sector Stats - Sector and industry aggregates over the candidate feature table
+Group medians and percentiles of valuation, momentum and growth metrics,
+and each candidate's percentile rank within its sector, computed with
+pandas group-bys over the last screen's feature table (no data fetches)
+"""
+
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from .filter_engine import FilterEngine, filter_engine
+
+# Reported metrics (drawdown is derived, the rest are feature table columns)
+METRICS = ['rsi', 'drawdown', 'pe_ratio', 'price_to_sales', 'revenue_growth', 'eps_growth']
+
+# Group percentiles (0.5 is reported as the median)
+PERCENTILES = [0.10, 0.25, 0.50, 0.75, 0.90]
+
+
+def _metric_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """The reported metrics per candidate (drawdown = 1 - price / 52-week high)"""
+    metrics = frame[['rsi', 'pe_ratio', 'price_to_sales', 'revenue_growth', 'eps_growth']].copy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        metrics['drawdown'] = 1 - frame['current_price'] / frame['high_52w'].where(frame['high_52w'] > 0)
+    return metrics[METRICS].replace([np.inf, -np.inf], np.nan)
+
+
+def _value(value: Any, digits: int = 4) -> Any:
+    """JSON-safe rounded float (NaN -> None)"""
+    return None if pd.isna(value) else round(float(value), digits)
+
+
+def _group_stats(metrics: pd.DataFrame, keys: List[str]) -> List[Dict[str, Any]]:
+    """Count plus per-metric non-null count, median and percentiles for each group"""
+    grouped = metrics.groupby(keys, sort=True)
+    sizes = grouped.size()
+    counts = grouped[METRICS].count()
+    quantiles = grouped[METRICS].quantile(PERCENTILES)  # Index: keys + quantile
+
+    groups = []
+    for key, size in sizes.items():
+        rows = quantiles.loc[key]
+        stats = {}
+        for metric in METRICS:
+            column = rows[metric]
+            stats[metric] = {
+                'count': int(counts.at[key, metric]),
+                'median': _value(column.loc[0.50]),
+                **{f"p{round(q * 100)}": _value(column.loc[q]) for q in PERCENTILES if q != 0.50},
+            }
+        names = key if isinstance(key, tuple) else (key,)
+        groups.append({**dict(zip(keys, names)), 'count': int(size), 'metrics': stats})
+    return groups
+
+
+def sector_stats(frame: pd.DataFrame, engine: FilterEngine = filter_engine) -> Dict[str, Any]:
+    """
+    {'sectors': [...], 'industries': [...], 'candidates': [...]}
+    Candidates carry their metric values and within-sector percentile ranks
+    (0-1, 1 = highest value in the sector; None where the value is missing)
+    and whether they passed all filters
+    """
+    if frame.empty:
+        return {'metrics': METRICS, 'sectors': [], 'industries': [], 'candidates': []}
+
+    metrics = _metric_frame(frame)
+    metrics['sector'] = frame['sector'].fillna('Unknown')
+    metrics['industry'] = frame['industry'].fillna('Unknown')
+
+    percentile_ranks = metrics.groupby('sector')[METRICS].rank(pct=True, method='average')
+    passed = engine.filter_masks(frame).to_numpy().all(axis=1)
+
+    candidates = []
+    for position, (index, row) in enumerate(metrics.iterrows()):
+        candidates.append({
+            'symbol': frame.at[index, 'symbol'],
+            'name': frame.at[index, 'name'],
+            'sector': row['sector'],
+            'industry': row['industry'],
+            'passed_filters': bool(passed[position]),
+            'values': {metric: _value(row[metric]) for metric in METRICS},
+            'sector_percentiles': {metric: _value(percentile_ranks.at[index, metric], 3) for metric in METRICS},
+        })
+
+    return {
+        'metrics': METRICS,
+        'sectors': _group_stats(metrics, ['sector']),
+        'industries': _group_stats(metrics, ['sector', 'industry']),
+        'candidates': candidates,
+    }
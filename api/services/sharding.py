@@ -0,0 +1,198 @@
+"""
+Sharded Screening - Runs the per-ticker screening work on a process pool
+The universe is split into shards; each shard is pre-screened, fetched,
+given indicators and filtered in its own worker process (so pandas work
+isn't serialized by the GIL), and the parent merges the ranked partial
+top-K lists. Meant for 1,000+ ticker universes (e.g. a Russell 3000 file)
+
+Configured with environment variables:
+- SCREENING_MODE: 'single' (default), 'sharded', 'auto' (sharded from
+  SHARDED_MIN_TICKERS tickers up), or 'queue' (shards go through the shared
+  work queue to any number of workers, see services/work_queue.py)
+- SHARD_SIZE: tickers per shard (default 250)
+- SHARD_WORKERS: worker processes (default: CPU count)
+
+The worker pool lives as long as the API process, so workers import pandas
+and yfinance once rather than on every screen. Their Yahoo downloads share
+the host-wide YF_DOWNLOAD_SLOTS limit (services/yfinance_service.py)
+"""
+
+import asyncio
+import heapq
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from typing import Any, Callable, Dict, List, Optional
+
+from .metrics import PROVIDER_ERRORS
+
+SCREENING_MODE = os.getenv('SCREENING_MODE', 'single')
+SHARD_SIZE = int(os.getenv('SHARD_SIZE', '250'))
+SHARD_WORKERS = int(os.getenv('SHARD_WORKERS', str(os.cpu_count() or 1)))
+SHARDED_MIN_TICKERS = int(os.getenv('SHARDED_MIN_TICKERS', '1000'))
+
+# Long-lived worker pool, shared by every sharded screen in this process
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def shard_pool(max_workers: int = SHARD_WORKERS) -> ProcessPoolExecutor:
+    """
+    The shared worker pool, created on first use (and again with a different
+    size or after it broke); workers are started as shards need them
+    """
+    global _pool, _pool_workers
+    max_workers = max(1, max_workers)
+    with _pool_lock:
+        if _pool is None or _pool_workers != max_workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # Spawned workers start clean: no inherited locks, threads or SQLite handles
+            _pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool_workers = max_workers
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    """Drop a broken pool so the next screen starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+
+
+def use_sharding(universe_size: int, mode: str = SCREENING_MODE) -> bool:
+    """Whether a universe of this size is screened in shards"""
+    if mode == 'sharded':
+        return True
+    if mode == 'auto':
+        return universe_size >= SHARDED_MIN_TICKERS
+    return False
+
+
+def split_shards(tickers: List[str], shard_size: int = SHARD_SIZE) -> List[List[str]]:
+    """Consecutive slices, so merging shard results keeps the universe order"""
+    shard_size = max(1, shard_size)
+    return [tickers[i:i + shard_size] for i in range(0, len(tickers), shard_size)]
+
+
+def screen_shard(tickers: List[str], prescreen: Dict[str, float], top_k: Optional[int]) -> Dict[str, Any]:
+    """
+    Full screen of one shard (runs in a worker process)
+    Uses the worker's own provider singletons, so caches and stores on disk
+    are shared with the parent but nothing in memory is
+    Returns the shard's candidates, their feature rows, every stock that
+    passed all filters (in shard order), its ranked top_k and the passed count
+    """
+    from .concurrent_fetch import fetch_concurrently, DETAIL_FETCH_WORKERS, DETAIL_FETCH_TIMEOUT
+    from .filter_engine import filter_engine, rank_stocks
+    from .providers import market_data
+
+    started = time.perf_counter()
+    candidates = market_data.screen_universe(tickers, **prescreen)
+    stocks: List[Dict[str, Any]] = []
+    if candidates:
+        history = market_data.get_history(candidates)
+
+        def fetch_details(ticker: str):
+            return market_data.get_stock_data(ticker, hist=market_data.extract_history(history, ticker))
+
+        # Threads inside the shard overlap network waits; processes spread the CPU work
+        stocks = asyncio.run(fetch_concurrently(
+            candidates, fetch_details,
+            max_workers=DETAIL_FETCH_WORKERS,
+            timeout=DETAIL_FETCH_TIMEOUT
+        ))
+
+    passing = filter_engine.passing(stocks)
+    return {
+        'tickers': len(tickers),
+        'candidates': candidates,
+        'stocks': stocks,
+        'passing': passing,
+        'passed': len(passing),
+        'ranked': rank_stocks(passing, top_k),
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def merge_ranked(partials: List[List[Dict[str, Any]]], top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Merge per-shard ranked lists (each sorted by composite_score, descending)
+    Ties keep shard order, so the result matches ranking the whole universe at once
+    """
+    merged = heapq.merge(*partials, key=lambda stock: -stock['composite_score'])
+    return list(merged if top_k is None else islice(merged, top_k))
+
+
+def empty_shard(tickers: int = 0) -> Dict[str, Any]:
+    """screen_shard() result for a shard that produced nothing"""
+    return {'tickers': tickers, 'candidates': [], 'stocks': [], 'passing': [], 'passed': 0, 'ranked': [],
+            'seconds': 0.0}
+
+
+def combine_shards(results: List[Dict[str, Any]], top_k: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Aggregate screen_shard() results given in shard order: candidates,
+    feature rows and passing stocks concatenated, ranked lists merged,
+    passed counts summed
+    """
+    return {
+        'candidates': [ticker for r in results for ticker in r['candidates']],
+        'stocks': [stock for r in results for stock in r['stocks']],
+        'passing': [stock for r in results for stock in r['passing']],
+        'ranked': merge_ranked([r['ranked'] for r in results], top_k),
+        'passed': sum(r['passed'] for r in results),
+    }
+
+
+async def screen_sharded(tickers: List[str],
+                         prescreen: Dict[str, float],
+                         top_k: Optional[int] = None,
+                         shard_size: int = SHARD_SIZE,
+                         max_workers: int = SHARD_WORKERS,
+                         on_shard: Optional[Callable[[Dict[str, Any], int], None]] = None) -> Dict[str, Any]:
+    """
+    Screen tickers in shards on a process pool
+    on_shard(result, completed_count) fires in the parent as each shard finishes
+    Returns the merged candidates, feature rows, passing stocks, ranked top_k
+    and passed count (candidates, rows and passing stocks in universe order)
+    """
+    shards = split_shards(tickers, shard_size)
+    if not shards:
+        return combine_shards([], top_k)
+
+    loop = asyncio.get_running_loop()
+    executor = shard_pool(max_workers)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(shards)
+
+    async def run_one(index: int, shard: List[str]):
+        try:
+            result = await loop.run_in_executor(executor, screen_shard, shard, prescreen, top_k)
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                _discard_pool(executor)
+            # A failed shard counts as tickers without data, like a failed fetch
+            PROVIDER_ERRORS.inc(provider='sharding', call='screen_shard')
+            print(f"  Error screening shard {index + 1}/{len(shards)} ({shard[0]}..{shard[-1]}): {e}")
+            result = empty_shard(len(shard))
+        results[index] = result
+        return result
+
+    tasks = [asyncio.create_task(run_one(i, shard)) for i, shard in enumerate(shards)]
+    try:
+        for completed, next_done in enumerate(asyncio.as_completed(tasks), 1):
+            result = await next_done
+            if on_shard:
+                on_shard(result, completed)
+    finally:
+        # The pool outlives the screen; shards that haven't started yet are dropped
+        for task in tasks:
+            task.cancel()
+
+    return combine_shards(results, top_k)
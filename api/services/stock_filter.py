@@ -8,9 +8,26 @@ KEY ADVANTAGE: Can screen 500+ stocks in 3-5 minutes instead of 100+ minutes
 - Pre-screens large universe before detailed analysis
 """
 
+import asyncio
+from numbers import Real
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
-from .yfinance_service import yfinance_service
+from .alpha_vantage import alpha_vantage
+from .market_data import MarketDataProvider
+from .providers import market_data
+from .metrics import ticker_log
+
+
+def _log_numbers(message: str, *values):
+    """
+    ticker_log() a line that formats values as numbers
+    The values are checked even with logging off: filter_stock() has always
+    rejected a stock whose value can't be formatted as a number
+    """
+    for value in values:
+        if not isinstance(value, Real):
+            raise TypeError(f"Expected a number, got {value!r}")
+    ticker_log(message, *values)
 
 
 class StockFilter:
@@ -40,8 +57,10 @@ class StockFilter:
     MIN_GROSS_MARGIN = 0.30  # 30%
     MAX_TRAILING_PE = 25.0
     
-    def __init__(self):
-        self.yf = yfinance_service
+    def __init__(self, provider: Optional[MarketDataProvider] = None):
+        # Data source for screening (configured via MARKET_DATA_PROVIDER)
+        self.provider = provider or market_data
+        self.av = alpha_vantage
     
     
     def filter_stock(self, stock_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -64,82 +83,82 @@ class StockFilter:
         12. Price/Sales ≤ 4.0
         """
         symbol = stock_data['symbol']
-        print(f"\n{'='*60}")
-        print(f"Analyzing: {symbol}")
-        print(f"{'='*60}")
+        ticker_log("\n{}", '=' * 60)
+        ticker_log("Analyzing: {}", symbol)
+        ticker_log("{}", '=' * 60)
         
         try:
             current_price = stock_data['current_price']
             
             # === FILTER 1: Market Cap ===
             market_cap = stock_data['market_cap']
-            print(f"Market Cap: ${market_cap:,.0f}")
+            _log_numbers("Market Cap: ${:,.0f}", market_cap)
             if market_cap < self.MIN_MARKET_CAP:
-                print(f"FAIL: Market cap below ${self.MIN_MARKET_CAP:,.0f}")
+                ticker_log("FAIL: Market cap below ${:,.0f}", self.MIN_MARKET_CAP)
                 return None
-            print(f"PASS: Market cap")
+            ticker_log("PASS: Market cap")
             
             # === FILTER 2: Average Volume ===
             avg_volume = stock_data['avg_volume']
-            print(f"Avg Volume (20d): {avg_volume:,.0f}")
+            _log_numbers("Avg Volume (20d): {:,.0f}", avg_volume)
             if avg_volume < self.MIN_AVG_VOLUME:
-                print(f"FAIL: Volume below {self.MIN_AVG_VOLUME:,}")
+                ticker_log("FAIL: Volume below {:,}", self.MIN_AVG_VOLUME)
                 return None
-            print(f"PASS: Volume")
+            ticker_log("PASS: Volume")
             
             # === FILTER 3: RSI ===
             rsi_value = stock_data.get('rsi')
             if not rsi_value:
-                print(f"FAIL: No RSI data")
+                ticker_log("FAIL: No RSI data")
                 return None
-            print(f"RSI (14): {rsi_value:.2f}")
+            _log_numbers("RSI (14): {:.2f}", rsi_value)
             if rsi_value > self.MAX_RSI:
-                print(f"FAIL: RSI above {self.MAX_RSI}")
+                ticker_log("FAIL: RSI above {}", self.MAX_RSI)
                 return None
-            print(f"PASS: RSI (Oversold)")
+            ticker_log("PASS: RSI (Oversold)")
             
             # === FILTER 4: 52-Week High ===
             high_52w = stock_data.get('high_52w')
             if high_52w:
                 price_vs_52w = current_price / high_52w
-                print(f"Price vs 52W High: {price_vs_52w:.2%} (${current_price:.2f} / ${high_52w:.2f})")
+                _log_numbers("Price vs 52W High: {:.2%} (${:.2f} / ${:.2f})", price_vs_52w, current_price, high_52w)
                 if price_vs_52w > self.MAX_PRICE_VS_52W_HIGH:
-                    print(f"FAIL: Price > {self.MAX_PRICE_VS_52W_HIGH:.0%} of 52w high")
+                    ticker_log("FAIL: Price > {:.0%} of 52w high", self.MAX_PRICE_VS_52W_HIGH)
                     return None
-                print(f"PASS: Price vs 52w high")
+                ticker_log("PASS: Price vs 52w high")
             else:
-                print(f"WARNING: No 52w high data")
+                ticker_log("WARNING: No 52w high data")
                 price_vs_52w = None
             
             # === FILTER 5: 20-Day SMA ===
             sma_20 = stock_data.get('sma_20')
             if sma_20:
-                print(f"Price vs 20D SMA: ${current_price:.2f} vs ${sma_20:.2f}")
+                _log_numbers("Price vs 20D SMA: ${:.2f} vs ${:.2f}", current_price, sma_20)
                 if current_price > sma_20:
-                    print(f"FAIL: Price above 20D SMA")
+                    ticker_log("FAIL: Price above 20D SMA")
                     return None
-                print(f"PASS: Price below 20D SMA")
+                ticker_log("PASS: Price below 20D SMA")
             
             # === FILTER 6: 200-Day SMA ===
             sma_200 = stock_data.get('sma_200')
             if sma_200:
                 price_vs_sma200 = current_price / sma_200
-                print(f"Price vs 200D SMA: {price_vs_sma200:.2%} (${current_price:.2f} / ${sma_200:.2f})")
+                _log_numbers("Price vs 200D SMA: {:.2%} (${:.2f} / ${:.2f})", price_vs_sma200, current_price, sma_200)
                 if price_vs_sma200 < self.MIN_PRICE_VS_200D_SMA:
-                    print(f"FAIL: Price < {self.MIN_PRICE_VS_200D_SMA:.0%} of 200D SMA")
+                    ticker_log("FAIL: Price < {:.0%} of 200D SMA", self.MIN_PRICE_VS_200D_SMA)
                     return None
-                print(f"PASS: Price vs 200D SMA")
+                ticker_log("PASS: Price vs 200D SMA")
             
             # === FILTER 7: Revenue Growth ===
             revenue_growth = stock_data.get('revenue_growth')
             if revenue_growth is not None:
-                print(f"Revenue Growth (YoY): {revenue_growth:.1%}")
+                _log_numbers("Revenue Growth (YoY): {:.1%}", revenue_growth)
                 if revenue_growth < self.MIN_REVENUE_GROWTH:
-                    print(f"FAIL: Revenue growth < {self.MIN_REVENUE_GROWTH:.0%}")
+                    ticker_log("FAIL: Revenue growth < {:.0%}", self.MIN_REVENUE_GROWTH)
                     return None
-                print(f"PASS: Revenue growth")
+                ticker_log("PASS: Revenue growth")
             else:
-                print(f"No revenue growth data")
+                ticker_log("No revenue growth data")
             
             # === FILTER 8: EPS Growth OR Positive FCF ===
             eps_growth = stock_data.get('eps_growth')
@@ -147,52 +166,52 @@ class StockFilter:
             has_positive_fcf = free_cash_flow > 0
             
             if eps_growth:
-                print(f"EPS Growth (YoY): {eps_growth:.1%}")
-            print(f"Free Cash Flow: {'Positive' if has_positive_fcf else 'Negative'}")
+                _log_numbers("EPS Growth (YoY): {:.1%}", eps_growth)
+            ticker_log("Free Cash Flow: {}", 'Positive' if has_positive_fcf else 'Negative')
             
             if not ((eps_growth and eps_growth >= self.MIN_EPS_GROWTH) or has_positive_fcf):
-                print(f"FAIL: EPS growth < {self.MIN_EPS_GROWTH:.0%} AND no positive FCF")
+                ticker_log("FAIL: EPS growth < {:.0%} AND no positive FCF", self.MIN_EPS_GROWTH)
                 return None
-            print(f"PASS: EPS growth or positive FCF")
+            ticker_log("PASS: EPS growth or positive FCF")
             
             # === FILTER 9: Debt-to-Equity ===
             debt_to_equity = stock_data.get('debt_to_equity')
             if debt_to_equity is not None:
-                print(f"Debt-to-Equity: {debt_to_equity:.2f}")
+                _log_numbers("Debt-to-Equity: {:.2f}", debt_to_equity)
                 if debt_to_equity > self.MAX_DEBT_TO_EQUITY:
-                    print(f"FAIL: D/E > {self.MAX_DEBT_TO_EQUITY}")
+                    ticker_log("FAIL: D/E > {}", self.MAX_DEBT_TO_EQUITY)
                     return None
-                print(f"PASS: Debt-to-Equity")
+                ticker_log("PASS: Debt-to-Equity")
             
             # === FILTER 10: Gross Margin ===
             gross_margin = stock_data.get('gross_margin')
             if gross_margin is not None:
-                print(f"Gross Margin: {gross_margin:.1%}")
+                _log_numbers("Gross Margin: {:.1%}", gross_margin)
                 if gross_margin < self.MIN_GROSS_MARGIN:
-                    print(f"FAIL: Gross margin < {self.MIN_GROSS_MARGIN:.0%}")
+                    ticker_log("FAIL: Gross margin < {:.0%}", self.MIN_GROSS_MARGIN)
                     return None
-                print(f"PASS: Gross margin")
+                ticker_log("PASS: Gross margin")
             
             # === FILTER 11: Trailing P/E ===
             pe_ratio = stock_data.get('pe_ratio')
             if pe_ratio:
-                print(f"Trailing P/E: {pe_ratio:.2f}")
+                _log_numbers("Trailing P/E: {:.2f}", pe_ratio)
                 if pe_ratio > self.MAX_TRAILING_PE:
-                    print(f"FAIL: P/E > {self.MAX_TRAILING_PE}")
+                    ticker_log("FAIL: P/E > {}", self.MAX_TRAILING_PE)
                     return None
-                print(f"PASS: Trailing P/E")
+                ticker_log("PASS: Trailing P/E")
             
             # === FILTER 12: Price-to-Sales ===
             price_to_sales = stock_data.get('price_to_sales')
             if price_to_sales:
-                print(f"Price-to-Sales: {price_to_sales:.2f}")
+                _log_numbers("Price-to-Sales: {:.2f}", price_to_sales)
                 if price_to_sales > self.MAX_PRICE_TO_SALES:
-                    print(f"FAIL: P/S > {self.MAX_PRICE_TO_SALES}")
+                    ticker_log("FAIL: P/S > {}", self.MAX_PRICE_TO_SALES)
                     return None
-                print(f"PASS: Price-to-Sales")
+                ticker_log("PASS: Price-to-Sales")
             
             # === STOCK PASSED ALL FILTERS ===
-            print(f"\n{symbol} PASSED ALL FILTERS!")
+            ticker_log("\n{} PASSED ALL FILTERS!", symbol)
             
             # Calculate composite score (normalized 0-100)
             # YOUR EXACT WEIGHTS: RSI 35%, Revenue 25%, EPS/FCF 20%, Drawdown 20%
@@ -242,6 +261,8 @@ class StockFilter:
         except Exception as e:
             print(f"Error filtering {symbol}: {e}")
             return None
+    
+    def calculate_avg_volume(self, daily_data: Dict, days: int = 20) -> Optional[float]:
         """Calculate average daily volume over N days"""
         try:
             volumes = []
@@ -364,9 +385,9 @@ class StockFilter:
             print(f"Error calculating gross margin: {e}")
         return None
     
-    async def filter_stock(self, symbol: str) -> Optional[Dict[str, Any]]:
+    async def filter_symbol_alpha_vantage(self, symbol: str) -> Optional[Dict[str, Any]]:
         """
-        Apply all filters to a single stock
+        Apply all filters to a single stock using Alpha Vantage data (legacy path)
         Returns stock data if it passes all filters, None otherwise
         """
         print(f"\n{'='*60}")
@@ -376,14 +397,20 @@ class StockFilter:
         try:
             # Fetch all required data
             print(f"Fetching data for {symbol}...")
-            overview = self.av.get_company_overview(symbol)
+            overview = await self.av.fetch('OVERVIEW', symbol)
             if not overview or not overview.get('Symbol'):
                 print(f"No overview data for {symbol}")
                 return None
             
-            quote = self.av.get_global_quote(symbol)
-            daily_data = self.av.get_daily_adjusted(symbol, outputsize='full')
-            rsi_data = self.av.get_rsi(symbol)
+            # Independent requests: the service spaces them out for the rate limit
+            quote, daily_data, rsi_data = await asyncio.gather(
+                self.av.fetch('GLOBAL_QUOTE', symbol),
+                self.av.fetch('TIME_SERIES_DAILY_ADJUSTED', symbol, outputsize='full'),
+                self.av.fetch('RSI', symbol, interval='daily', time_period=14, series_type='close')
+            )
+            quote = (quote or {}).get('Global Quote')
+            daily_data = (daily_data or {}).get('Time Series (Daily)')
+            rsi_data = (rsi_data or {}).get('Technical Analysis: RSI')
             
             if not all([quote, daily_data, rsi_data]):
                 print(f"Missing required data for {symbol}")
@@ -452,7 +479,7 @@ class StockFilter:
                 print(f"PASS: Price vs 200D SMA")
             
             # === FILTER 7: Revenue Growth ===
-            income_data = self.av.get_income_statement(symbol)
+            income_data = await self.av.fetch('INCOME_STATEMENT', symbol)
             revenue_growth = None
             if income_data:
                 revenue_growth = self.calculate_revenue_growth(income_data)
@@ -464,14 +491,14 @@ class StockFilter:
                     print(f"PASS: Revenue growth")
             
             # === FILTER 8: EPS Growth OR Positive FCF ===
-            earnings_data = self.av.get_earnings(symbol)
+            earnings_data = await self.av.fetch('EARNINGS', symbol)
             eps_growth = None
             if earnings_data:
                 eps_growth = self.calculate_eps_growth(earnings_data)
                 if eps_growth:
                     print(f"EPS Growth (YoY): {eps_growth:.1%}")
             
-            cash_flow_data = self.av.get_cash_flow(symbol)
+            cash_flow_data = await self.av.fetch('CASH_FLOW', symbol)
             has_positive_fcf = False
             if cash_flow_data:
                 has_positive_fcf = self.check_free_cash_flow(cash_flow_data)
@@ -483,7 +510,7 @@ class StockFilter:
             print(f"PASS: EPS growth or positive FCF")
             
             # === FILTER 9: Debt-to-Equity ===
-            balance_data = self.av.get_balance_sheet(symbol)
+            balance_data = await self.av.fetch('BALANCE_SHEET', symbol)
             debt_to_equity = None
             if balance_data:
                 debt_to_equity = self.calculate_debt_to_equity(balance_data)
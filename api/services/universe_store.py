@@ -0,0 +1,186 @@
+"""
+Universe Store - Versioned on-disk snapshots of ticker universes
+Screens read the last good snapshot instead of scraping Wikipedia every run.
+Stale snapshots are refreshed in the background, and a failed or suspicious
+scrape never replaces the last good copy
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Any
+
+UNIVERSE_DIR = Path(__file__).parent.parent / "cache" / "universe"
+UNIVERSE_REFRESH_HOURS = 24  # Index membership changes rarely
+
+# A scrape that shrinks the universe by more than this is treated as a bad parse
+MIN_SIZE_RATIO = 0.5
+
+# Universe source naming a ticker file instead of an index, e.g. 'file:russell3000.txt'
+UNIVERSE_FILE_PREFIX = 'file:'
+
+
+def _checksum(tickers: List[str]) -> str:
+    return hashlib.sha256('\n'.join(tickers).encode()).hexdigest()[:16]
+
+
+def read_universe_file(path: str) -> List[str]:
+    """
+    Tickers from a custom universe file: separated by newlines, commas or
+    whitespace, '#' starts a comment, and a leading Symbol/Ticker header
+    (e.g. a one-column CSV export) is skipped
+    Order is kept and duplicates dropped; relative paths are from api/
+    """
+    file = Path(path)
+    if not file.is_absolute():
+        file = Path(__file__).parent.parent / file
+    try:
+        with open(file, 'r') as f:
+            text = f.read()
+    except OSError as e:
+        print(f"Error reading universe file {file}: {e}")
+        return []
+
+    tickers = []
+    for line in text.splitlines():
+        tickers.extend(line.split('#', 1)[0].replace(',', ' ').split())
+    if tickers and tickers[0].lower() in ('symbol', 'ticker'):
+        tickers = tickers[1:]
+    return list(dict.fromkeys(t.upper().replace('.', '-') for t in tickers))
+
+
+class UniverseStore:
+    """
+    Snapshot file per universe: {name, version, checksum, fetched_at, tickers, sources}
+    - version increments only when membership actually changes
+    - union universes (e.g. 'both') record the component versions they were
+      built from and are rebuilt only when a component changes
+    """
+
+    def __init__(self, directory: Path = UNIVERSE_DIR,
+                 refresh_hours: float = UNIVERSE_REFRESH_HOURS):
+        self.directory = Path(directory)
+        self.refresh_seconds = refresh_hours * 3600
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> Path:
+        return self.directory / f"{name}.json"
+
+    def load(self, name: str) -> Optional[Dict[str, Any]]:
+        """Last saved snapshot for a universe, if any"""
+        try:
+            with open(self._path(name), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error loading {name} universe snapshot: {e}")
+            return None
+
+    def save(self, name: str, tickers: List[str],
+             sources: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """Write a snapshot atomically (temp file + rename)"""
+        tickers = sorted(set(tickers))
+        previous = self.load(name)
+        checksum = _checksum(tickers)
+        version = (previous or {}).get('version', 0)
+        if not previous or previous.get('checksum') != checksum:
+            version += 1
+
+        snapshot = {
+            'name': name,
+            'version': version,
+            'checksum': checksum,
+            'fetched_at': time.time(),
+            'count': len(tickers),
+            'tickers': tickers,
+            'sources': sources or {}
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self._path(name).with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, self._path(name))
+        return snapshot
+
+    def refresh(self, name: str, fetcher: Callable[[], List[str]]) -> Optional[Dict[str, Any]]:
+        """
+        Re-fetch a universe and save it if the result looks sane
+        Returns the snapshot now on disk (the last good copy on failure)
+        """
+        previous = self.load(name)
+        tickers = fetcher()
+        if not tickers:
+            print(f"Universe refresh for {name} returned nothing, keeping last good snapshot")
+            return previous
+        if previous and len(tickers) < previous['count'] * MIN_SIZE_RATIO:
+            print(f"Universe refresh for {name} shrank {previous['count']} -> {len(tickers)}, keeping last good snapshot")
+            return previous
+        return self.save(name, tickers)
+
+    def _refresh_in_background(self, name: str, fetcher: Callable[[], List[str]]):
+        with self._lock:
+            if name in self._refreshing:
+                return
+            self._refreshing.add(name)
+
+        def run():
+            try:
+                self.refresh(name, fetcher)
+            except Exception as e:
+                print(f"Error refreshing {name} universe: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(name)
+
+        threading.Thread(target=run, name=f'universe-refresh-{name}', daemon=True).start()
+
+    def _is_fresh(self, snapshot: Dict[str, Any]) -> bool:
+        return time.time() - snapshot.get('fetched_at', 0) < self.refresh_seconds
+
+    def get_snapshot(self, name: str, fetcher: Callable[[], List[str]]) -> Optional[Dict[str, Any]]:
+        """
+        Snapshot for a universe without waiting on the network when possible
+        - fresh snapshot: returned as is
+        - stale snapshot: returned immediately, refreshed in the background
+        - no snapshot: fetched synchronously
+        """
+        snapshot = self.load(name)
+        if snapshot is None:
+            return self.refresh(name, fetcher)
+        if not self._is_fresh(snapshot):
+            self._refresh_in_background(name, fetcher)
+        return snapshot
+
+    def get(self, name: str, fetcher: Callable[[], List[str]]) -> List[str]:
+        """Tickers for a universe (see get_snapshot)"""
+        snapshot = self.get_snapshot(name, fetcher)
+        return snapshot['tickers'] if snapshot else []
+
+    def get_union(self, name: str, parts: Dict[str, Callable[[], List[str]]]) -> List[str]:
+        """
+        Precomputed union of several universes, stored as its own snapshot
+        Rebuilt only when a component snapshot's version changes
+        """
+        components = {part: self.get_snapshot(part, fetcher) for part, fetcher in parts.items()}
+        versions = {part: snap['version'] for part, snap in components.items() if snap}
+        if not versions:
+            return []
+
+        union = self.load(name)
+        if union and union.get('sources') == versions:
+            return union['tickers']
+
+        tickers = set()
+        for snap in components.values():
+            if snap:
+                tickers.update(snap['tickers'])
+        return self.save(name, list(tickers), sources=versions)['tickers']
+
+
+# Singleton instance
+universe_store = UniverseStore()
@@ -0,0 +1,231 @@
+"""
+Work Queue - Durable SQLite task queue for spreading screens over workers
+A screen is enqueued as one task per universe shard. Any process that can
+open the queue file (API replicas, `python -m services.queue_worker`
+processes, other hosts on shared storage) claims tasks under a time-limited
+lease, renews the lease while working and acks the result. A worker that
+dies stops renewing, so its task is leased again once the lease expires
+instead of being lost
+"""
+
+import json
+import os
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+WORK_QUEUE_DB_FILE = Path(os.getenv(
+    'WORK_QUEUE_DB', str(Path(__file__).parent.parent / "cache" / "work_queue.sqlite")
+))
+
+# Seconds a claim is valid without renewal, and claims per task before it is given up
+LEASE_SECONDS = float(os.getenv('WORK_QUEUE_LEASE_SECONDS', '120'))
+MAX_ATTEMPTS = int(os.getenv('WORK_QUEUE_MAX_ATTEMPTS', '3'))
+
+# An unfinished screen older than this is abandoned rather than joined (stale data)
+JOIN_WITHIN_SECONDS = 6 * 3600
+
+# Task states; a screen is finished when none of its tasks are pending or leased
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class WorkQueue:
+    """
+    - screens: screen_id, key, params, task count, created/finished time
+    - tasks: one row per shard with its state, lease owner/expiry, attempts,
+      and the JSON result once acked
+    An unfinished screen with the same key is joined rather than enqueued
+    again, so replicas that start the same screen share its tasks
+    """
+
+    def __init__(self, db_file: Path = WORK_QUEUE_DB_FILE,
+                 lease_seconds: float = LEASE_SECONDS,
+                 max_attempts: int = MAX_ATTEMPTS):
+        self.db_file = Path(db_file)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS screens (
+                    screen_id TEXT PRIMARY KEY,
+                    key TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    tasks INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    finished_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS screens_key ON screens (key, finished_at);
+                CREATE TABLE IF NOT EXISTS tasks (
+                    task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    screen_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    payload TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    lease_owner TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS tasks_claim ON tasks (state, lease_expires);
+                CREATE INDEX IF NOT EXISTS tasks_screen ON tasks (screen_id, position);
+            """)
+            self._initialized = True
+        return conn
+
+    def enqueue_screen(self, key: str, payloads: List[Dict[str, Any]],
+                       params: Optional[Dict[str, Any]] = None,
+                       join_within: float = JOIN_WITHIN_SECONDS) -> str:
+        """
+        Screen id for key: an unfinished one started in the last join_within
+        seconds if any, otherwise a new screen with one task per payload
+        (kept in payload order for aggregation)
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT screen_id FROM screens WHERE key = ? AND finished_at IS NULL AND created_at > ? "
+                "ORDER BY created_at DESC LIMIT 1", (key, now - join_within)
+            ).fetchone()
+            if row:
+                return row[0]
+            # Stale unfinished screens for this key are abandoned; their tasks are no longer claimed
+            conn.execute("UPDATE screens SET finished_at = ? WHERE key = ? AND finished_at IS NULL", (now, key))
+            screen_id = uuid.uuid4().hex[:12]
+            conn.execute(
+                "INSERT INTO screens VALUES (?, ?, ?, ?, ?, NULL)",
+                (screen_id, key, json.dumps(params or {}), len(payloads), now)
+            )
+            conn.executemany(
+                "INSERT INTO tasks (screen_id, position, payload, state, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(screen_id, i, json.dumps(payload), PENDING, now) for i, payload in enumerate(payloads)]
+            )
+            return screen_id
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Lease the oldest claimable task: pending, or leased with an expired
+        lease (its worker died). Tasks out of attempts are marked failed
+        Returns {task_id, screen_id, position, payload, params, attempts} or None
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE tasks SET state = ?, error = 'lease expired too many times', updated_at = ? "
+                "WHERE state = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, now, LEASED, now, self.max_attempts)
+            )
+            row = conn.execute(
+                "SELECT t.task_id, t.screen_id, t.position, t.payload, t.attempts, s.params "
+                "FROM tasks t JOIN screens s ON s.screen_id = t.screen_id "
+                "WHERE s.finished_at IS NULL AND (t.state = ? OR (t.state = ? AND t.lease_expires < ?)) "
+                "ORDER BY t.task_id LIMIT 1",
+                (PENDING, LEASED, now)
+            ).fetchone()
+            if row is None:
+                return None
+            task_id, screen_id, position, payload, attempts, params = row
+            conn.execute(
+                "UPDATE tasks SET state = ?, lease_owner = ?, lease_expires = ?, attempts = ?, updated_at = ? "
+                "WHERE task_id = ?",
+                (LEASED, worker_id, now + self.lease_seconds, attempts + 1, now, task_id)
+            )
+        return {
+            'task_id': task_id,
+            'screen_id': screen_id,
+            'position': position,
+            'payload': json.loads(payload),
+            'params': json.loads(params),
+            'attempts': attempts + 1,
+        }
+
+    def renew(self, task_id: int, worker_id: str) -> bool:
+        """Extend a lease; False if the task was re-leased to someone else"""
+        now = time.time()
+        with self._connect() as conn:
+            updated = conn.execute(
+                "UPDATE tasks SET lease_expires = ?, updated_at = ? "
+                "WHERE task_id = ? AND state = ? AND lease_owner = ?",
+                (now + self.lease_seconds, now, task_id, LEASED, worker_id)
+            ).rowcount
+        return updated == 1
+
+    def ack(self, task_id: int, worker_id: str, result: Any) -> bool:
+        """
+        Store a task's result; False if the lease was lost (the result is
+        dropped, the task's new owner will produce it)
+        """
+        now = time.time()
+        with self._connect() as conn:
+            updated = conn.execute(
+                "UPDATE tasks SET state = ?, result = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE task_id = ? AND state = ? AND lease_owner = ?",
+                (DONE, json.dumps(result, default=float), now, task_id, LEASED, worker_id)
+            ).rowcount
+        return updated == 1
+
+    def fail(self, task_id: int, worker_id: str, error: str):
+        """Give a task back after an error (failed for good once out of attempts)"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE task_id = ? AND state = ? AND lease_owner = ?",
+                (self.max_attempts, FAILED, PENDING, error, now, task_id, LEASED, worker_id)
+            )
+
+    def status(self, screen_id: str) -> Dict[str, int]:
+        """Task counts by state, plus total"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT state, COUNT(*) FROM tasks WHERE screen_id = ? GROUP BY state", (screen_id,)
+            ).fetchall()
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0, **dict(rows)}
+        counts['total'] = sum(counts.values())
+        return counts
+
+    def results(self, screen_id: str) -> List[Optional[Any]]:
+        """Acked results in task (payload) order; None for failed tasks"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT result FROM tasks WHERE screen_id = ? ORDER BY position", (screen_id,)
+            ).fetchall()
+        return [json.loads(result) if result else None for (result,) in rows]
+
+    def finish_screen(self, screen_id: str):
+        """Mark a screen finished so the next enqueue for its key starts fresh"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE screens SET finished_at = ? WHERE screen_id = ? AND finished_at IS NULL",
+                (time.time(), screen_id)
+            )
+
+    def prune(self, older_than_seconds: float = 7 * 24 * 3600):
+        """Drop finished screens (and their task results) older than the cutoff"""
+        cutoff = time.time() - older_than_seconds
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM tasks WHERE screen_id IN "
+                "(SELECT screen_id FROM screens WHERE finished_at IS NOT NULL AND finished_at < ?)", (cutoff,)
+            )
+            conn.execute("DELETE FROM screens WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,))
+
+
+# Singleton instance
+work_queue = WorkQueue()
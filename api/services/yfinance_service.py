@@ -8,10 +8,52 @@ import pandas as pd
 import numpy as np
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
-import ta
+import numbers
+import os
+import threading
+import time
 
+from .market_data import MarketDataProvider, PERIOD_DAYS
+from .price_store import price_store
+from .fundamentals_cache import FundamentalsCache, FIELD_TTLS
+from .universe_store import universe_store, read_universe_file, UNIVERSE_FILE_PREFIX
+from .indicator_engine import indicator_engine
+from .host_semaphore import HostSemaphore
+from .metrics import PROVIDER_CALL_SECONDS, PROVIDER_ERRORS, CACHE_LOOKUPS, ticker_log
 
-class YFinanceService:
+# Ticker.info fields the pre-screen needs (the rest are cached alongside)
+PRESCREEN_FIELDS = ['marketCap', 'averageVolume']
+
+# Market-driven fields that can be rebuilt from a cheap quote (Ticker.fast_info)
+# instead of the slow Ticker.info call; the valuation ratios are derived from
+# the quote and a cached reported figure, mapped here ratio -> figure
+QUOTE_FIELDS = ['marketCap', 'averageVolume', 'trailingPE', 'priceToSalesTrailing12Months']
+QUOTE_RATIO_INPUTS = {
+    'trailingPE': 'trailingEps',
+    'priceToSalesTrailing12Months': 'totalRevenue',
+}
+
+# Symbols per yf.download call in the bulk history path
+BULK_CHUNK_SIZE = 100
+
+# Relative change in an already-stored close that means Yahoo re-adjusted
+# the series (split/dividend) and the symbol must be re-downloaded
+ADJUSTMENT_TOLERANCE = 1e-6
+
+# yf.download keeps results in module-level state, so calls must not overlap
+_download_lock = threading.Lock()
+
+# Concurrent yf.download calls across all processes on this host (parent,
+# shard workers, queue workers); hosts don't coordinate with each other
+YF_DOWNLOAD_SLOTS = int(os.getenv('YF_DOWNLOAD_SLOTS', '2'))
+_download_slots = HostSemaphore('yf_download', YF_DOWNLOAD_SLOTS)
+
+
+def _finite(value) -> bool:
+    return isinstance(value, numbers.Real) and not isinstance(value, bool) and np.isfinite(value)
+
+
+class YFinanceService(MarketDataProvider):
     """
     Service for fetching stock data from Yahoo Finance
     Advantages over Alpha Vantage:
@@ -21,8 +63,68 @@ class YFinanceService:
     - No rate limits
     """
     
+    name = 'yfinance'
+    
     def __init__(self):
-        self.cache = {}
+        # Ticker.info cache (memory + disk, per-field TTLs)
+        self.cache = FundamentalsCache()
+    
+    def get_info(self, symbol: str, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Fundamentals (Ticker.info subset) for a symbol
+        Served from cache while the requested fields are fresh. When only
+        market-driven fields are stale they are refreshed from a quote;
+        otherwise Ticker.info is fetched once and refreshes every cached field
+        """
+        requested = list(FIELD_TTLS if fields is None else fields)
+        inputs = [QUOTE_RATIO_INPUTS[field] for field in requested if field in QUOTE_RATIO_INPUTS]
+        cached, stale = self.cache.lookup(symbol, requested + inputs)
+        if not stale:
+            return cached
+        if all(field in QUOTE_FIELDS for field in stale):
+            quote = self.get_quote(symbol, cached)
+            if quote is not None:
+                fundamentals = {field: value for field, value in cached.items() if field not in QUOTE_FIELDS}
+                return {**fundamentals, **quote}
+        
+        try:
+            with PROVIDER_CALL_SECONDS.time(provider='yfinance', call='ticker_info'):
+                info = yf.Ticker(symbol).info
+        except Exception:
+            PROVIDER_ERRORS.inc(provider='yfinance', call='ticker_info')
+            raise
+        self.cache.put(symbol, info)
+        return {field: info[field] for field in FIELD_TTLS if field in info}
+    
+    def get_quote(self, symbol: str, cached: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Refresh QUOTE_FIELDS from Ticker.fast_info (one light quote request)
+        The ratios are recomputed from the cached trailingEps/totalRevenue and
+        cached as absent when those are missing or not positive, as Ticker.info
+        omits them. Returns the refreshed fields, or None if the quote failed
+        """
+        try:
+            with PROVIDER_CALL_SECONDS.time(provider='yfinance', call='fast_info'):
+                quote = yf.Ticker(symbol).fast_info
+                price, market_cap, avg_volume = (
+                    quote['lastPrice'], quote['marketCap'], quote['threeMonthAverageVolume']
+                )
+        except Exception:
+            PROVIDER_ERRORS.inc(provider='yfinance', call='fast_info')
+            return None
+        if not all(_finite(value) for value in (price, market_cap, avg_volume)):
+            return None
+        
+        info = {'marketCap': market_cap, 'averageVolume': avg_volume}
+        eps = cached.get('trailingEps')
+        if _finite(eps) and eps > 0:
+            info['trailingPE'] = price / eps
+        revenue = cached.get('totalRevenue')
+        if _finite(revenue) and revenue > 0:
+            info['priceToSalesTrailing12Months'] = market_cap / revenue
+        
+        self.cache.put(symbol, info, QUOTE_FIELDS)
+        return info
     
     def get_sp500_tickers(self) -> List[str]:
         """Get list of S&P 500 stock tickers"""
@@ -32,7 +134,8 @@ class YFinanceService:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
             }
-            tables = pd.read_html(url, storage_options=headers)
+            with PROVIDER_CALL_SECONDS.time(provider='yfinance', call='read_html'):
+                tables = pd.read_html(url, storage_options=headers)
             sp500_table = tables[0]
             tickers = sp500_table['Symbol'].tolist()
             # Clean tickers (remove dots, etc.)
@@ -40,6 +143,7 @@ class YFinanceService:
             print(f"Fetched {len(tickers)} S&P 500 tickers")
             return tickers
         except Exception as e:
+            PROVIDER_ERRORS.inc(provider='yfinance', call='read_html')
             print(f"Error fetching S&P 500 tickers: {e}")
             return []
     
@@ -50,52 +154,166 @@ class YFinanceService:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
             }
-            tables = pd.read_html(url, storage_options=headers)
-            nasdaq_table = tables[4]  # Usually the 5th table
-            tickers = nasdaq_table['Ticker'].tolist()
+            with PROVIDER_CALL_SECONDS.time(provider='yfinance', call='read_html'):
+                tables = pd.read_html(url, storage_options=headers)
+            # Pick the constituents table by its columns; its position on the page moves
+            nasdaq_table = next(
+                t for t in tables
+                if ('Ticker' in t.columns or 'Symbol' in t.columns) and len(t) >= 90
+            )
+            column = 'Ticker' if 'Ticker' in nasdaq_table.columns else 'Symbol'
+            tickers = nasdaq_table[column].tolist()
             print(f"Fetched {len(tickers)} NASDAQ-100 tickers")
             return tickers
         except Exception as e:
+            PROVIDER_ERRORS.inc(provider='yfinance', call='read_html')
             print(f"Error fetching NASDAQ-100 tickers: {e}")
             return []
     
-    def get_stock_data(self, symbol: str, period: str = '1y') -> Optional[Dict[str, Any]]:
+    def get_universe(self, source: str) -> List[str]:
+        """
+        Tickers for a universe ('sp500', 'nasdaq100', 'both' or 'file:<path>')
+        Served from versioned on-disk snapshots; Wikipedia is only scraped
+        when a snapshot is missing or due for refresh
+        """
+        fetchers = {
+            'sp500': self.get_sp500_tickers,
+            'nasdaq100': self.get_nasdaq100_tickers,
+        }
+        if source in fetchers:
+            return universe_store.get(source, fetchers[source])
+        if source == 'both':
+            return universe_store.get_union('both', fetchers)
+        if source.startswith(UNIVERSE_FILE_PREFIX):
+            return read_universe_file(source[len(UNIVERSE_FILE_PREFIX):])
+        return []
+    
+    def get_bulk_history(self, symbols: List[str], period: str = '1y',
+                         chunk_size: int = BULK_CHUNK_SIZE,
+                         start: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """
+        Download OHLCV history for many symbols in a few chunked calls
+        Returns one date-aligned frame with (symbol, field) columns
+        If start is given, downloads from that date instead of period
+        """
+        symbols = list(dict.fromkeys(symbols))
+        frames = []
+        
+        for offset in range(0, len(symbols), chunk_size):
+            chunk = symbols[offset:offset + chunk_size]
+            print(f"   Downloading history: {offset + len(chunk)}/{len(symbols)}")
+            window = {'start': start.strftime('%Y-%m-%d')} if start is not None else {'period': period}
+            try:
+                with _download_lock, _download_slots.hold(), PROVIDER_CALL_SECONDS.time(provider='yfinance', call='download'):
+                    data = yf.download(
+                        chunk,
+                        group_by='ticker',
+                        auto_adjust=True,  # Match Ticker.history() defaults
+                        threads=True,
+                        progress=False,
+                        **window
+                    )
+            except Exception as e:
+                PROVIDER_ERRORS.inc(provider='yfinance', call='download')
+                print(f"  Error downloading history chunk: {e}")
+                continue
+            
+            if data.empty:
+                continue
+            
+            # A single-symbol download comes back without the ticker level
+            if not isinstance(data.columns, pd.MultiIndex):
+                data = pd.concat({chunk[0]: data}, axis=1)
+            frames.append(data)
+        
+        if not frames:
+            return pd.DataFrame()
+        
+        return pd.concat(frames, axis=1).sort_index()
+    
+    def get_history(self, symbols: List[str], period: str = '1y') -> pd.DataFrame:
+        """
+        Price history for many symbols, served from the local price store
+        Only bars missing since each symbol's last stored date are downloaded;
+        new symbols (or a longer period than stored) get a full download
+        Returns the same (symbol, field) layout as get_bulk_history
+        """
+        symbols = list(dict.fromkeys(symbols))
+        today = pd.Timestamp.now().normalize()
+        start = today - pd.Timedelta(days=PERIOD_DAYS.get(period, 366))
+        last_session = today if today.weekday() < 5 else today - pd.offsets.BDay(1)
+        stored = price_store.coverage(symbols)
+        
+        full = []
+        incremental = {}  # anchor date -> symbols
+        for symbol in symbols:
+            info = stored.get(symbol)
+            if info is None or info['first'] > start:
+                full.append(symbol)
+            elif info['last'] < last_session or info['last'] == today:
+                # Re-fetch from the last settled bar: it doubles as an adjustment
+                # check, and today's bar may have been stored mid-session
+                incremental.setdefault(info['prev'] or info['last'], []).append(symbol)
+        
+        refreshed = len(full) + sum(map(len, incremental.values()))
+        print(f"   Price store: {len(symbols) - refreshed} current, "
+              f"{refreshed - len(full)} incremental, {len(full)} full downloads")
+        CACHE_LOOKUPS.inc(len(symbols) - refreshed, cache='price_store', result='hit')
+        CACHE_LOOKUPS.inc(refreshed, cache='price_store', result='miss')
+        
+        for anchor, group in incremental.items():
+            bulk = self.get_bulk_history(group, start=anchor)
+            for symbol in group:
+                bars = self.extract_history(bulk, symbol)
+                if bars.empty:
+                    continue
+                stored_close = price_store.close_on(symbol, anchor)
+                if (anchor in bars.index and stored_close
+                        and abs(bars.at[anchor, 'Close'] / stored_close - 1) > ADJUSTMENT_TOLERANCE):
+                    full.append(symbol)  # History was re-adjusted upstream
+                else:
+                    price_store.write(symbol, bars)
+        
+        if full:
+            bulk = self.get_bulk_history(full, period=period)
+            for symbol in full:
+                bars = self.extract_history(bulk, symbol)
+                if not bars.empty:
+                    price_store.write(symbol, bars, replace=True, first_date=start)
+        
+        return price_store.load(symbols, start=start)
+    
+    def get_stock_data(self, symbol: str, period: str = '1y',
+                       hist: Optional[pd.DataFrame] = None) -> Optional[Dict[str, Any]]:
         """
         Fetch comprehensive stock data for a single symbol
         Returns all data needed for filtering
+        Pass hist (e.g. from get_history) to skip the per-symbol lookup
         """
+        started = time.perf_counter()
         try:
-            print(f"Fetching {symbol}...")
-            
-            # Create ticker object
-            ticker = yf.Ticker(symbol)
+            ticker_log("Fetching {}...", symbol)
             
             # Get historical data (1 year for calculations)
-            hist = ticker.history(period='1y')
+            if hist is None:
+                hist = self.extract_history(self.get_history([symbol], period=period), symbol)
             if hist.empty:
-                print(f"  No historical data for {symbol}")
+                ticker_log("  No historical data for {}", symbol)
                 return None
             
-            # Get current price
-            current_price = hist['Close'].iloc[-1]
-            
-            # Get info (fundamentals)
-            info = ticker.info
-            
-            # Calculate technical indicators
-            # RSI (14-day)
-            rsi = ta.momentum.RSIIndicator(hist['Close'], window=14).rsi().iloc[-1]
-            
-            # Simple Moving Averages
-            sma_20 = hist['Close'].rolling(window=20).mean().iloc[-1]
-            sma_200 = hist['Close'].rolling(window=200).mean().iloc[-1] if len(hist) >= 200 else None
-            
-            # 52-week high/low
-            high_52w = hist['High'].tail(252).max()
-            low_52w = hist['Low'].tail(252).min()
+            # Get info (fundamentals, cached per field)
+            info = self.get_info(symbol)
             
-            # Average volume (20-day)
-            avg_volume = hist['Volume'].tail(20).mean()
+            # Technical indicators from per-symbol rolling state (O(1) per new bar):
+            # RSI (14-day), 20/200-day SMAs, 52-week high/low, 20-day average volume
+            indicators = indicator_engine.compute(symbol, hist)
+            current_price = indicators['current_price']
+            rsi = indicators['rsi']
+            sma_20 = indicators['sma_20']
+            sma_200 = indicators['sma_200']
+            high_52w = indicators['high_52w']
+            low_52w = indicators['low_52w']
+            avg_volume = indicators['avg_volume']
             
             # Calculate year-over-year metrics
             revenue_growth = None
@@ -126,8 +344,8 @@ class YFinanceService:
                 'name': info.get('longName', symbol),
                 'current_price': float(current_price),
                 'market_cap': info.get('marketCap', 0),
-                'rsi': float(rsi) if not np.isnan(rsi) else None,
-                'sma_20': float(sma_20) if not np.isnan(sma_20) else None,
+                'rsi': float(rsi) if rsi is not None and not np.isnan(rsi) else None,
+                'sma_20': float(sma_20) if sma_20 is not None and not np.isnan(sma_20) else None,
                 'sma_200': float(sma_200) if sma_200 and not np.isnan(sma_200) else None,
                 'high_52w': float(high_52w),
                 'low_52w': float(low_52w),
@@ -147,8 +365,11 @@ class YFinanceService:
             return stock_data
             
         except Exception as e:
-            print(f"  Error fetching {symbol}: {e}")
+            PROVIDER_ERRORS.inc(provider='yfinance', call='get_stock_data')
+            ticker_log("  Error fetching {}: {}", symbol, e)
             return None
+        finally:
+            PROVIDER_CALL_SECONDS.observe(time.perf_counter() - started, provider='yfinance', call='get_stock_data')
     
     def screen_universe(self, tickers: List[str], 
                        min_market_cap: float = 5e9,
@@ -170,8 +391,7 @@ class YFinanceService:
                 print(f"   Progress: {i}/{len(tickers)}")
             
             try:
-                ticker = yf.Ticker(symbol)
-                info = ticker.info
+                info = self.get_info(symbol, PRESCREEN_FIELDS)
                 
                 # Quick filters
                 market_cap = info.get('marketCap', 0)
@@ -195,10 +415,11 @@ class YFinanceService:
         total = len(symbols)
         
         print(f"\nFetching detailed data for {total} candidates...")
+        history = self.get_history(symbols)
         
         for i, symbol in enumerate(symbols, 1):
-            print(f"[{i}/{total}] {symbol}")
-            data = self.get_stock_data(symbol)
+            ticker_log("[{}/{}] {}", i, total, symbol)
+            data = self.get_stock_data(symbol, hist=self.extract_history(history, symbol))
             if data:
                 results.append(data)
         
@@ -0,0 +1,106 @@
+"""
+The backtest's date x ticker signals must match a live screen run on each
+day's history: IndicatorEngine for the indicators, FilterEngine.filter_masks
+for the price filters and FilterEngine.score for the price part of the score
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.backtest import Backtester, indicator_matrices, price_matrices
+from services.filter_engine import FilterEngine, FILTER_SOURCES, build_feature_frame
+from services.indicator_engine import IndicatorEngine
+
+BARS = 320
+DAY_STEP = 3  # Compare every third day (the engine catches up over skipped bars)
+# Relaxed so a good share of days pass every price filter
+OVERRIDES = {'MAX_RSI': 50, 'MIN_AVG_VOLUME': 1_000_000}
+PRICE_FILTERS = [name for name, source in FILTER_SOURCES.items() if source == 'price']
+
+
+def make_bars(seed: int, listed_from: int = 0, nan_volumes: slice = slice(0)) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(-0.001, 0.02, BARS)))
+    volume = rng.integers(500_000, 3_000_000, BARS).astype(float)
+    volume[nan_volumes] = np.nan
+    bars = pd.DataFrame({
+        'Open': close,
+        'High': close * (1 + rng.uniform(0, 0.03, BARS)),
+        'Low': close * (1 - rng.uniform(0, 0.03, BARS)),
+        'Close': close,
+        'Volume': volume,
+    }, index=pd.bdate_range('2023-01-02', periods=BARS))
+    bars.iloc[:listed_from] = np.nan
+    return bars
+
+
+@pytest.fixture(scope='module')
+def history():
+    return pd.concat({
+        'AAA': make_bars(1),
+        'BBB': make_bars(2, listed_from=90),
+        # A whole 20-bar volume window missing
+        'CCC': make_bars(3, nan_volumes=slice(150, 175)),
+    }, axis=1)
+
+
+def live_row(symbol: str, indicators: dict) -> dict:
+    """get_stock_data()'s row for these indicators (fundamentals left unset)"""
+    rsi, sma_20, sma_200 = indicators['rsi'], indicators['sma_20'], indicators['sma_200']
+    return {
+        'symbol': symbol,
+        'name': symbol,
+        'current_price': float(indicators['current_price']),
+        'market_cap': 0,
+        'rsi': float(rsi) if rsi is not None and not np.isnan(rsi) else None,
+        'sma_20': float(sma_20) if sma_20 is not None and not np.isnan(sma_20) else None,
+        'sma_200': float(sma_200) if sma_200 and not np.isnan(sma_200) else None,
+        'high_52w': float(indicators['high_52w']),
+        'low_52w': float(indicators['low_52w']),
+        'avg_volume': float(indicators['avg_volume']),
+    }
+
+
+def test_signals_match_live_screen(history, tmp_path):
+    prices = price_matrices(history)
+    indicators = indicator_matrices(prices)
+    passed, score = Backtester(OVERRIDES).signals(indicators)
+    live_engine = FilterEngine(OVERRIDES)
+    indicator_engine = IndicatorEngine(tmp_path / 'prices.sqlite')
+
+    checked = passes = 0
+    for t, symbol in enumerate(prices['Close'].columns):
+        bars = history[symbol].dropna(subset=['Close'])
+        for end in range(1, len(bars) + 1, DAY_STEP):
+            day = prices['Close'].index.get_loc(bars.index[end - 1])
+            live = indicator_engine.compute(symbol, bars.iloc[:end])
+            for name, matrix in indicators.items():
+                expected, got = live[name], matrix.iat[day, t]
+                if expected is None or math.isnan(expected):
+                    assert math.isnan(got), (symbol, day, name)
+                else:
+                    assert got == pytest.approx(expected, rel=1e-9), (symbol, day, name)
+
+            frame = build_feature_frame([live_row(symbol, live)])
+            masks = live_engine.filter_masks(frame)[PRICE_FILTERS].to_numpy()[0]
+            assert passed[day, t] == masks.all(), (symbol, day, dict(zip(PRICE_FILTERS, masks)))
+            if masks.all():
+                # No growth figures, so composite_score is just the RSI + drawdown parts
+                assert score[day, t] == pytest.approx(live_engine.score(frame)[0], rel=1e-9)
+                passes += 1
+            checked += 1
+
+    # Unlisted days never pass
+    assert not passed[:90, 1].any()
+    assert checked == sum(len(range(1, n + 1, DAY_STEP)) for n in (BARS, BARS - 90, BARS))
+    assert 0 < passes < checked
+
+
+def test_missing_volume_window_is_not_zero(history):
+    avg_volume = indicator_matrices(price_matrices(history))['avg_volume']['CCC']
+    # Partly missing windows average the bars that exist; a fully missing one is NaN
+    assert avg_volume.iloc[160] == pytest.approx(history['CCC']['Volume'].iloc[141:150].mean())
+    assert np.isnan(avg_volume.iloc[174])
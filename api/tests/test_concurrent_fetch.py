@@ -0,0 +1,78 @@
+"""
+fetch_concurrently() must finish even when fetches hang: a timed-out fetch
+may not hold up later tickers, and a failing on_complete stops the stage
+"""
+
+import asyncio
+import contextlib
+import io
+import threading
+import time
+
+import pytest
+
+from services.concurrent_fetch import fetch_concurrently
+
+
+def run(coro):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return asyncio.run(coro)
+
+
+def test_hung_fetches_do_not_block_later_tickers():
+    release = threading.Event()
+    tickers = [f'H{i}' for i in range(3)] + [f'T{i}' for i in range(10)]
+
+    def fetch(ticker):
+        if ticker.startswith('H'):
+            release.wait(10)  # Hangs far past the timeout
+        return {'symbol': ticker}
+
+    started = time.monotonic()
+    results = run(fetch_concurrently(tickers, fetch, max_workers=2, timeout=0.2))
+    elapsed = time.monotonic() - started
+    release.set()
+
+    # Only the hung tickers time out, and the stage doesn't wait them out
+    assert [r['symbol'] for r in results] == [f'T{i}' for i in range(10)]
+    assert elapsed < 2
+
+
+def test_timeout_counts_from_fetch_start():
+    # Each fetch takes 0.15s, within the 0.2s timeout, though the last ones wait 0.3s+ for a slot
+    def fetch(ticker):
+        time.sleep(0.15)
+        return ticker
+
+    results = run(fetch_concurrently([f'T{i}' for i in range(6)], fetch, max_workers=2, timeout=0.2))
+    assert results == [f'T{i}' for i in range(6)]
+
+
+def test_errors_count_as_no_data():
+    def fetch(ticker):
+        if ticker == 'BAD':
+            raise ValueError('boom')
+        return ticker
+
+    assert run(fetch_concurrently(['A', 'BAD', 'B'], fetch, max_workers=2, timeout=1)) == ['A', 'B']
+
+
+def test_failing_on_complete_cancels_remaining_fetches():
+    fetched = []
+
+    def fetch(ticker):
+        fetched.append(ticker)
+        time.sleep(0.05)
+        return ticker
+
+    def on_complete(ticker, result, completed):
+        raise RuntimeError('listener failed')
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await fetch_concurrently([f'T{i}' for i in range(20)], fetch, max_workers=1, timeout=1,
+                                     on_complete=on_complete)
+        await asyncio.sleep(0.2)  # Cancelled tasks must not start more fetches
+
+    run(main())
+    assert len(fetched) <= 2
@@ -0,0 +1,135 @@
+"""
+FilterEngine must reach the same decisions, scores and ranking as running
+StockFilter.filter_stock() on every stock, including on the awkward values
+real data produces: None, NaN, 0, non-numeric strings and missing keys
+"""
+
+import contextlib
+import io
+import math
+import random
+
+import pandas as pd
+import pytest
+
+from services.filter_engine import FilterEngine, build_feature_frame, rank_stocks
+from services.stock_filter import StockFilter
+
+# A stock that passes every filter
+BASE = {
+    'symbol': 'BASE', 'name': 'Base Corp', 'current_price': 50.0, 'market_cap': 1e10,
+    'rsi': 20.0, 'sma_20': 60.0, 'sma_200': 55.0, 'high_52w': 100.0, 'low_52w': 40.0,
+    'avg_volume': 2e6, 'revenue_growth': 0.2, 'eps_growth': 0.1, 'gross_margin': 0.5,
+    'debt_to_equity': 0.3, 'pe_ratio': 15.0, 'price_to_sales': 2.0, 'free_cash_flow': 1e9,
+    'sector': 'Technology', 'industry': 'Software',
+}
+
+FIELDS = [
+    'current_price', 'market_cap', 'rsi', 'sma_20', 'sma_200', 'high_52w', 'avg_volume',
+    'revenue_growth', 'eps_growth', 'gross_margin', 'debt_to_equity', 'pe_ratio',
+    'price_to_sales', 'free_cash_flow',
+]
+
+MISSING = object()
+ODD_VALUES = [None, float('nan'), 0, 0.0, -1.0, float('inf'), 'abc', 'Infinity', '', MISSING]
+
+
+def with_values(symbol, **values):
+    stock = dict(BASE, symbol=symbol)
+    for field, value in values.items():
+        if value is MISSING:
+            del stock[field]
+        else:
+            stock[field] = value
+    return stock
+
+
+def scalar_results(stocks):
+    stock_filter = StockFilter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = [stock_filter.filter_stock(stock) for stock in stocks]
+    return [r for r in results if r is not None]
+
+
+def same_value(a, b):
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return type(a) is type(b) and a == b
+
+
+def assert_same_results(expected, actual):
+    assert [r['symbol'] for r in actual] == [r['symbol'] for r in expected]
+    for e, a in zip(expected, actual):
+        for key in e:
+            if key == 'last_updated':
+                continue
+            assert same_value(e[key], a[key]), (e['symbol'], key, e[key], a[key])
+
+
+@pytest.mark.parametrize('field', FIELDS)
+@pytest.mark.parametrize('value', ODD_VALUES, ids=repr)
+def test_single_odd_value_matches_filter_stock(field, value):
+    stock = with_values(f'{field}={value!r}', **{field: value})
+    assert_same_results(scalar_results([stock]), FilterEngine().passing([stock]))
+
+
+def random_stocks(count, seed):
+    rng = random.Random(seed)
+    ranges = {
+        'current_price': (5, 500), 'market_cap': (1e8, 5e11), 'rsi': (5, 60),
+        'sma_20': (5, 500), 'sma_200': (5, 500), 'high_52w': (5, 600), 'avg_volume': (1e5, 1e7),
+        'revenue_growth': (-0.2, 0.8), 'eps_growth': (-0.3, 0.6), 'gross_margin': (0.1, 0.9),
+        'debt_to_equity': (0, 2), 'pe_ratio': (-10, 60), 'price_to_sales': (0.5, 15),
+        'free_cash_flow': (-1e9, 1e9),
+    }
+    stocks = []
+    for i in range(count):
+        values = {field: rng.uniform(*bounds) for field, bounds in ranges.items()}
+        for field in rng.sample(FIELDS, rng.randint(0, 3)):
+            values[field] = rng.choice(ODD_VALUES)
+        stocks.append(with_values(f'S{i}', **values))
+    return stocks
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_passing_and_ranking_match_filter_stock(seed):
+    stocks = random_stocks(2000, seed)
+    expected = scalar_results(stocks)
+    # Compare on rows that can be ordered: NaN scores have no defined rank
+    ranked_expected = sorted(
+        [r for r in expected if not math.isnan(r['composite_score'])],
+        key=lambda r: -r['composite_score']
+    )
+    engine = FilterEngine()
+
+    assert_same_results(expected, engine.passing(stocks))
+    ranked = [r for r in engine.run(stocks) if not math.isnan(r['composite_score'])]
+    assert_same_results(ranked_expected, ranked)
+
+    orderable = [r for r in engine.passing(stocks) if not math.isnan(r['composite_score'])]
+    top = rank_stocks(orderable, top_k=10)
+    assert_same_results(ranked_expected[:10], top)
+
+
+def test_feature_frame_input_matches_list_input():
+    stocks = random_stocks(500, 42)
+    engine = FilterEngine()
+    from_rows = engine.passing(stocks)
+    from_frame = engine.passing(build_feature_frame(stocks))
+    assert [r['symbol'] for r in from_frame] == [r['symbol'] for r in from_rows]
+    for a, b in zip(from_rows, from_frame):
+        assert same_value(float(a['composite_score']), b['composite_score'])
+
+
+def test_filter_masks_agree_with_passing():
+    stocks = random_stocks(500, 7)
+    engine = FilterEngine()
+    frame = build_feature_frame(stocks)
+    passed = engine.filter_masks(frame).to_numpy().all(axis=1)
+    assert list(frame['symbol'][passed]) == [r['symbol'] for r in scalar_results(stocks)]
+
+
+def test_empty_input():
+    engine = FilterEngine()
+    assert engine.passing([]) == []
+    assert engine.run(pd.DataFrame()) == []
@@ -0,0 +1,129 @@
+"""
+Fundamentals caching: stale market fields are refreshed from a quote without
+refetching Ticker.info, and a stale memory entry falls back to the disk tier
+"""
+
+import types
+
+import pytest
+
+from services import fundamentals_cache, yfinance_service as yfs
+from services.fundamentals_cache import FundamentalsCache, MINUTE, DAY
+
+INFO = {
+    'marketCap': 2e12, 'averageVolume': 5e7, 'trailingPE': 30.0,
+    'priceToSalesTrailing12Months': 8.0, 'trailingEps': 6.0, 'totalRevenue': 2.5e11,
+    'revenueGrowth': 0.1, 'earningsGrowth': 0.2, 'freeCashflow': 1e11,
+    'grossMargins': 0.45, 'debtToEquity': 150.0,
+    'longName': 'Example Corp', 'sector': 'Technology', 'industry': 'Software',
+    'exchange': 'NMS',
+}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+class FakeTicker:
+    calls = []
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    @property
+    def info(self):
+        FakeTicker.calls.append('info')
+        return dict(INFO)
+
+    @property
+    def fast_info(self):
+        FakeTicker.calls.append('fast_info')
+        return {'lastPrice': 200.0, 'marketCap': 2.2e12, 'threeMonthAverageVolume': 6e7}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(fundamentals_cache, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def service(tmp_path, clock, monkeypatch):
+    FakeTicker.calls = []
+    monkeypatch.setattr(yfs.yf, 'Ticker', FakeTicker)
+    service = yfs.YFinanceService.__new__(yfs.YFinanceService)
+    service.cache = FundamentalsCache(tmp_path / 'fundamentals.sqlite')
+    return service
+
+
+def test_stale_market_fields_refresh_from_quote(service, clock):
+    service.get_info('EX')
+    clock.now += 20 * MINUTE
+
+    prescreen = service.get_info('EX', yfs.PRESCREEN_FIELDS)
+    full = service.get_info('EX')
+
+    assert FakeTicker.calls == ['info', 'fast_info']
+    assert (prescreen['marketCap'], prescreen['averageVolume']) == (2.2e12, 6e7)
+    assert full['trailingPE'] == pytest.approx(200.0 / 6.0)
+    assert full['priceToSalesTrailing12Months'] == pytest.approx(2.2e12 / 2.5e11)
+    assert full['grossMargins'] == 0.45
+
+
+def test_stale_slow_field_refetches_info(service, clock):
+    service.get_info('EX')
+    clock.now += 4 * DAY
+
+    service.get_info('EX')
+
+    assert FakeTicker.calls == ['info', 'info']
+
+
+def test_ratio_without_positive_input_is_absent(service, clock, monkeypatch):
+    monkeypatch.setitem(INFO, 'trailingEps', -1.5)
+    service.get_info('EX')
+    clock.now += 20 * MINUTE
+
+    info = service.get_info('EX', ['trailingPE'])
+
+    assert FakeTicker.calls == ['info', 'fast_info']
+    assert 'trailingPE' not in info
+
+
+def test_failed_quote_falls_back_to_info(service, clock, monkeypatch):
+    service.get_info('EX')
+    clock.now += 20 * MINUTE
+    monkeypatch.setattr(FakeTicker, 'fast_info', property(lambda self: {'lastPrice': None}))
+
+    info = service.get_info('EX', yfs.PRESCREEN_FIELDS)
+
+    assert FakeTicker.calls == ['info', 'info']
+    assert info['marketCap'] == 2e12
+
+
+def test_stale_memory_entry_reads_disk(tmp_path, clock):
+    db_file = tmp_path / 'fundamentals.sqlite'
+    reader, writer = FundamentalsCache(db_file), FundamentalsCache(db_file)
+    reader.put('EX', INFO)
+    clock.now += 20 * MINUTE
+    writer.put('EX', {'marketCap': 3e12}, ['marketCap'])
+
+    assert reader.get('EX', ['marketCap'])['marketCap'] == 3e12
+    assert (reader.hits, reader.misses) == (1, 0)
+
+
+def test_older_disk_rows_do_not_overwrite_memory(tmp_path, clock):
+    cache = FundamentalsCache(tmp_path / 'fundamentals.sqlite')
+    cache.put('EX', INFO)
+    cache._remember('EX', {'marketCap': (True, 3e12, clock.now + 10 * MINUTE)})
+    clock.now += 20 * MINUTE
+
+    # Stale trailingPE sends the lookup to disk; the newer marketCap survives
+    values, stale = cache.lookup('EX', ['marketCap', 'trailingPE'])
+    assert stale == ['trailingPE']
+    assert values['marketCap'] == 3e12
@@ -0,0 +1,112 @@
+"""
+IndicatorEngine's incremental RSI / SMA / 52-week extremes / average volume
+must match the ta and pandas computations they replace, whether the state is
+built in one go, advanced one bar at a time, reloaded from disk or rebuilt
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+import ta
+
+from services.indicator_engine import IndicatorEngine
+
+# RSI, extremes and average volume come out identical; the SMAs' running
+# sums (re-summed with fsum every window) differ from pandas' rolling mean
+# by a few ulps at most (observed worst ~1.3e-15)
+REL_TOL = 1e-14
+
+BARS = 600
+
+
+def make_history(seed: int, nan_volumes: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, BARS)))
+    volume = rng.integers(1_000_000, 5_000_000, BARS).astype(float)
+    if nan_volumes:
+        volume[rng.choice(BARS, nan_volumes, replace=False)] = np.nan
+    return pd.DataFrame({
+        'Open': close,
+        'High': close * (1 + rng.uniform(0, 0.03, BARS)),
+        'Low': close * (1 - rng.uniform(0, 0.03, BARS)),
+        'Close': close,
+        'Volume': volume,
+    }, index=pd.bdate_range('2022-01-03', periods=BARS))
+
+
+def reference(hist: pd.DataFrame) -> dict:
+    """What get_stock_data() computed before the incremental engine"""
+    return {
+        'rsi': ta.momentum.RSIIndicator(hist['Close'], window=14).rsi().iloc[-1],
+        'sma_20': hist['Close'].rolling(window=20).mean().iloc[-1],
+        'sma_200': hist['Close'].rolling(window=200).mean().iloc[-1] if len(hist) >= 200 else None,
+        'high_52w': hist['High'].tail(252).max(),
+        'low_52w': hist['Low'].tail(252).min(),
+        'avg_volume': hist['Volume'].tail(20).mean(),
+    }
+
+
+def assert_matches(got: dict, hist: pd.DataFrame):
+    for key, expected in reference(hist).items():
+        value = got[key]
+        if key == 'avg_volume' and math.isnan(expected):
+            assert math.isnan(value), (len(hist), key, value)
+        elif expected is None or math.isnan(expected):
+            assert value is None, (len(hist), key, value)
+        else:
+            assert value == pytest.approx(expected, rel=REL_TOL, abs=0), (len(hist), key)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return IndicatorEngine(tmp_path / 'prices.sqlite')
+
+
+@pytest.mark.parametrize('nan_volumes', [0, 60])
+def test_bar_by_bar_matches_reference(engine, nan_volumes):
+    hist = make_history(1, nan_volumes)
+    for end in range(1, BARS + 1):
+        assert_matches(engine.compute('AAA', hist.iloc[:end]), hist.iloc[:end])
+
+
+def test_full_rebuild_matches_reference(engine):
+    hist = make_history(2, nan_volumes=40)
+    for end in (5, 14, 20, 199, 200, 252, 253, BARS):
+        assert_matches(IndicatorEngine(engine.db_file.parent / f'{end}.sqlite').compute('AAA', hist.iloc[:end]),
+                       hist.iloc[:end])
+
+
+def test_nan_volume_is_skipped_not_zero(engine):
+    hist = make_history(3)
+    hist.iloc[-5:, hist.columns.get_loc('Volume')] = np.nan
+    got = engine.compute('AAA', hist)
+    assert got['avg_volume'] == pytest.approx(hist['Volume'].iloc[-20:-5].mean(), rel=REL_TOL)
+
+
+def test_all_nan_volume_window(engine):
+    hist = make_history(4)
+    hist.iloc[-25:, hist.columns.get_loc('Volume')] = np.nan
+    assert math.isnan(engine.compute('AAA', hist)['avg_volume'])
+
+
+def test_reloaded_state_and_changing_last_bar(engine):
+    hist = make_history(5, nan_volumes=30)
+    engine.compute('AAA', hist.iloc[:-1])
+
+    reloaded = IndicatorEngine(engine.db_file)
+    assert_matches(reloaded.compute('AAA', hist), hist)
+
+    # Intraday: the unsettled last bar moves between reads
+    moved = hist.copy()
+    moved.iloc[-1, moved.columns.get_loc('Close')] *= 1.05
+    moved.iloc[-1, moved.columns.get_loc('High')] *= 1.10
+    assert_matches(reloaded.compute('AAA', moved), moved)
+
+
+def test_readjusted_history_triggers_rebuild(engine):
+    hist = make_history(6)
+    engine.compute('AAA', hist)
+    adjusted = hist * 0.5
+    assert_matches(engine.compute('AAA', adjusted), adjusted)
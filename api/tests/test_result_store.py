@@ -0,0 +1,147 @@
+"""
+/api/results keyset paging: every row exactly once in sort order (ties by
+rank, stocks without the sort value last in either order), sector filters,
+cursors pinned to their screen, and 410 once that screen has expired
+"""
+
+import random
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+import index
+from services.result_store import ResultStore, SORT_KEYS, _sort_values
+
+SECTORS = ['Tech', 'Health', 'Energy']
+
+
+def make_stocks(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [{
+        'symbol': f'S{i}',
+        'sector': rng.choice(SECTORS),
+        # Few distinct values, so ties straddle page boundaries
+        'composite_score': float(rng.randint(40, 45)),
+        'rsi': rng.choice([None, float(rng.randint(10, 14))]),
+        'pe_ratio': rng.choice([None, float('inf'), float(rng.randint(8, 11))]),
+        'price_vs_52w_high': rng.choice([None, rng.choice([0.5, 0.6, 0.7])]),
+    } for i in range(n)]
+
+
+def expected_order(stocks, sort, order, sectors=None):
+    column = SORT_KEYS[sort][0]
+    ranks = {s['symbol']: r for r, s in enumerate(sorted(stocks, key=lambda s: -s['composite_score']), 1)}
+    sign = 1 if order == 'asc' else -1
+
+    def key(stock):
+        value = _sort_values(stock)[column]
+        return (value is None, 0 if value is None else sign * value, ranks[stock['symbol']])
+
+    rows = [s for s in stocks if not sectors or s['sector'] in sectors]
+    return [s['symbol'] for s in sorted(rows, key=key)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultStore(tmp_path / 'results.sqlite', keep_screens=2)
+
+
+@pytest.fixture
+def client(store, monkeypatch):
+    monkeypatch.setattr(index, 'result_store', store)
+    return TestClient(index.app)
+
+
+def page_through(client, limit, **params):
+    symbols, cursor = [], None
+    while True:
+        body = client.get('/api/results', params={**params, 'limit': limit, 'cursor': cursor}).json()
+        symbols += [s['symbol'] for s in body['stocks']]
+        cursor = body['next_cursor']
+        if cursor is None:
+            return symbols, body
+
+
+def page_through_from(client, cursor):
+    symbols = []
+    while cursor:
+        body = client.get('/api/results', params={'cursor': cursor, 'limit': 10}).json()
+        symbols += [s['symbol'] for s in body['stocks']]
+        cursor = body['next_cursor']
+    return symbols, body
+
+
+@pytest.mark.parametrize('sort', list(SORT_KEYS))
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+def test_pages_cover_every_row_in_order(store, client, sort, order):
+    stocks = make_stocks(120)
+    store.save(stocks)
+
+    symbols, _ = page_through(client, 7, sort=sort, order=order)
+
+    assert symbols == expected_order(stocks, sort, order)
+
+
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+def test_missing_values_page_last(store, client, order):
+    stocks = make_stocks(60)
+    store.save(stocks)
+
+    symbols, _ = page_through(client, 5, sort='rsi', order=order)
+
+    missing = [s['symbol'] for s in stocks if s['rsi'] is None]
+    assert set(symbols[-len(missing):]) == set(missing)
+
+
+def test_sector_filter(store, client):
+    stocks = make_stocks(90)
+    store.save(stocks)
+
+    symbols, body = page_through(client, 4, sort='pe', sector=['Tech', 'Energy'])
+
+    assert symbols == expected_order(stocks, 'pe', 'asc', ['Tech', 'Energy'])
+    assert body['total'] == len(symbols)
+    assert body['sectors'] == ['Tech', 'Energy']
+
+
+def test_cursor_stays_on_its_screen(store, client):
+    first = make_stocks(30, seed=1)
+    store.save(first)
+    page = client.get('/api/results', params={'sort': 'drawdown', 'limit': 10}).json()
+
+    # A new screen lands between pages
+    store.save(make_stocks(30, seed=2))
+    rest, body = page_through_from(client, page['next_cursor'])
+
+    assert body['screen_id'] == page['screen_id']
+    assert [s['symbol'] for s in page['stocks']] + rest == expected_order(first, 'drawdown', 'desc')
+
+
+def test_expired_screen_cursor_is_gone(store, client):
+    store.save(make_stocks(30))
+    cursor = client.get('/api/results', params={'limit': 10}).json()['next_cursor']
+
+    # keep_screens=2: two newer screens push the cursor's screen out
+    store.save(make_stocks(30, seed=3))
+    store.save(make_stocks(30, seed=4))
+    response = client.get('/api/results', params={'cursor': cursor})
+
+    assert response.status_code == 410
+
+
+def test_invalid_cursor(client, store):
+    store.save(make_stocks(5))
+    assert client.get('/api/results', params={'cursor': 'not-a-cursor'}).status_code == 400
+
+
+def test_store_with_sentinel_columns_starts_over(tmp_path):
+    db_file = tmp_path / 'results.sqlite'
+    with sqlite3.connect(db_file) as conn:
+        conn.execute("CREATE TABLE results (screen_id TEXT NOT NULL, rank INTEGER NOT NULL, rsi REAL NOT NULL)")
+        conn.execute("INSERT INTO results VALUES ('old', 1, 1e308)")
+
+    store = ResultStore(db_file)
+    screen_id = store.save(make_stocks(10))
+
+    assert store.page(screen_id, 'rsi')['count'] == 10
@@ -0,0 +1,155 @@
+"""
+WorkQueue leases against a real SQLite file: expired leases are re-claimed,
+a worker that lost its lease can't ack, failures retry until max_attempts,
+and an unfinished screen is joined rather than enqueued twice
+"""
+
+import contextlib
+import io
+
+import pytest
+
+from services import queue_worker, work_queue
+from services.queue_worker import QueueWorker
+from services.work_queue import WorkQueue, DONE, FAILED, LEASED, PENDING
+
+LEASE = 60
+PARAMS = {'prescreen': {'min_market_cap': 0}, 'top_k': 5}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(work_queue, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    return WorkQueue(tmp_path / 'work_queue.sqlite', lease_seconds=LEASE, max_attempts=2)
+
+
+def enqueue(queue, shards=1, key='screen:test'):
+    return queue.enqueue_screen(key, [{'tickers': [f'T{i}']} for i in range(shards)], PARAMS)
+
+
+def test_expired_lease_is_claimed_again(queue, clock):
+    enqueue(queue)
+    first = queue.claim('w1')
+
+    clock.now += LEASE / 2
+    assert queue.claim('w2') is None
+
+    clock.now += LEASE
+    second = queue.claim('w2')
+    assert second['task_id'] == first['task_id']
+    assert second['attempts'] == 2
+    assert second['params'] == PARAMS
+
+
+def test_ack_after_lost_lease_is_rejected(queue, clock):
+    screen_id = enqueue(queue)
+    task = queue.claim('w1')
+    clock.now += LEASE + 1
+    queue.claim('w2')
+
+    assert not queue.renew(task['task_id'], 'w1')
+    assert not queue.ack(task['task_id'], 'w1', {'ranked': ['stale']})
+    assert queue.status(screen_id)[LEASED] == 1
+
+    assert queue.ack(task['task_id'], 'w2', {'ranked': ['fresh']})
+    assert queue.results(screen_id) == [{'ranked': ['fresh']}]
+
+
+def test_fail_retries_until_max_attempts(queue, clock):
+    screen_id = enqueue(queue)
+
+    task = queue.claim('w1')
+    queue.fail(task['task_id'], 'w1', 'boom')
+    assert queue.status(screen_id)[PENDING] == 1
+
+    task = queue.claim('w1')
+    assert task['attempts'] == 2
+    queue.fail(task['task_id'], 'w1', 'boom again')
+    assert queue.status(screen_id)[FAILED] == 1
+    assert queue.claim('w1') is None
+    assert queue.results(screen_id) == [None]
+
+
+def test_expired_lease_out_of_attempts_fails(queue, clock):
+    screen_id = enqueue(queue)
+    queue.claim('w1')
+    clock.now += LEASE + 1
+    queue.claim('w2')
+    clock.now += LEASE + 1
+
+    assert queue.claim('w3') is None
+    assert queue.status(screen_id)[FAILED] == 1
+
+
+def test_enqueue_joins_unfinished_screen(queue, clock):
+    screen_id = enqueue(queue, shards=3)
+    clock.now += 10
+
+    assert enqueue(queue, shards=3) == screen_id
+    assert queue.status(screen_id)['total'] == 3
+    assert enqueue(queue, key='screen:other') != screen_id
+
+    queue.finish_screen(screen_id)
+    assert enqueue(queue, shards=3) != screen_id
+
+
+def test_stale_unfinished_screen_is_abandoned(queue, clock):
+    screen_id = enqueue(queue)
+    clock.now += work_queue.JOIN_WITHIN_SECONDS + 1
+
+    assert enqueue(queue) != screen_id
+    # The abandoned screen's task is never handed out again
+    task = queue.claim('w1')
+    assert task['screen_id'] != screen_id
+
+
+def test_worker_acks_result(queue, monkeypatch):
+    screen_id = enqueue(queue, shards=2)
+    monkeypatch.setattr(queue_worker, 'screen_shard', lambda tickers, prescreen, top_k: {'ranked': tickers})
+
+    worker = QueueWorker(queue, 'w1')
+    assert worker.run_once() and worker.run_once()
+    assert not worker.run_once()
+    assert queue.status(screen_id)[DONE] == 2
+    assert queue.results(screen_id) == [{'ranked': ['T0']}, {'ranked': ['T1']}]
+
+
+def test_worker_gives_failed_task_back(queue, monkeypatch):
+    screen_id = enqueue(queue)
+
+    def broken(tickers, prescreen, top_k):
+        raise RuntimeError('provider down')
+    monkeypatch.setattr(queue_worker, 'screen_shard', broken)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert not QueueWorker(queue, 'w1').run_task(queue.claim('w1'))
+    assert queue.status(screen_id)[PENDING] == 1
+
+
+def test_worker_that_lost_its_lease_drops_result(queue, clock, monkeypatch):
+    screen_id = enqueue(queue)
+
+    def slow(tickers, prescreen, top_k):
+        # Runs past the lease; another worker takes the task over meanwhile
+        clock.now += LEASE + 1
+        assert queue.claim('w2') is not None
+        return {'ranked': tickers}
+    monkeypatch.setattr(queue_worker, 'screen_shard', slow)
+
+    assert not QueueWorker(queue, 'w1').run_task(queue.claim('w1'))
+    assert queue.status(screen_id)[LEASED] == 1
+    assert queue.results(screen_id) == [None]